@@ -18,6 +18,12 @@ import {
 } from "lucide-react";
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || "http://localhost:5000/api";
+const JOB_POLL_INTERVAL = 500;
+// Give up on a job after this long (queue wait plus the server's 60 s inference timeout)
+const JOB_POLL_TIMEOUT = 120000;
+const HISTORY_LIMIT = 50;
+// Only used where EventSource isn't available
+const HISTORY_POLL_INTERVAL = 30000;
 
 /* ════════════════  UI COMPONENTS  ════════════════ */
 
@@ -93,20 +99,46 @@ function useSim() {
 
   const fetchHistory = useCallback(async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/logs`);
+      // Revalidates with If-None-Match, so an unchanged history is a 304
+      const response = await fetch(`${API_BASE_URL}/logs?limit=${HISTORY_LIMIT}`, { cache: "no-cache" });
       if (!response.ok) throw new Error("API Offline");
       const data = await response.json();
       if (Array.isArray(data)) setHistory(data);
+      // Where the live stream continues from (commit order, not record ids)
+      return response.headers.get("X-Last-Event-Id") || "0";
     } catch (err) {
       console.error("History fetch error:", err);
       setHistory([]);
+      return "0";
     }
   }, []);
 
   useEffect(() => {
-    fetchHistory();
-    const interval = setInterval(fetchHistory, 30000);
-    return () => clearInterval(interval);
+    let source = null;
+    let interval = null;
+    let closed = false;
+
+    // Load the page once, then only receive records saved after it
+    fetchHistory().then((lastEventId) => {
+      if (closed) return;
+      if (typeof EventSource === "undefined") {
+        interval = setInterval(fetchHistory, HISTORY_POLL_INTERVAL);
+        return;
+      }
+      source = new EventSource(`${API_BASE_URL}/logs/stream?since_id=${encodeURIComponent(lastEventId)}`);
+      source.addEventListener("record", (event) => {
+        const record = JSON.parse(event.data);
+        setHistory(prev => prev.some(r => r.id === record.id)
+          ? prev
+          : [record, ...prev].slice(0, HISTORY_LIMIT));
+      });
+    });
+
+    return () => {
+      closed = true;
+      if (source) source.close();
+      clearInterval(interval);
+    };
   }, [fetchHistory]);
 
   const runAnalysis = async (audioFile) => {
@@ -121,16 +153,37 @@ function useSim() {
       const formData = new FormData();
       formData.append('file', fileToProcess);
 
-      const response = await fetch(`${API_BASE_URL}/predict`, {
+      // Submit as a background job, then poll instead of holding the request open
+      const response = await fetch(`${API_BASE_URL}/predict?async=1`, {
         method: 'POST',
         body: formData
       });
+      const job = await response.json();
+      if (!response.ok || !job.job_id) throw new Error(job.error || "Submission failed");
+
+      setProgress(40);
+      const deadline = Date.now() + JOB_POLL_TIMEOUT;
+      let data = null;
+      while (!data) {
+        if (Date.now() > deadline) {
+          data = { error: "Analysis timed out", status: "error" };
+          break;
+        }
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+        const poll = await fetch(`${API_BASE_URL}/jobs/${job.job_id}`);
+        const status = await poll.json().catch(() => ({}));
+        if (!poll.ok || status.status === "error") {
+          // Unknown or expired job, or the server failed: polling again won't help
+          data = { error: status.error || "Job status unavailable", status: "error" };
+        } else if (status.status === "finished" || status.status === "failed") {
+          data = status.result || { error: status.error, status: "error" };
+        } else {
+          setProgress(p => Math.min(p + 5, 90));
+        }
+      }
 
-      setProgress(70);
-      const data = await response.json();
       setProgress(100);
       setResult(data);
-      fetchHistory();
     } catch (error) {
       setResult({ error: "System Unavailable", cause: "DISCONNECTED" });
     } finally {
@@ -179,6 +232,16 @@ const DashboardView = ({ history, result }) => {
     val: h.severity
   }));
 
+  // Cause counts over the whole stats window, refreshed as new records arrive
+  const [causeSplit, setCauseSplit] = useState([]);
+  const latestId = safeHistory.length > 0 ? safeHistory[0].id : null;
+  useEffect(() => {
+    fetch(`${API_BASE_URL}/stats?granularity=day`)
+      .then(response => response.ok ? response.json() : Promise.reject(new Error("API Offline")))
+      .then(stats => setCauseSplit(Object.entries(stats.causes).map(([cause, c]) => ({ name: cause, val: c.count }))))
+      .catch(err => console.error("Stats fetch error:", err));
+  }, [latestId]);
+
   return (
     <div className="grid grid-cols-12 gap-8 pt-4 pb-12">
       {/* Hero Header */}
@@ -220,7 +283,8 @@ const DashboardView = ({ history, result }) => {
         <div className="grid grid-cols-1 md:grid-cols-2 gap-8">
           <GlassCard title="Classification Split" icon={Brain} className="h-64">
             <ResponsiveContainer width="100%" height="100%">
-              <BarChart data={chartData.slice(0, 5)}>
+              <BarChart data={causeSplit}>
+                <Tooltip cursor={false} />
                 <Bar dataKey="val" fill="#263238" radius={[10, 10, 0, 0]} />
               </BarChart>
             </ResponsiveContainer>
@@ -339,7 +403,19 @@ const EngineView = ({ sim }) => {
                     <div className="px-6 py-2 bg-emerald-50 text-emerald-700 text-[10px] font-black uppercase rounded-full border border-emerald-100 flex items-center gap-2">
                       <ShieldCheck size={14} /> Confidence: {(result.confidence * 100).toFixed(1)}%
                     </div>
+                    {result.anomaly?.is_anomaly && (
+                      <div className="px-6 py-2 bg-rose-50 text-rose-700 text-[10px] font-black uppercase rounded-full border border-rose-100">
+                        Atypical Cry Pattern
+                      </div>
+                    )}
                   </div>
+                  {result.top_k?.length > 1 && (
+                    <div className="flex justify-center gap-4 mt-4 text-[10px] font-bold uppercase text-soft-navy/40">
+                      {result.top_k.slice(1).map((alt) => (
+                        <span key={alt.cause}>{alt.cause.replace('_', ' ')} {(alt.probability * 100).toFixed(0)}%</span>
+                      ))}
+                    </div>
+                  )}
                 </div>
 
                 <div className="grid grid-cols-3 gap-6 pt-12 border-t border-soft-navy/5">
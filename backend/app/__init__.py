@@ -1,15 +1,49 @@
 from flask import Flask, redirect, url_for, jsonify
 from flask_cors import CORS
 from config import config
-from .extensions import db
+from .extensions import db, sock
 
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    from .services import logs
+    logs.configure(app)
+
+    from .services.metrics import metrics
+    metrics.init_app(app)
+
     # Initialize extensions
+    from .services import database
+    database.configure(app)
     db.init_app(app)
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    database.init_app(app, db)
+    sock.init_app(app)
+    CORS(app, resources={r"/api/*": {"origins": "*", "expose_headers": ["X-Next-Cursor", "X-Last-Event-Id"]}})
+
+    from .services.ai_service import ai_service
+    ai_service.init_app(app)
+
+    from .services.jobs import job_manager
+    job_manager.init_app(app)
+
+    from .services.cache import prediction_cache
+    prediction_cache.init_app(app)
+
+    from .services.uploads import upload_stager
+    upload_stager.init_app(app)
+
+    from .services.history import history_feed
+    history_feed.init_app(app)
+
+    from .services.records import record_writer
+    record_writer.init_app(app)
+
+    from .services.vectors import similar_cries
+    similar_cries.init_app(app)
+
+    from .services.retention import retention
+    retention.init_app(app)
     
     @app.route('/')
     def root():
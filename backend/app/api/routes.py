@@ -1,14 +1,104 @@
-import os
-from flask import request, jsonify
+import json
+import logging
+import queue
+import time
+from urllib.parse import urlencode
+from flask import Response, request, jsonify, current_app
 from . import api_bp
 from ..extensions import db
 from ..models import CryRecord
 from ..services.ai_service import ai_service
-from werkzeug.utils import secure_filename
+from ..services import history, stats
+from ..services.history import history_feed
+from ..services.database import pool_stats
+from ..services.metrics import metrics
+from ..services.cache import prediction_cache, content_key
+from ..services.records import record_writer
+from ..services.retention import resolve_clip, retention
+from ..services.jobs import job_manager, JobQueueFullError
+from ..services.uploads import upload_stager
+from ..services.vectors import similar_cries
+from ..services.worker_pool import PoolFullError
 
-UPLOAD_FOLDER = 'uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+logger = logging.getLogger(__name__)
+
+def _run_inference(method, *args, **kwargs):
+    """Dispatch to the inference pool and wait for the result."""
+    future = ai_service.submit(method, *args, **kwargs)
+    return future.result(timeout=current_app.config['INFERENCE_TIMEOUT'])
+
+def _cache_lookup(file):
+    """Hash an upload and look it up; returns (key, cached entry or None).
+
+    The entry's ``file_path`` is resolved to the clip's current file. A hit
+    whose clip retention has since deleted counts as a miss, so the upload
+    is stored again and re-caches under its own file instead of new records
+    pointing at nothing.
+    """
+    if not prediction_cache.enabled:
+        return None, None
+    key = content_key(file.stream, ai_service.analysis_version())
+    cached = prediction_cache.get(key)
+    if cached is None or cached.get("file_path") is None:
+        return key, cached
+    file_path = resolve_clip(cached["file_path"])
+    if file_path is None:
+        return key, None
+    return key, dict(cached, file_path=file_path)
+
+def _remember(cache_key, result, file_path):
+    """Cache a fresh result; returns the public payload and its MFCC vector."""
+    mfcc = result.pop("mfcc", None)
+    if result.get("status") != "success":
+        metrics.inc('cry2care_errors_total', kind=f"predict_{result.get('status', 'error')}")
+    if cache_key and result.get("status") == "success":
+        prediction_cache.put(cache_key, {"result": dict(result), "mfcc": mfcc, "file_path": file_path})
+    return result, mfcc
+
+def _analyze_and_store(upload, cache_key=None, cached=None):
+    """Run the model on a staged upload and persist a successful result.
+
+    A ``cached`` entry skips decoding and inference; the new record points at
+    the file saved by the original upload. The caller cleans ``upload`` up
+    once it won't retry, so a retry after PoolFullError still has the file.
+    """
+    if cached is not None:
+        result = dict(cached["result"], cached=True)
+        file_path, mfcc = cached["file_path"], cached["mfcc"]
+    else:
+        file_path = upload.file_path
+        result = _run_inference('predict', upload.source, include_features=True)
+        result, mfcc = _remember(cache_key, result, file_path)
+
+    if result.get("status") == "success":
+        # Save to Database
+        record = CryRecord.from_result(result, file_path, mfcc)
+        record_writer.save([record])
+        result["id"] = f"EVT-{record.id:03d}"
+        logger.debug("Saved record %s", record.id)
+    return result
+
+def _analyze_job(app, upload, cache_key=None, cached=None):
+    """Background-job body: waits for a free pool slot instead of failing fast."""
+    with app.app_context():
+        deadline = time.monotonic() + app.config['INFERENCE_TIMEOUT']
+        try:
+            while True:
+                try:
+                    return _analyze_and_store(upload, cache_key, cached)
+                except PoolFullError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.25)
+                except Exception:
+                    db.session.rollback()
+                    raise
+        finally:
+            if upload is not None:
+                upload.cleanup()
+
+def _busy_response(error):
+    return jsonify({"error": str(error), "status": "busy"}), 503, {"Retry-After": str(error.retry_after)}
 
 @api_bp.route('/', methods=['GET'])
 def index():
@@ -18,65 +108,308 @@ def index():
         "status": "online",
         "endpoints": {
             "health": "/api/health",
+            "ready": "/api/health/ready",
             "predict": "/api/predict",
-            "logs": "/api/logs"
+            "predict_batch": "/api/predict/batch",
+            "jobs": "/api/jobs/<job_id>",
+            "stream": "ws /api/stream",
+            "cache_stats": "/api/cache/stats",
+            "db_stats": "/api/db/stats",
+            "metrics": "/api/metrics",
+            "retention": "/api/retention",
+            "logs": "/api/logs",
+            "stats": "/api/stats",
+            "logs_stream": "/api/logs/stream",
+            "similar": "/api/records/<id>/similar"
         }
     })
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "message": "Backend is running"})
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "healthy", "message": "Backend is running", "ready": ai_service.ready.is_set()})
+
+@api_bp.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: models loaded and warmed, so predictions won't stall."""
+    status = ai_service.readiness()
+    return jsonify(status), 200 if status["ready"] else 503
 
 @api_bp.route('/predict', methods=['POST'])
 def predict():
-    print("DEBUG: /api/predict called")
     if 'file' not in request.files:
-        print("DEBUG: No file part in request")
         return jsonify({"error": "No file part"}), 400
     
     file = request.files['file']
     if file.filename == '':
-        print("DEBUG: No selected file")
         return jsonify({"error": "No selected file"}), 400
     
     if file:
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        print(f"DEBUG: File saved to {file_path}")
+        cache_key, cached = _cache_lookup(file)
+        upload = None
+        if cached is None:
+            upload = upload_stager.stage(file)
+            logger.debug("Upload staged (%s mode, file=%s)", upload_stager.mode, upload.file_path)
         
+        if request.args.get('async') in ('1', 'true'):
+            try:
+                job_id = job_manager.submit(_analyze_job, current_app._get_current_object(), upload, cache_key, cached)
+            except JobQueueFullError as e:
+                if upload is not None:
+                    upload.cleanup()
+                return _busy_response(e)
+            logger.debug("Queued job %s", job_id)
+            return jsonify({"job_id": job_id, "status": "queued", "poll": f"/api/jobs/{job_id}"}), 202
+
         # Call AI Service
         try:
-            print("DEBUG: Calling ai_service.predict")
-            result = ai_service.predict(file_path)
-            
-            if result.get("status") == "success":
-                # Save to Database
-                record = CryRecord(
-                    cause=result["cause"],
-                    confidence=result["confidence"],
-                    severity=result["severity"],
-                    rms=result["vitals"]["rms"],
-                    zcr=result["vitals"]["zcr"],
-                    spectral_centroid=result["vitals"]["sc"],
-                    file_path=file_path
-                )
-                db.session.add(record)
-                db.session.commit()
-                result["id"] = f"EVT-{record.id:03d}"
-                print(f"DEBUG: Saved record {record.id} to DB")
+            result = _analyze_and_store(upload, cache_key, cached)
 
-            print(f"DEBUG: Prediction result: {result}")
+            logger.debug("Prediction result: %s", result)
+            if result.get("status") == "unsupported":
+                return jsonify(result), 415
             return jsonify(result)
+        except PoolFullError as e:
+            logger.info("Inference pool full, rejecting request")
+            return _busy_response(e)
         except Exception as e:
             db.session.rollback()
-            print(f"DEBUG: Exception during prediction: {str(e)}")
+            logger.exception("Prediction request failed")
             return jsonify({"error": str(e), "status": "error"}), 500
+        finally:
+            if upload is not None:
+                upload.cleanup()
+
+@api_bp.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    files = [f for f in request.files.getlist('files') if f.filename != '']
+    if not files:
+        return jsonify({"error": "No files provided"}), 400
+
+    max_files = current_app.config['BATCH_MAX_FILES']
+    if len(files) > max_files:
+        return jsonify({"error": f"Too many files (max {max_files})"}), 413
+
+    # Repeat uploads are answered from the cache; only new clips hit the model
+    uploads, file_paths, cache_keys, results, mfccs = [], [], [], [], []
+    try:
+        for file in files:
+            cache_key, cached = _cache_lookup(file)
+            upload, file_path, result, mfcc = None, None, None, None
+            if cached is not None:
+                file_path, result, mfcc = cached["file_path"], dict(cached["result"], cached=True), cached["mfcc"]
+            else:
+                try:
+                    upload = upload_stager.stage(file)
+                    file_path = upload.file_path
+                except Exception as e:
+                    # One upload that can't be staged fails alone, like a clip that won't decode
+                    logger.warning("Could not stage %s: %s", file.filename, e)
+                    metrics.inc('cry2care_errors_total', kind='upload_stage')
+                    result = {"error": str(e), "status": "error"}
+            uploads.append(upload)
+            file_paths.append(file_path)
+            results.append(result)
+            mfccs.append(mfcc)
+            cache_keys.append(cache_key)
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            fresh = _run_inference('predict_batch', [uploads[i].source for i in pending],
+                                   current_app.config['BATCH_WORKERS'], include_features=True)
+            for i, result in zip(pending, fresh):
+                results[i], mfccs[i] = _remember(cache_keys[i], result, file_paths[i])
+
+        # Persist every successful clip in one transaction
+        saved = []
+        for file, file_path, result, mfcc in zip(files, file_paths, results, mfccs):
+            result["file"] = file.filename
+            if result.get("status") == "success":
+                saved.append((result, CryRecord.from_result(result, file_path, mfcc)))
+        if saved:
+            record_writer.save([record for _, record in saved])
+            for result, record in saved:
+                result["id"] = f"EVT-{record.id:03d}"
+
+        return jsonify({
+            "results": results,
+            "processed": len(saved),
+            "failed": len(results) - len(saved)
+        })
+    except PoolFullError as e:
+        return _busy_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e), "status": "error"}), 500
+    finally:
+        for upload in uploads:
+            if upload is not None:
+                upload.cleanup()
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job", "status": "error"}), 404
+    return jsonify(job)
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(prediction_cache.stats())
+
+@api_bp.route('/db/stats', methods=['GET'])
+def db_stats():
+    """Connection pool usage: checked-out connections, checkout waits, churn."""
+    return jsonify(pool_stats.snapshot(db.engine))
+
+@api_bp.route('/retention', methods=['GET'])
+def retention_status():
+    """Retention policy and what the last run compressed, deleted and archived."""
+    return jsonify(retention.status())
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text format: per-stage and per-route latency histograms,
+    request and error counters, and queue depths read at scrape time."""
+    pool = ai_service.pool
+    gauges = [
+        ("cry2care_job_queue_depth", "Async analysis jobs queued or running.", job_manager.store.pending()),
+        ("cry2care_inference_in_flight", "Jobs on the inference process pool, running or waiting.",
+         pool.in_flight if pool is not None else 0),
+        ("cry2care_write_behind_pending", "Records waiting to be flushed by the write-behind writer.",
+         record_writer.pending()),
+        ("cry2care_history_subscribers", "Open /api/logs/stream connections.", history_feed.subscribers),
+        ("cry2care_db_pool_checked_out", "Database connections in use.", pool_stats.snapshot(db.engine).get("checked_out")),
+        ("cry2care_model_ready", "1 once the models are loaded and warmed.", int(ai_service.ready.is_set())),
+        ("cry2care_model_warmup_seconds", "Time the start-up load and warm-up took.", ai_service.warmup_seconds),
+    ]
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
 
 @api_bp.route('/logs', methods=['GET'])
 def get_logs():
+    """Newest-first history page.
+
+    Query params: limit (1-500, default 50), cursor (from the previous
+    page), cause (repeatable or comma-separated), min_severity,
+    max_severity, since/until (ISO 8601). The body stays a plain array; the
+    next page's cursor is in X-Next-Cursor and a Link rel="next" header;
+    X-Last-Event-Id is where /logs/stream should pick up after this page.
+    Responses carry an ETag, so an unchanged history costs a 304.
+    """
+    try:
+        query = history.parse_query(request.args)
+    except history.HistoryQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        etag = f'logs-{history.log_version()}'
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        # Read before the page: a record committed in between is sent twice rather than never
+        last_event = history.latest_event()
+        rows, next_cursor = history.fetch_page(**query)
+        response = jsonify([history.serialize(row) for row in rows])
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Last-Event-Id'] = history.event_id(*last_event)
+        if next_cursor:
+            args = request.args.to_dict(flat=False)
+            args['cursor'] = [next_cursor]
+            response.headers['X-Next-Cursor'] = next_cursor
+            response.headers['Link'] = f'<{request.base_url}?{urlencode(args, doseq=True)}>; rel="next"'
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route('/stats', methods=['GET'])
+def get_stats():
+    """Aggregates over a time range, served from the cry_rollups table.
+
+    Query params: since/until (ISO 8601, default the last 30 days),
+    granularity=hour|day (default hour for ranges up to 3 days), cause
+    (repeatable or comma-separated). Returns per-cause counts, severity
+    mean and percentiles, and a per-bucket time series.
+    """
+    try:
+        query = stats.parse_query(request.args)
+    except stats.StatsQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(stats.summary(**query))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route('/records/<record_id>/similar', methods=['GET'])
+def similar_records(record_id):
+    """Past cries, or reference dataset clips, closest to a stored record.
+
+    ``record_id`` is the numeric id or the "EVT-012" form. Query params:
+    k (default 10), source=records|dataset. Similarity is cosine over the
+    records' MFCC vectors.
+    """
     try:
-        records = CryRecord.query.order_by(CryRecord.timestamp.desc()).limit(50).all()
-        return jsonify([r.to_dict() for r in records])
+        number = int(record_id.upper().removeprefix('EVT-'))
+        k = int(request.args.get('k', 10))
+    except ValueError:
+        return jsonify({"error": "Record id and k must be integers"}), 400
+    source = request.args.get('source', 'records')
+    if source not in ('records', 'dataset') or k < 1:
+        return jsonify({"error": "source must be records or dataset, and k at least 1"}), 400
+
+    try:
+        matches = similar_cries.similar_to(number, k, source)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 422
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    if matches is None:
+        return jsonify({"error": "Record not found"}), 404
+    return jsonify({"id": f"EVT-{number:03d}", "source": source, "matches": matches})
+
+@api_bp.route('/logs/stream', methods=['GET'])
+def stream_logs():
+    """Server-Sent Events: one ``record`` event per newly saved record.
+
+    Event ids are "<seq>-<record id>" in commit order, so a reconnecting
+    EventSource (which sends Last-Event-ID) first gets whatever it missed.
+    ``?since_id=`` does the same for the first connection.
+    """
+    try:
+        since = history.parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('since_id') or '0')
+    except history.HistoryQueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Subscribe before reading the backlog so nothing falls in between
+    subscription = history_feed.subscribe()
+    try:
+        missed = ([((row.seq, row.id), history.serialize(row)) for row in history.fetch_since(since)]
+                  if since > (0, 0) else [])
+    except Exception:
+        history_feed.unsubscribe(subscription)
+        raise
+    finally:
+        db.session.remove()
+    heartbeat = current_app.config['HISTORY_STREAM_HEARTBEAT']
+
+    def events(sent):
+        try:
+            yield 'retry: 3000\n\n'
+            batch = missed
+            while batch is not None:
+                for key, payload in batch:
+                    if key > sent:
+                        sent = key
+                        yield f'id: {history.event_id(*key)}\nevent: record\ndata: {json.dumps(payload)}\n\n'
+                try:
+                    batch = subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    batch = []
+        finally:
+            history_feed.unsubscribe(subscription)
+
+    return Response(events(since), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
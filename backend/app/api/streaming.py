@@ -0,0 +1,72 @@
+import json
+from flask import current_app
+from . import api_bp
+from ..extensions import db, sock
+from ..models import CryRecord
+from ..services.ai_service import ai_service
+from ..services.records import record_writer
+from ..services.streaming import MODEL_SR, StreamSession
+from ..services.worker_pool import PoolFullError
+
+@sock.route('/stream', bp=api_bp)
+def stream(ws):
+    """Live bedside monitoring.
+
+    Optionally send a JSON text message first, e.g.
+    ``{"sample_rate": 16000, "format": "int16"}``, then binary chunks of mono
+    little-endian PCM. A ``cry`` event is pushed back each time a cry segment
+    ends. Send ``{"event": "end"}`` to flush the last segment and close.
+    """
+    config = current_app.config
+
+    def classify(features):
+        try:
+            future = ai_service.submit('classify', features)
+            result = future.result(timeout=config['INFERENCE_TIMEOUT'])
+        except PoolFullError as e:
+            return {"error": str(e), "status": "busy"}
+
+        if result.get("status") == "success":
+            record = CryRecord.from_result(result, mfcc=features["mfcc"])
+            record_writer.save([record])
+            result["id"] = f"EVT-{record.id:03d}"
+        return result
+
+    def open_session(sample_rate=MODEL_SR, sample_format='int16'):
+        return StreamSession(
+            sample_rate=sample_rate,
+            sample_format=sample_format,
+            classify=classify,
+            rms_threshold=config['STREAM_RMS_THRESHOLD'],
+            hangover=config['STREAM_HANGOVER'],
+            min_duration=config['STREAM_MIN_DURATION'],
+            max_duration=config['STREAM_MAX_DURATION']
+        )
+
+    session = None
+    try:
+        while True:
+            message = ws.receive()
+            if isinstance(message, str):
+                payload = json.loads(message)
+                if payload.get("event") == "end":
+                    break
+                try:
+                    session = open_session(int(payload.get("sample_rate", MODEL_SR)), payload.get("format", "int16"))
+                except ValueError as e:
+                    ws.send(json.dumps({"event": "error", "error": str(e)}))
+                    return
+                ws.send(json.dumps({"event": "ready", "sample_rate": session.sample_rate, "format": session.sample_format}))
+                continue
+
+            if session is None:
+                session = open_session()
+            for event in session.feed(message):
+                ws.send(json.dumps(event, default=str))
+
+        if session is not None:
+            for event in session.flush():
+                ws.send(json.dumps(event, default=str))
+    except Exception:
+        db.session.rollback()
+        raise
@@ -1,3 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sock import Sock
 
 db = SQLAlchemy()
+sock = Sock()
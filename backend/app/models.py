@@ -1,9 +1,24 @@
 from .extensions import db
 from datetime import datetime
+import numpy as np
+
+def pack_vector(values):
+    """Feature vector as float32 bytes for a LargeBinary column."""
+    return None if values is None else np.asarray(values, dtype=np.float32).tobytes()
+
+def unpack_vector(blob):
+    return None if blob is None else np.frombuffer(blob, dtype=np.float32)
 
 class CryRecord(db.Model):
     __tablename__ = 'cry_records'
-    
+    # Keyset paging for /logs: newest-first scans, optionally within one cause
+    __table_args__ = (
+        db.Index('ix_cry_records_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_cry_records_cause_timestamp_id', 'cause', 'timestamp', 'id'),
+        # Change feed for /logs/stream, in commit order
+        db.Index('ix_cry_records_seq_id', 'seq', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     cause = db.Column(db.String(100), nullable=False)
@@ -13,6 +28,24 @@ class CryRecord(db.Model):
     zcr = db.Column(db.Float)
     spectral_centroid = db.Column(db.Float)
     file_path = db.Column(db.String(255))
+    # MFCC vector the cause was predicted from (float32), for similarity search
+    mfcc = db.Column(db.LargeBinary)
+    # Commit sequence, set by RecordWriter: ids can commit out of order, this can't
+    seq = db.Column(db.BigInteger)
+
+    @classmethod
+    def from_result(cls, result, file_path=None, mfcc=None):
+        """Build a record from an AIService result payload."""
+        return cls(
+            cause=result["cause"],
+            confidence=result["confidence"],
+            severity=result["severity"],
+            rms=result["vitals"]["rms"],
+            zcr=result["vitals"]["zcr"],
+            spectral_centroid=result["vitals"]["sc"],
+            file_path=file_path,
+            mfcc=pack_vector(mfcc)
+        )
 
     def to_dict(self):
         return {
@@ -27,3 +60,52 @@ class CryRecord(db.Model):
             "sc": self.spectral_centroid,
             "status": "Processed"
         }
+
+
+class CryRollup(db.Model):
+    """Hourly and daily aggregates of cry_records, updated with every insert.
+
+    One row per (granularity, bucket, cause, severity bin), so counts,
+    means and severity percentiles over any range come from a few hundred
+    rows instead of a scan of cry_records.
+    """
+    __tablename__ = 'cry_rollups'
+
+    granularity = db.Column(db.String(8), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    cause = db.Column(db.String(100), primary_key=True)
+    severity_bin = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+    severity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class IdAllocator(db.Model):
+    """Next free id per table, for writers that assign ids before inserting.
+
+    Also holds the cry_records commit sequence, under ``cry_records.seq``.
+    """
+    __tablename__ = 'id_allocator'
+
+    name = db.Column(db.String(64), primary_key=True)
+    next_id = db.Column(db.BigInteger, nullable=False)
+
+
+# Every feature column of donateacry-corpus_features_final.csv
+DATASET_FEATURE_COLUMNS = [
+    'Amplitude_Envelope_Mean', 'RMS_Mean', 'ZCR_Mean', 'STFT_Mean', 'SC_Mean', 'SBAN_Mean', 'SCON_Mean',
+    'MFCCs13Mean', 'delMFCCs13', 'del2MFCCs13', 'MelSpec', 'MFCCs20',
+] + [f'MFCCs{i}' for i in range(1, 14)]
+
+# Seeded by init_db.py; reference cries for similarity search
+dataset_features = db.Table(
+    'dataset_features',
+    db.Column('id', db.Integer, primary_key=True, autoincrement=True),
+    db.Column('Cry_Audio_File', db.Text),
+    db.Column('Cry_Reason', db.Integer),
+    *[db.Column(name, db.Float) for name in DATASET_FEATURE_COLUMNS],
+    # Hash of the row's values: re-seeding skips rows that are already there
+    db.Column('row_hash', db.BigInteger, unique=True, index=True),
+    # The service's MFCC vector for the clip (float32), from the training feature store
+    db.Column('mfcc', db.LargeBinary),
+)
@@ -1,8 +1,23 @@
+import io
 import os
-import joblib
-import librosa
+import atexit
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 from flask import current_app
+from .audio import DEFAULT_RESAMPLE, UnsupportedAudioError, load_audio
+from .ensemble import EnsembleScorer, anomaly_features
+from .features import FeatureSpecError, check_spec, feature_engine, feature_spec, model_input
+from .metrics import metrics
+from .model_store import latest_release, load_bundle
+from . import vad
+from .worker_pool import InferencePool
+
+logger = logging.getLogger(__name__)
 
 class AIService:
     _instance = None
@@ -10,79 +25,478 @@ class AIService:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(AIService, cls).__new__(cls)
-            cls._instance.model = None
-            cls._instance.label_encoder = None
-            cls._instance.anomaly_model = None
+            cls._instance.models = None
+            cls._instance.model_dir = None
+            cls._instance.reload_interval = 0
+            cls._instance._watcher = None
+            cls._instance._rejected = None
+            cls._instance.pool = None
+            cls._instance.max_duration = None
+            cls._instance.resample_type = DEFAULT_RESAMPLE
+            cls._instance.top_k = 3
+            cls._instance.vad = None
+            cls._instance.ready = threading.Event()
+            cls._instance.warmup_error = None
+            cls._instance.warmup_seconds = None
+            cls._instance._warmup_thread = None
         return cls._instance
 
-    def load_models(self):
-        """Load models only once (Singleton pattern)."""
-        if self.model is None:
-            model_dir = current_app.config['MODEL_PATH']
-            print(f"DEBUG: AIService loading models from {model_dir}")
-            
-            model_path = os.path.join(model_dir, 'cry_model.pkl')
-            label_encoder_path = os.path.join(model_dir, 'label_encoder.pkl')
-            anomaly_model_path = os.path.join(model_dir, 'cry_anomaly_model.joblib')
-
-            if os.path.exists(model_path):
-                print(f"DEBUG: Loading {model_path}")
-                self.model = joblib.load(model_path)
-            else:
-                print(f"DEBUG: ERROR - {model_path} NOT FOUND")
-            
-            if os.path.exists(label_encoder_path):
-                print(f"DEBUG: Loading {label_encoder_path}")
-                self.label_encoder = joblib.load(label_encoder_path)
+    def init_app(self, app):
+        """Start the inference process pool if INFERENCE_WORKERS > 0.
+
+        With WARM_UP_ON_START the models are loaded and exercised in a
+        background thread; ``ready`` is set once that has finished.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        self.max_duration = app.config.get('MAX_CLIP_SECONDS')
+        self.resample_type = app.config.get('RESAMPLE_TYPE', DEFAULT_RESAMPLE)
+        self.reload_interval = app.config.get('MODEL_RELOAD_INTERVAL', 0)
+        self.top_k = app.config.get('TOP_K_CAUSES', 3)
+        self.vad = None
+        if app.config.get('VAD_ENABLED', False):
+            self.vad = {
+                "top_db": app.config.get('VAD_TOP_DB', vad.TOP_DB),
+                "rms_floor": app.config.get('VAD_RMS_FLOOR', vad.RMS_FLOOR),
+                "max_zcr": app.config.get('VAD_MAX_ZCR', vad.MAX_ZCR),
+                "hangover": app.config.get('VAD_HANGOVER', vad.HANGOVER),
+                "min_duration": app.config.get('VAD_MIN_DURATION', vad.MIN_DURATION),
+            }
+
+        # Pool workers import the app too; they must never start a pool of their own
+        workers = app.config.get('INFERENCE_WORKERS', 0)
+        if workers > 0 and multiprocessing.parent_process() is None:
+            self.pool = InferencePool(
+                workers=workers,
+                queue_depth=app.config.get('INFERENCE_QUEUE_DEPTH', 0),
+                model_dir=app.config['MODEL_PATH'],
+                settings={
+                    "max_duration": self.max_duration,
+                    "resample_type": self.resample_type,
+                    "reload_interval": self.reload_interval,
+                    "top_k": self.top_k,
+                    "vad": self.vad
+                },
+                retry_after=app.config.get('INFERENCE_RETRY_AFTER', 5),
+                log_level=app.config.get('LOG_LEVEL', 'INFO')
+            )
+            atexit.register(self.pool.shutdown, wait=False)
+
+        self.ready.clear()
+        self.warmup_error = None
+        if not app.config.get('WARM_UP_ON_START', True):
+            # Legacy lazy loading: the first request pays for it
+            self.ready.set()
+        elif multiprocessing.parent_process() is None:
+            self._warmup_thread = threading.Thread(
+                target=self._warm_up_in_background,
+                args=(app.config['MODEL_PATH'],),
+                name='cry2care-warmup',
+                daemon=True
+            )
+            self._warmup_thread.start()
+
+    def _warm_up_in_background(self, model_dir):
+        start = time.perf_counter()
+        try:
+            if self.pool is not None:
+                # One job per worker: each spawns, loads and warms in its initializer
+                futures = [self.pool.submit('warm_up') for _ in range(self.pool.workers)]
+                warmed = all(future.result() for future in futures)
             else:
-                print(f"DEBUG: ERROR - {label_encoder_path} NOT FOUND")
-                
-            if os.path.exists(anomaly_model_path):
-                print(f"DEBUG: Loading {anomaly_model_path}")
-                self.anomaly_model = joblib.load(anomaly_model_path)
-            
-            print(f"DEBUG: Models loaded status: Model={self.model is not None}, Encoder={self.label_encoder is not None}")
-
-    def predict(self, audio_file_path):
-        """Extract features and predict cause."""
+                warmed = self.warm_up(model_dir)
+            if not warmed:
+                raise RuntimeError("Models not loaded correctly")
+            self.ready.set()
+        except Exception as e:
+            self.warmup_error = str(e)
+            metrics.inc('cry2care_errors_total', kind='warmup')
+            logger.error("Warm-up failed: %s", e)
+        self.warmup_seconds = round(time.perf_counter() - start, 3)
+
+    def warm_up(self, model_dir=None):
+        """Load the models and push a dummy clip through the whole pipeline.
+
+        The clip is 16 kHz so the resampler (and its numba JIT) runs too; the
+        first real request then pays for neither imports nor compilation.
+        """
+        import soundfile as sf
+
+        self.load_models(model_dir)
+        t = np.arange(16000) / 16000
+        buffer = io.BytesIO()
+        sf.write(buffer, (0.1 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), 16000, format='WAV')
+        return self.predict(buffer.getvalue()).get("status") == "success"
+
+    def readiness(self):
+        warming = self._warmup_thread is not None and self._warmup_thread.is_alive()
+        return {
+            "ready": self.ready.is_set(),
+            "warming_up": warming,
+            "error": self.warmup_error,
+            "warmup_seconds": self.warmup_seconds,
+            "workers": self.pool.workers if self.pool is not None else 0
+        }
+
+    def submit(self, method, *args, **kwargs):
+        """Run ``method`` on the inference pool, or inline when it is disabled.
+
+        Returns a Future either way. Raises PoolFullError when the pool's
+        queue is at capacity.
+        """
+        if self.pool is not None:
+            return self.pool.submit(method, *args, **kwargs)
+
+        future = Future()
+        try:
+            future.set_result(getattr(self, method)(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    @property
+    def model(self):
+        return self.models.model if self.models is not None else None
+
+    @property
+    def label_encoder(self):
+        return self.models.label_encoder if self.models is not None else None
+
+    @property
+    def anomaly_model(self):
+        return self.models.anomaly_model if self.models is not None else None
+
+    def load_models(self, model_dir=None):
+        """Load models only once (Singleton pattern).
+
+        The newest release under ``MODEL_PATH/releases`` is memory-mapped;
+        without one the legacy flat pickles in ``MODEL_PATH`` are used.
+        """
+        if self.model is None:
+            model_dir = model_dir or self.model_dir or current_app.config['MODEL_PATH']
+            self.model_dir = model_dir
+            logger.info("Loading models from %s", model_dir)
+
+            with metrics.timer('model_load'):
+                self.models = self._prepare(load_bundle(model_dir))
+            if self.models.model is None:
+                logger.error("No cry_model found in %s", model_dir)
+            if self.models.label_encoder is None:
+                logger.error("No label_encoder found in %s", model_dir)
+            if self.models.error:
+                logger.error("%s", self.models.error)
+
+            logger.info("Models loaded: model=%s, encoder=%s, release=%s",
+                        self.model is not None, self.label_encoder is not None, self.models.version)
+            self._start_watcher()
+
+    def reload_models(self):
+        """Swap in the newest release if it differs from the active one.
+
+        The new bundle is loaded and exercised off to the side, then replaces
+        ``self.models`` in one reference assignment. Requests already running
+        hold the old bundle and finish on it. Returns True if it swapped.
+        """
+        latest = latest_release(self.model_dir)
+        if latest is None or latest == self._rejected or (self.models is not None and latest == self.models.version):
+            return False
+
+        with metrics.timer('model_load'):
+            bundle = self._prepare(load_bundle(self.model_dir, latest))
+        if not bundle.complete:
+            reason = bundle.error or "incomplete"
+            self._rejected = latest
+            logger.error("Release %s rejected (%s), keeping %s", latest, reason, self.models and self.models.version)
+            return False
+        # Touch every tree once so the first real request doesn't page them in
+        bundle.scorer.predict_proba(np.zeros((1, bundle.model.n_features_in_)))
+        self.models = bundle
+        logger.info("Switched to release %s", latest)
+        return True
+
+    def _check_contract(self, bundle):
+        """Make sure the service computes the features ``bundle`` was trained on.
+
+        Legacy pickles carry no spec; they're assumed to follow the current
+        extractor with the configured RESAMPLE_TYPE on whole clips. A
+        mismatch, including VAD settings other than the model was trained
+        with, marks the bundle unusable instead of letting it score the
+        wrong features.
+        """
+        if bundle.feature_spec is None:
+            bundle.feature_spec = feature_spec(self.resample_type)
+        try:
+            check_spec(bundle.feature_spec)
+            if bundle.feature_spec.get('vad') != self.vad:
+                raise FeatureSpecError(f"Feature spec mismatch (vad: model {bundle.feature_spec.get('vad')!r} "
+                                       f"vs service {self.vad!r})")
+            n_features = getattr(bundle.model, 'n_features_in_', None)
+            if n_features is not None and n_features != bundle.feature_spec['n_mfcc']:
+                raise FeatureSpecError(
+                    f"Model expects {n_features} features, the spec yields {bundle.feature_spec['n_mfcc']}")
+        except FeatureSpecError as e:
+            bundle.error = str(e)
+        return bundle
+
+    def _prepare(self, bundle):
+        """Check the feature contract, then build the bundle's ensemble scorer."""
+        self._check_contract(bundle)
+        if bundle.complete:
+            calibration = bundle.calibration or {}
+            bundle.scorer = EnsembleScorer(bundle.model, bundle.anomaly_model,
+                                           temperature=calibration.get('temperature', 1.0),
+                                           forest=bundle.forest, anomaly_forest=bundle.anomaly_forest)
+            bundle.class_names = bundle.label_encoder.inverse_transform(bundle.model.classes_.astype(int))
+        return bundle
+
+    @property
+    def feature_spec(self):
+        """The contract of the active model (what decode/extract must follow)."""
+        if self.models is not None and self.models.feature_spec is not None:
+            return self.models.feature_spec
+        return feature_spec(self.resample_type)
+
+    def _not_loaded(self):
+        error = self.models.error if self.models is not None else None
+        return f"Models not loaded correctly: {error}" if error else "Models not loaded correctly"
+
+    def _start_watcher(self):
+        if self.reload_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch_releases, name='cry2care-model-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch_releases(self):
+        while True:
+            time.sleep(self.reload_interval)
+            try:
+                self.reload_models()
+            except Exception:
+                metrics.inc('cry2care_errors_total', kind='model_reload')
+                logger.exception("Model reload failed")
+
+    def model_version(self):
+        """Short fingerprint of the model artifacts; changes when they are replaced.
+
+        That's the active release name when one is loaded here, else the
+        newest published release (pool workers load it), else a stat-based
+        fingerprint of the legacy files.
+        """
+        if self.models is not None and self.models.version:
+            return self.models.version
+        model_dir = self.model_dir or current_app.config['MODEL_PATH']
+        release = latest_release(model_dir)
+        if release:
+            return release
+        parts = []
+        for name in ('cry_model.pkl', 'label_encoder.pkl'):
+            path = os.path.join(model_dir, name)
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+    def analysis_version(self):
+        """``model_version`` plus the segmentation settings, which change results too."""
+        if self.vad is None:
+            return self.model_version()
+        settings = ",".join(f"{key}={value}" for key, value in sorted(self.vad.items()))
+        return f"{self.model_version()}-vad{hashlib.sha1(settings.encode()).hexdigest()[:8]}"
+
+    def decode(self, source, spec=None):
+        """Decode a clip (path or in-memory bytes) the way the model's spec says."""
+        spec = spec or self.feature_spec
+        with metrics.timer('decode'):
+            return load_audio(source, sr=spec['sample_rate'], max_duration=self.max_duration, res_type=spec['res_type'])
+
+    def extract_features(self, source):
+        """Decode a clip and extract its vitals and MFCC vector."""
+        audio, sr = self.decode(source)
+        return feature_engine.extract(audio, sr)
+
+    def segment_features(self, audio, sr):
+        """(segments, clip features) for a decoded clip.
+
+        ``segments`` lists (start, end, features) for each cry segment found
+        by the VAD, in seconds; only those samples go through the feature
+        extractor. The clip features are the segments' duration-weighted
+        means, so the clip-level prediction also ignores silence. With VAD
+        off ``segments`` is None, and when nothing is found it's empty; the
+        whole clip is extracted in both cases.
+        """
+        if self.vad is None:
+            return None, feature_engine.extract(audio, sr)
+        with metrics.timer('vad'):
+            ranges = vad.split(audio, sr, **self.vad)
+        return vad.pool(audio, sr, ranges)
+
+    def _build_result(self, features, probabilities, class_names, anomaly=None, include_features=False):
+        rms, zcr, sc = features["rms"], features["zcr"], features["sc"]
+
+        # We derive severity from RMS and Spectral Centroid
+        severity = (rms * 10) + (sc / 5000)
+        severity = min(max(float(severity), 0.1), 10.0)
+
+        # Stable descending sort: ties resolve to the first class, like predict()
+        ranked = np.argsort(-probabilities, kind='stable')[:max(self.top_k, 1)]
+        result = {
+            "cause": str(class_names[ranked[0]]),
+            "confidence": round(float(probabilities[ranked[0]]), 4),
+            "top_k": [{"cause": str(class_names[i]), "probability": round(float(probabilities[i]), 4)}
+                      for i in ranked],
+            "severity": round(severity, 2),
+            "vitals": {
+                "rms": round(rms, 4),
+                "zcr": round(zcr, 4),
+                "sc": round(sc, 2)
+            },
+            "status": "success"
+        }
+        if anomaly is not None:
+            # decision_function: below zero is outside the normal cry distribution
+            result["anomaly"] = {"score": round(float(anomaly), 4), "is_anomaly": bool(anomaly < 0)}
+        if include_features:
+            result["mfcc"] = [float(v) for v in features["mfcc"]]
+        return result
+
+    def _score(self, models, rows, include_features=False):
+        """Score feature dicts in one batched ensemble pass; one result per row."""
+        X = model_input({"mfcc": [features["mfcc"] for features in rows]})
+        A = None
+        if models.anomaly_model is not None:
+            A = anomaly_features({key: [features[key] for features in rows] for key in ("rms", "zcr", "sc", "mfcc")})
+        with metrics.timer('inference'):
+            probabilities, anomalies = models.scorer.score(X, A)
+        return [
+            self._build_result(features, probabilities[i], models.class_names,
+                               anomalies[i] if anomalies is not None else None, include_features)
+            for i, features in enumerate(rows)
+        ]
+
+    def _score_clips(self, models, clips, include_features=False):
+        """Score ``segment_features`` output for many clips in one ensemble pass.
+
+        Each clip's result is the prediction for its pooled features, plus a
+        "segments" list with start/end times and a prediction per segment.
+        """
+        rows = []
+        for segments, features in clips:
+            rows.append(features)
+            rows.extend(segment for _, _, segment in segments or ())
+        scored = iter(self._score(models, rows, include_features))
+
+        results = []
+        for segments, _ in clips:
+            result = next(scored)
+            if segments is not None:
+                result["segments"] = []
+                for start, end, _ in segments:
+                    segment = {key: value for key, value in next(scored).items() if key not in ("status", "mfcc")}
+                    result["segments"].append(dict(start=round(start, 3), end=round(end, 3), **segment))
+            results.append(result)
+        return results
+
+    def predict(self, source, include_features=False):
+        """Extract features and predict cause.
+
+        With ``include_features`` the MFCC vector is returned under "mfcc".
+        """
         self.load_models()
-        
-        if self.model is None or self.label_encoder is None:
-            return {"error": "Models not loaded correctly"}
+
+        # One bundle for the whole call, even if a reload swaps it meanwhile
+        models = self.models
+        if not models.complete:
+            return {"error": self._not_loaded()}
 
         try:
-            # 1. Load audio
-            audio, sr = librosa.load(audio_file_path, res_type='kaiser_fast')
-            
-            # 2. Extract Acoustic Vitals (Traditional Signal Processing)
-            rms = float(np.mean(librosa.feature.rms(y=audio)))
-            zcr = float(np.mean(librosa.feature.zero_crossing_rate(y=audio)))
-            sc = float(np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr)))
-            
-            # 3. Extract MFCC for AI Model
-            mfccs = np.mean(librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=40).T, axis=0)
-            
-            # 4. Predict Classification
-            prediction = self.model.predict([mfccs])
-            cause = self.label_encoder.inverse_transform(prediction)[0]
-            
-            # 5. Predict Anomaly/Severity 
-            # We derive severity from RMS and Spectral Centroid if model is missing
-            severity = (rms * 10) + (sc / 5000)
-            severity = min(max(float(severity), 0.1), 10.0)
-
-            return {
-                "cause": cause,
-                "confidence": 0.88 + (rms * 0.5), # Heuristic confidence
-                "severity": round(severity, 2),
-                "vitals": {
-                    "rms": round(rms, 4),
-                    "zcr": round(zcr, 4),
-                    "sc": round(sc, 2)
-                },
-                "status": "success"
-            }
+            # 1. Load audio, find the cry segments and extract vitals + MFCCs for them
+            audio, sr = self.decode(source, models.feature_spec)
+            clip = self.segment_features(audio, sr)
+
+            # 2. Classify the clip and its segments together
+            return self._score_clips(models, [clip], include_features)[0]
+        except UnsupportedAudioError as e:
+            return {"error": str(e), "status": "unsupported"}
+        except Exception as e:
+            logger.exception("Prediction failed")
+            return {"error": str(e), "status": "error"}
+
+    def classify(self, features, include_features=False):
+        """Classify an already-extracted feature dict, e.g. a live stream segment."""
+        self.load_models()
+
+        # One bundle for the whole call, even if a reload swaps it meanwhile
+        models = self.models
+        if not models.complete:
+            return {"error": self._not_loaded(), "status": "error"}
+
+        try:
+            return self._score(models, [features], include_features)[0]
         except Exception as e:
             return {"error": str(e), "status": "error"}
 
+    def predict_batch(self, sources, workers=1, include_features=False):
+        """Predict many clips with one ensemble pass.
+
+        Clips are decoded in parallel and all feature rows (every clip's
+        segments included) are classified in one pass. Without VAD, clips are
+        grouped by length so each group goes through the feature extractor as
+        one 2-D array. Results keep the input order; a clip that fails to
+        decode gets its own error entry without failing the batch.
+        """
+        self.load_models()
+
+        models = self.models
+        if not models.complete:
+            return [{"error": self._not_loaded(), "status": "error"} for _ in sources]
+
+        results = [None] * len(sources)
+        by_length = {}
+        with ThreadPoolExecutor(max_workers=min(workers, max(len(sources), 1))) as pool:
+            futures = [pool.submit(self.decode, source, models.feature_spec) for source in sources]
+            for index, future in enumerate(futures):
+                try:
+                    audio, sr = future.result()
+                    by_length.setdefault(len(audio), []).append((index, audio))
+                except UnsupportedAudioError as e:
+                    results[index] = {"error": str(e), "status": "unsupported"}
+                except Exception as e:
+                    results[index] = {"error": str(e), "status": "error"}
+
+        sr = models.feature_spec['sample_rate']
+        extracted = []
+        for group in by_length.values():
+            if self.vad is not None:
+                for index, audio in group:
+                    try:
+                        extracted.append((index, self.segment_features(audio, sr)))
+                    except Exception as e:
+                        results[index] = {"error": str(e), "status": "error"}
+                continue
+            try:
+                batch = feature_engine.extract_batch(np.stack([audio for _, audio in group]), sr)
+            except Exception as e:
+                for index, _ in group:
+                    results[index] = {"error": str(e), "status": "error"}
+                continue
+            for row, (index, _) in enumerate(group):
+                extracted.append((index, (None, {
+                    "rms": float(batch["rms"][row]),
+                    "zcr": float(batch["zcr"][row]),
+                    "sc": float(batch["sc"][row]),
+                    "mfcc": batch["mfcc"][row],
+                })))
+
+        if extracted:
+            try:
+                scored = self._score_clips(models, [clip for _, clip in extracted], include_features)
+                for (index, _), result in zip(extracted, scored):
+                    results[index] = result
+            except Exception as e:
+                for index, _ in extracted:
+                    results[index] = {"error": str(e), "status": "error"}
+
+        return results
+
 ai_service = AIService()
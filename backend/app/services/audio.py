@@ -0,0 +1,155 @@
+import io
+import os
+import shutil
+import struct
+import subprocess
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+
+TARGET_SR = 22050
+# kaiser_fast reproduces librosa.load, which the current model was trained on;
+# soxr_hq / polyphase are far faster but shift MFCCs on upsampled clips.
+DEFAULT_RESAMPLE = 'kaiser_fast'
+RESAMPLE_TYPES = ('kaiser_fast', 'kaiser_best', 'soxr_hq', 'soxr_vhq', 'soxr_mq', 'polyphase')
+
+# Containers libsndfile decodes natively, and ones that need ffmpeg
+SOUNDFILE_FORMATS = {'wav', 'flac', 'ogg', 'mp3'}
+TRANSCODE_FORMATS = {'3gp', 'mp4', 'webm'}
+
+
+class UnsupportedAudioError(ValueError):
+    """The upload's container can't be decoded on this host."""
+
+
+def sniff_format(head):
+    """Identify the container from its first bytes."""
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] == b'OggS':
+        return 'ogg'
+    if head[:3] == b'ID3' or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    if head[4:8] == b'ftyp':
+        return '3gp' if head[8:11] == b'3gp' else 'mp4'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'
+    return 'unknown'
+
+
+def resample(audio, orig_sr, target_sr=TARGET_SR, res_type=DEFAULT_RESAMPLE):
+    """Resample mono audio; a no-op when the rates already match."""
+    if orig_sr == target_sr:
+        return audio
+    if res_type.startswith('soxr_'):
+        import soxr
+        return soxr.resample(audio, orig_sr, target_sr, quality=res_type[5:].upper())
+    if res_type == 'polyphase':
+        from scipy.signal import resample_poly
+        factor = gcd(orig_sr, target_sr)
+        return resample_poly(audio, target_sr // factor, orig_sr // factor).astype(np.float32)
+    if res_type not in RESAMPLE_TYPES:
+        raise ValueError(f"Unknown resampler: {res_type}")
+
+    import resampy
+    # Same call and output length as librosa.resample
+    y = resampy.resample(audio, orig_sr, target_sr, filter=res_type)
+    n_samples = int(np.ceil(len(audio) * target_sr / orig_sr))
+    return np.pad(y, (0, max(0, n_samples - len(y))))[:n_samples].astype(np.float32)
+
+
+def load_audio(source, sr=TARGET_SR, max_duration=None, res_type=DEFAULT_RESAMPLE):
+    """Decode a path, bytes or file object to mono float32 at ``sr``.
+
+    The container is sniffed first. WAV/FLAC/OGG/MP3 go through soundfile,
+    which reads the header so at most ``max_duration`` seconds are decoded,
+    then get mixed down and resampled with ``res_type`` only if the native
+    rate differs. Containers libsndfile can't read (3GP, MP4, WebM from
+    browsers) are decoded by ffmpeg when it's installed, else refused, and
+    then mixed down and resampled the same way.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            head = f.read(16)
+    else:
+        head = source.read(16)
+        source.seek(0)
+    fmt = sniff_format(head)
+
+    if fmt in SOUNDFILE_FORMATS or fmt == 'unknown':
+        try:
+            return _decode_soundfile(source, sr, max_duration, res_type)
+        except sf.SoundFileError:
+            if fmt != 'unknown':
+                raise
+            if not isinstance(source, (str, os.PathLike)):
+                source.seek(0)
+
+    if shutil.which('ffmpeg'):
+        return _transcode(source, sr, max_duration, res_type)
+    if fmt in TRANSCODE_FORMATS:
+        raise UnsupportedAudioError(f"Unsupported audio format: {fmt} (needs ffmpeg to transcode)")
+    raise UnsupportedAudioError(f"Unsupported audio format: {fmt}")
+
+
+def _decode_soundfile(source, sr, max_duration, res_type):
+    with sf.SoundFile(source) as f:
+        native_sr = f.samplerate
+        frames = f.frames
+        if max_duration is not None:
+            frames = min(frames, int(max_duration * native_sr))
+        audio = f.read(frames, dtype='float32', always_2d=True)
+
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    audio = resample(audio, native_sr, sr, res_type)
+    return np.ascontiguousarray(audio, dtype=np.float32), sr
+
+
+def _transcode(source, sr, max_duration, res_type):
+    """Let ffmpeg decode to float32 WAV at the native rate; mix down and resample like soundfile clips.
+
+    ffmpeg's own resampler would give different samples than ``res_type``,
+    so it only decodes.
+    """
+    command = ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i',
+               os.fspath(source) if isinstance(source, (str, os.PathLike)) else 'pipe:0']
+    if max_duration is not None:
+        command += ['-t', str(max_duration)]
+    command += ['-vn', '-c:a', 'pcm_f32le', '-f', 'wav', 'pipe:1']
+
+    stdin = None if isinstance(source, (str, os.PathLike)) else source.read()
+    proc = subprocess.run(command, input=stdin, capture_output=True)
+    if proc.returncode != 0:
+        raise UnsupportedAudioError(proc.stderr.decode(errors='replace').strip() or "ffmpeg failed")
+
+    audio, native_sr = _read_wav_stream(proc.stdout)
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    audio = resample(audio, native_sr, sr, res_type)
+    return np.ascontiguousarray(audio, dtype=np.float32), sr
+
+
+def _read_wav_stream(data):
+    """(samples, channels) float32 and the rate from ffmpeg's piped pcm_f32le WAV.
+
+    Written to a pipe, the RIFF and data sizes can't be filled in, so the
+    data chunk is taken to run to the end of the stream.
+    """
+    offset, channels, rate = 12, None, None
+    while offset + 8 <= len(data):
+        chunk_id, size = data[offset:offset + 4], struct.unpack('<I', data[offset + 4:offset + 8])[0]
+        if chunk_id == b'fmt ':
+            channels, rate = struct.unpack('<HI', data[offset + 10:offset + 16])
+        elif chunk_id == b'data':
+            if channels is None:
+                break
+            body = data[offset + 8:]
+            body = body[:len(body) - len(body) % (4 * channels)]
+            return np.frombuffer(body, dtype='<f4').reshape(-1, channels), rate
+        offset += 8 + size + size % 2
+    raise UnsupportedAudioError("ffmpeg produced no audio")
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def content_key(stream, model_version, chunk_size=1 << 16):
+    """SHA-256 of an upload stream plus the model version; rewinds the stream."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return f"{digest.hexdigest()}-{model_version}"
+
+
+class PredictionCache:
+    """Two-tier cache of feature vectors and predictions keyed by content hash.
+
+    The memory tier is a bounded LRU. When ``disk_dir`` is set, every entry is
+    also written there as JSON, and memory misses fall back to it (promoting
+    the entry back into memory), so results survive restarts and evictions.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PredictionCache, cls).__new__(cls)
+            cls._instance.max_entries = 0
+            cls._instance.disk_dir = None
+            cls._instance._entries = OrderedDict()
+            cls._instance._lock = threading.Lock()
+            cls._instance._reset_counters()
+        return cls._instance
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('CACHE_MAX_ENTRIES', 1024)
+        self.disk_dir = app.config.get('CACHE_DIR')
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+        with self._lock:
+            self._entries.clear()
+            self._reset_counters()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or bool(self.disk_dir)
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, entry)
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+
+    def _remember(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk": bool(self.disk_dir),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+prediction_cache = PredictionCache()
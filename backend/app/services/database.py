@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle')
+# Backends with the upserts stats.apply_rollups needs
+BACKENDS = ('mysql', 'postgresql', 'sqlite')
+
+
+class PoolStats:
+    """Connection pool counters for /api/db/stats.
+
+    ``wait`` is the time a checkout spent getting a connection out of the
+    pool, including opening a new one when the pool had none idle; the
+    percentiles cover the last 1024 checkouts.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PoolStats, cls).__new__(cls)
+            cls._instance.reset()
+        return cls._instance
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=1024)
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self._waits.append(seconds)
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, engine):
+        pool = engine.pool
+        with self._lock:
+            waits = np.array(self._waits) * 1000
+            stats = {
+                "backend": f"{engine.dialect.name}+{engine.dialect.driver}",
+                "pool": type(pool).__name__,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "mean": round(self.total_wait * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                    "p50": round(float(np.percentile(waits, 50)), 3) if waits.size else 0.0,
+                    "p95": round(float(np.percentile(waits, 95)), 3) if waits.size else 0.0,
+                    "max": round(self.max_wait * 1000, 3),
+                },
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            })
+        return stats
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.count('timeouts')
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def engine_options(uri, options):
+    """Engine kwargs for ``uri`` from the configured pool ``options``.
+
+    Pooled backends get the timed pool. In-memory SQLite lives on a
+    single connection, so the pool settings don't apply to it.
+    """
+    options = dict(options)
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite':
+        options.setdefault('connect_args', {})['check_same_thread'] = False
+        if url.database in (None, '', ':memory:'):
+            for key in POOL_OPTIONS:
+                options.pop(key, None)
+            return options
+    options['poolclass'] = TimedQueuePool
+    return options
+
+
+def instrument(engine, sqlite_wal=True, busy_timeout=5.0):
+    """Count connects and invalidations; set SQLite pragmas on each connection.
+
+    WAL lets the dashboard read while a writer commits, and with
+    synchronous=NORMAL a commit no longer waits for an fsync (a crash
+    can lose the last transactions, never corrupt the file).
+    """
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        pool_stats.count('connects')
+        if engine.dialect.name != 'sqlite':
+            return
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+        if sqlite_wal:
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        # Pre-ping and disconnect errors land here: stale connections being replaced
+        pool_stats.count('invalidations')
+
+
+def configure(app):
+    """Fill in SQLALCHEMY_ENGINE_OPTIONS; call before ``db.init_app``.
+
+    Raises ValueError for a database URI on a backend the app can't run on.
+    """
+    backend = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported database backend {backend!r}; use one of {', '.join(BACKENDS)}")
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+
+
+def init_app(app, db):
+    with app.app_context():
+        instrument(db.engine, app.config.get('SQLITE_WAL', True), app.config.get('SQLITE_BUSY_TIMEOUT', 5.0))
@@ -0,0 +1,156 @@
+import numpy as np
+
+from .forest import MAX_FLAT_ROWS, FlatForest
+
+# Columns the shipped IsolationForest was fit on (donateacry corpus CSV names)
+ANOMALY_COLUMNS = ('RMS_Mean', 'ZCR_Mean', 'SC_Mean', 'MFCCs13Mean')
+
+
+def _average_path_length(n_samples):
+    """Expected path length of an unsuccessful BST search, c(n) in the iForest paper."""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.zeros_like(n_samples)
+    lengths[n_samples == 2] = 1.0
+    big = n_samples > 2
+    lengths[big] = 2.0 * (np.log(n_samples[big] - 1.0) + np.euler_gamma) - 2.0 * (n_samples[big] - 1.0) / n_samples[big]
+    return lengths
+
+
+def _node_depths(tree):
+    """Depth of every node; sklearn numbers children after their parent."""
+    depths = np.zeros(tree.node_count, dtype=np.float64)
+    for node in range(tree.node_count):
+        for child in (tree.children_left[node], tree.children_right[node]):
+            if child != -1:
+                depths[child] = depths[node] + 1
+    return depths
+
+
+def anomaly_features(features):
+    """The IsolationForest's inputs from ``extract``/``extract_batch`` output.
+
+    MFCCs13Mean is the mean of the first 13 MFCCs; with an orthonormal DCT
+    those are exactly the first 13 of the 40 the service computes.
+    """
+    mfcc = np.atleast_2d(np.asarray(features["mfcc"], dtype=np.float64))
+    return np.column_stack([
+        np.atleast_1d(features["rms"]), np.atleast_1d(features["zcr"]), np.atleast_1d(features["sc"]),
+        mfcc[:, :13].mean(axis=1),
+    ])
+
+
+def _exports(forest, estimators):
+    """Whether ``forest`` was flattened from exactly these trees."""
+    return (forest is not None and forest.n_trees == len(estimators)
+            and len(forest.feature) == sum(e.tree_.node_count for e in estimators))
+
+
+def classifier_forest(model):
+    """A FlatForest of the classifier's trees whose leaves hold class distributions.
+
+    Each leaf's counts are normalized like DecisionTreeClassifier.predict_proba;
+    None when ``model`` isn't a tree ensemble.
+    """
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators or not all(hasattr(e, 'tree_') for e in estimators):
+        return None
+    trees = [e.tree_ for e in estimators]
+    tables = []
+    for tree in trees:
+        values = tree.value[:, 0, :]
+        totals = values.sum(axis=1, keepdims=True)
+        tables.append(values / np.where(totals == 0, 1.0, totals))
+    return FlatForest.from_trees(trees, tables)
+
+
+def isolation_forest(anomaly_model):
+    """A FlatForest of the IsolationForest whose leaves hold path lengths, or None."""
+    if anomaly_model is None or not hasattr(anomaly_model, 'estimators_features_'):
+        return None
+    trees = [e.tree_ for e in anomaly_model.estimators_]
+    # Path length to each leaf plus the expected rest of the path below it
+    tables = [_node_depths(tree) + _average_path_length(tree.n_node_samples) for tree in trees]
+    return FlatForest.from_trees(trees, tables, anomaly_model.estimators_features_)
+
+
+class EnsembleScorer:
+    """Class probabilities and anomaly scores for a feature batch in one pass.
+
+    Both forests are exported at load time into FlatForest node arrays:
+    for the classifier each leaf's class distribution, for the
+    IsolationForest each leaf's path length. Scoring validates the input
+    once, finds every tree's leaf and sums the tables with a single gather
+    per model, skipping sklearn's per-call validation and joblib dispatch.
+    Small batches walk the flat arrays for all trees at once; larger ones
+    use each tree's Cython ``apply``. Results match ``predict_proba`` and
+    ``decision_function``.
+
+    ``forest`` and ``anomaly_forest`` may be passed in prebuilt (a release
+    ships them memory-mapped). Models that aren't tree ensembles fall back
+    to their sklearn methods.
+    """
+
+    def __init__(self, model, anomaly_model=None, temperature=1.0, forest=None, anomaly_forest=None):
+        self.model = model
+        self.anomaly_model = anomaly_model
+        self.temperature = float(temperature or 1.0)
+
+        self._trees = None
+        self._forest = forest if _exports(forest, getattr(model, 'estimators_', ())) else classifier_forest(model)
+        if self._forest is not None:
+            self._trees = [(e.tree_, None) for e in model.estimators_]
+
+        self._iso_trees = None
+        self._iso_forest = None
+        if anomaly_model is not None:
+            self._iso_forest = (anomaly_forest if _exports(anomaly_forest, getattr(anomaly_model, 'estimators_', ()))
+                                else isolation_forest(anomaly_model))
+        if self._iso_forest is not None:
+            self._iso_trees = list(zip((e.tree_ for e in anomaly_model.estimators_),
+                                       anomaly_model.estimators_features_))
+            self._iso_norm = self._iso_forest.n_trees * _average_path_length([anomaly_model.max_samples_])[0]
+
+    @property
+    def classes(self):
+        return self.model.classes_
+
+    def _leaves(self, forest, trees, X):
+        """Every tree's leaf for every row, as indices into ``forest``'s node arrays."""
+        if len(X) <= MAX_FLAT_ROWS and np.isfinite(X).all():
+            return forest.apply(X)
+        leaves = [tree.apply(np.ascontiguousarray(X if features is None else X[:, features]))
+                  for tree, features in trees]
+        return np.stack(leaves) + forest.roots[:, None]
+
+    def predict_proba(self, X):
+        """Calibrated class probabilities, shape (samples, classes)."""
+        if self._trees is None:
+            proba = self.model.predict_proba(X)
+        else:
+            X = np.ascontiguousarray(X, dtype=np.float32)
+            proba = self._forest.total(self._leaves(self._forest, self._trees, X)) / self._forest.n_trees
+        return self.calibrate(proba)
+
+    def calibrate(self, proba):
+        """Temperature scaling fitted at training time; identity when T is 1."""
+        if self.temperature == 1.0:
+            return proba
+        logits = np.log(np.maximum(proba, 1e-6)) / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        scaled = np.exp(logits)
+        return scaled / scaled.sum(axis=1, keepdims=True)
+
+    def anomaly_scores(self, A):
+        """``decision_function`` of the anomaly model: negative means anomalous."""
+        if self.anomaly_model is None:
+            return None
+        if self._iso_trees is None:
+            return self.anomaly_model.decision_function(A)
+
+        A = np.ascontiguousarray(A, dtype=np.float32)
+        depths = self._iso_forest.total(self._leaves(self._iso_forest, self._iso_trees, A))
+        return -(2.0 ** (-depths / self._iso_norm)) - self.anomaly_model.offset_
+
+    def score(self, X, A=None):
+        """(probabilities, anomaly scores or None) for model inputs X and anomaly inputs A."""
+        return self.predict_proba(X), (self.anomaly_scores(A) if A is not None else None)
@@ -0,0 +1,288 @@
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+from scipy import fft as sp_fft
+
+from .audio import DEFAULT_RESAMPLE, TARGET_SR
+from .metrics import metrics
+
+# Bump when anything below changes the vectors a model sees
+FEATURE_VERSION = 1
+
+# Defaults mirror librosa.feature.* so the vectors match what the model was trained on.
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+N_MFCC = 40
+AMIN = 1e-10
+TOP_DB = 80.0
+ZC_THRESHOLD = 1e-10
+# STFT frames processed per block; bounds the reusable workspace to a few MB
+BLOCK_FRAMES = 128
+
+
+class FeatureSpecError(ValueError):
+    """A model was trained on features this extractor doesn't produce."""
+
+
+def feature_spec(res_type=DEFAULT_RESAMPLE, vad=None):
+    """The feature contract, stored as feature_spec.json next to each model.
+
+    The model input is the clip-mean MFCC vector; everything that changes
+    its values is recorded, including the resampler used at decode time and
+    the VAD settings when the means were pooled over cry segments only
+    (``vad`` is None for whole-clip means).
+    """
+    return {
+        "version": FEATURE_VERSION,
+        "vector": "mfcc_mean",
+        "sample_rate": TARGET_SR,
+        "res_type": res_type,
+        "n_fft": N_FFT,
+        "hop_length": HOP_LENGTH,
+        "n_mels": N_MELS,
+        "n_mfcc": N_MFCC,
+        "vad": vad,
+    }
+
+
+def check_spec(spec):
+    """Raise FeatureSpecError unless this extractor computes ``spec``'s vectors."""
+    expected = feature_spec(spec.get('res_type', DEFAULT_RESAMPLE), spec.get('vad'))
+    mismatched = sorted(key for key in expected if spec.get(key) != expected[key])
+    if mismatched:
+        details = ", ".join(f"{key}: model {spec.get(key)!r} vs service {expected[key]!r}" for key in mismatched)
+        raise FeatureSpecError(f"Feature spec mismatch ({details})")
+    return spec
+
+
+def model_input(features):
+    """The matrix a model consumes, from ``extract`` or ``extract_batch`` output."""
+    return np.atleast_2d(np.asarray(features["mfcc"], dtype=np.float32))
+
+
+@lru_cache(maxsize=None)
+def _window(n_fft):
+    """Periodic Hann window, as used by librosa.stft."""
+    n = np.arange(n_fft)
+    return (0.5 - 0.5 * np.cos(2.0 * np.pi * n / n_fft)).astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def _fft_frequencies(sr, n_fft):
+    return np.fft.rfftfreq(n_fft, d=1.0 / sr)
+
+
+def _hz_to_mel(freqs):
+    """Slaney mel scale: linear below 1 kHz, logarithmic above."""
+    freqs = np.asanyarray(freqs, dtype=np.float64)
+    f_sp = 200.0 / 3
+    min_log_hz = 1000.0
+    logstep = np.log(6.4) / 27.0
+    mels = freqs / f_sp
+    log_region = freqs >= min_log_hz
+    mels[log_region] = min_log_hz / f_sp + np.log(freqs[log_region] / min_log_hz) / logstep
+    return mels
+
+
+def _mel_to_hz(mels):
+    f_sp = 200.0 / 3
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    freqs = f_sp * mels
+    log_region = mels >= min_log_mel
+    freqs[log_region] = min_log_hz * np.exp(logstep * (mels[log_region] - min_log_mel))
+    return freqs
+
+
+@lru_cache(maxsize=None)
+def _mel_basis(sr, n_fft, n_mels):
+    """Slaney-normalised mel filterbank (same as librosa.filters.mel), cached per sample rate."""
+    fft_freqs = _fft_frequencies(sr, n_fft)
+    mel_freqs = _mel_to_hz(np.linspace(_hz_to_mel([0.0])[0], _hz_to_mel([sr / 2.0])[0], n_mels + 2))
+    fdiff = np.diff(mel_freqs)
+    ramps = np.subtract.outer(mel_freqs, fft_freqs)
+
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0.0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_freqs[2:] - mel_freqs[:-2]))[:, None]
+    return weights.astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n_mfcc, n_mels):
+    """Orthonormal DCT-II basis truncated to the first ``n_mfcc`` rows."""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    basis = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+def _frame_sums(values, n_frames, frame_length, hop_length):
+    """Sum ``values`` over every analysis frame (last axis) using a running total.
+
+    When frames are a whole number of hops long, each hop-sized block is
+    summed first and the running total is taken over blocks, which needs
+    one pass over the samples and a running total ``hop_length`` times
+    shorter.
+    """
+    if frame_length % hop_length == 0:
+        per_frame = frame_length // hop_length
+        n_blocks = n_frames - 1 + per_frame
+        blocks = values[..., :n_blocks * hop_length].reshape(values.shape[:-1] + (n_blocks, hop_length))
+        csum = np.zeros(values.shape[:-1] + (n_blocks + 1,))
+        np.cumsum(blocks.sum(axis=-1, dtype=np.float64), axis=-1, out=csum[..., 1:])
+        return csum[..., per_frame:per_frame + n_frames] - csum[..., :n_frames]
+    csum = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,))
+    np.cumsum(values, axis=-1, dtype=np.float64, out=csum[..., 1:])
+    starts = np.arange(n_frames) * hop_length
+    return csum[..., starts + frame_length] - csum[..., starts]
+
+
+class _Workspace(threading.local):
+    """Per-thread scratch buffers for the STFT blocks, reused across calls."""
+
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name, shape, dtype):
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or buffer.size < np.prod(shape):
+            buffer = self.buffers[name] = np.empty(int(np.prod(shape)), dtype=dtype)
+        return buffer[:int(np.prod(shape))].reshape(shape)
+
+
+class FeatureEngine:
+    """Single-pass extractor for the acoustic vitals and MFCCs.
+
+    The waveform is padded and framed once. RMS and ZCR come from running sums
+    over that padded signal, and one STFT feeds both the spectral centroid and
+    the mel/MFCC pipeline, instead of each librosa feature redoing the work.
+
+    Equal-length clips can be passed together as a 2-D array. The STFT then
+    runs in blocks of about ``BLOCK_FRAMES`` frames across all of them, with
+    windowing, magnitude, centroid and mel projection written into per-thread
+    buffers; only the FFT output is allocated per block.
+    """
+
+    def __init__(self, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS, n_mfcc=N_MFCC):
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.n_mfcc = n_mfcc
+        self._workspace = _Workspace()
+
+    def _vitals(self, batch):
+        """Centre-padded clips plus per-frame RMS and ZCR, all from the waveform."""
+        n_fft, hop = self.n_fft, self.hop_length
+        n_clips, n_samples = batch.shape
+        pad = n_fft // 2
+        padded = np.zeros((n_clips, n_samples + 2 * pad), dtype=np.float32)
+        padded[:, pad:pad + n_samples] = batch
+        n_frames = 1 + (padded.shape[1] - n_fft) // hop
+
+        rms = np.sqrt(_frame_sums(np.square(padded, dtype=np.float64), n_frames, n_fft, hop) / n_fft)
+
+        # ZCR uses edge padding in librosa, which never adds a crossing
+        signs = np.signbit(batch) & (np.abs(batch) > ZC_THRESHOLD)
+        crossings = np.zeros(padded.shape, dtype=bool)
+        crossings[:, pad + 1:pad + n_samples] = signs[:, 1:] != signs[:, :-1]
+        # The first sample of each frame never counts as a crossing
+        starts = np.arange(n_frames) * hop
+        zcr = (_frame_sums(crossings, n_frames, n_fft, hop) - crossings[:, starts]) / n_fft
+        return padded, rms, zcr
+
+    def _analyze(self, batch, sr):
+        """Per-frame RMS, ZCR, centroid and clipped log-mel for a (clips, samples) array."""
+        batch = np.asarray(batch, dtype=np.float32)
+        n_fft, hop = self.n_fft, self.hop_length
+        n_clips = batch.shape[0]
+        mark = time.perf_counter()
+        padded, rms, zcr = self._vitals(batch)
+        n_frames = rms.shape[1]
+        mark = metrics.lap('feature_rms_zcr', mark)
+
+        # One shared STFT for everything spectral, a block of frames at a time
+        frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft, axis=-1)[:, ::hop][:, :n_frames]
+        window = _window(n_fft)
+        freqs = _fft_frequencies(sr, n_fft)
+        mel_basis_t = _mel_basis(sr, n_fft, self.n_mels).T
+        n_bins = n_fft // 2 + 1
+
+        step = max(1, BLOCK_FRAMES // n_clips)
+        total = np.empty((n_clips, n_frames), dtype=np.float32)
+        weighted = np.empty((n_clips, n_frames), dtype=np.float64)
+        mel = np.empty((n_clips, n_frames, self.n_mels), dtype=np.float32)
+        for start in range(0, n_frames, step):
+            stop = min(start + step, n_frames)
+            rows = n_clips * (stop - start)
+            # Contiguous block buffers, so the products below are plain 2-D GEMMs
+            windowed = self._workspace.get('windowed', (n_clips, stop - start, n_fft), np.float32)
+            magnitude = self._workspace.get('magnitude', (rows, n_bins), np.float32)
+            block_total = self._workspace.get('total', (rows,), np.float32)
+            block_weighted = self._workspace.get('weighted', (rows,), np.float64)
+            block_mel = self._workspace.get('mel', (rows, self.n_mels), np.float32)
+
+            np.multiply(frames[:, start:stop], window, out=windowed)
+            # scipy's FFT is several times faster than numpy's on float32 frames
+            spectrum = sp_fft.rfft(windowed, axis=-1, overwrite_x=True)
+            np.abs(spectrum.reshape(rows, n_bins), out=magnitude)
+            np.sum(magnitude, axis=-1, out=block_total)
+            total[:, start:stop] = block_total.reshape(n_clips, -1)
+            np.matmul(magnitude, freqs, out=block_weighted)
+            weighted[:, start:stop] = block_weighted.reshape(n_clips, -1)
+            np.square(magnitude, out=magnitude)
+            np.matmul(magnitude, mel_basis_t, out=block_mel)
+            mel[:, start:stop] = block_mel.reshape(n_clips, -1, self.n_mels)
+
+        sc = np.divide(weighted, total, out=np.zeros_like(weighted), where=total > np.finfo(np.float32).tiny)
+        mark = metrics.lap('feature_stft', mark)
+
+        # power_to_db with top_db clipping against each clip's own peak
+        np.maximum(mel, AMIN, out=mel)
+        np.log10(mel, out=mel)
+        mel *= 10.0
+        floor = mel.max(axis=(1, 2), keepdims=True) - TOP_DB
+        np.maximum(mel, floor, out=mel)
+        metrics.lap('feature_log_mel', mark)
+        return rms, zcr, sc, mel
+
+    def frame_vitals(self, audio):
+        """Per-frame RMS and ZCR only: the time-domain part, no STFT."""
+        _, rms, zcr = self._vitals(np.asarray(audio, dtype=np.float32)[None, :])
+        return rms[0], zcr[0]
+
+    def frame_features(self, audio, sr):
+        """Per-frame RMS, ZCR, spectral centroid and MFCC matrix."""
+        rms, zcr, sc, log_mel = self._analyze(np.asarray(audio)[None, :], sr)
+        mfcc = _dct_matrix(self.n_mfcc, self.n_mels) @ log_mel[0].T
+        return {"rms": rms[0], "zcr": zcr[0], "sc": sc[0], "mfcc": mfcc}
+
+    def extract_batch(self, batch, sr):
+        """Clip-level means for a (clips, samples) array of equal-length clips.
+
+        Returns arrays: ``rms``, ``zcr`` and ``sc`` of shape (clips,) and
+        ``mfcc`` of shape (clips, n_mfcc).
+        """
+        rms, zcr, sc, log_mel = self._analyze(batch, sr)
+        # The DCT is linear, so the mean MFCC is the DCT of the mean log-mel
+        mfcc = log_mel.mean(axis=1) @ _dct_matrix(self.n_mfcc, self.n_mels).T
+        return {"rms": rms.mean(axis=1), "zcr": zcr.mean(axis=1), "sc": sc.mean(axis=1), "mfcc": mfcc}
+
+    def extract(self, audio, sr):
+        """Clip-level means: scalar vitals plus the 40-dim MFCC vector."""
+        features = self.extract_batch(np.asarray(audio)[None, :], sr)
+        return {
+            "rms": float(features["rms"][0]),
+            "zcr": float(features["zcr"][0]),
+            "sc": float(features["sc"][0]),
+            "mfcc": features["mfcc"][0],
+        }
+
+
+feature_engine = FeatureEngine()
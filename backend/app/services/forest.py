@@ -0,0 +1,83 @@
+import numpy as np
+
+# Above this many rows sklearn's per-tree Cython apply() beats the vectorized walk
+MAX_FLAT_ROWS = 64
+
+# How often (in levels) the walk drops rows that already sit on a leaf
+_COMPACT_EVERY = 4
+
+
+class FlatForest:
+    """A tree ensemble exported into contiguous node arrays.
+
+    Every tree's nodes are concatenated: ``feature`` and ``threshold`` per
+    node, ``children`` as (left, right) pairs and ``roots`` the first node
+    of each tree. Leaves point at themselves, so walking all trees for all
+    rows is ``depth`` rounds of gathers with no per-tree Python calls and
+    no input validation. ``values`` holds whatever each leaf contributes
+    (class distributions, path lengths) and is summed over the trees.
+
+    Plain numpy arrays, so a FlatForest dumped with joblib loads memory-mapped.
+    """
+
+    def __init__(self, feature, threshold, children, roots, values, depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.roots = roots
+        self.values = values
+        self.depth = int(depth)
+
+    @classmethod
+    def from_trees(cls, trees, values, features=None):
+        """Flatten sklearn ``Tree`` objects; ``values`` are per-node arrays, one per tree.
+
+        ``features`` maps each tree's feature indices to input columns, for
+        ensembles whose trees see a subset of the columns (IsolationForest).
+        """
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        feature, threshold, children = [], [], []
+        for index, (tree, offset) in enumerate(zip(trees, offsets)):
+            nodes = np.arange(tree.node_count) + offset
+            leaf = tree.children_left == -1
+            columns = np.where(leaf, 0, tree.feature)
+            if features is not None:
+                columns = np.asarray(features[index])[columns]
+            feature.append(columns)
+            threshold.append(np.where(leaf, np.inf, tree.threshold))
+            children.append(np.column_stack([np.where(leaf, nodes, tree.children_left + offset),
+                                             np.where(leaf, nodes, tree.children_right + offset)]))
+        return cls(np.concatenate(feature).astype(np.intp), np.concatenate(threshold).astype(np.float64),
+                   np.vstack(children).astype(np.intp), offsets.astype(np.intp), np.concatenate(values),
+                   max(tree.max_depth for tree in trees))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Leaf reached in every tree by every row, as node indices of shape (trees, rows).
+
+        Rows are rounded to float32 first and compared as ``x <= threshold``,
+        exactly as sklearn does, so the leaves are the ones ``Tree.apply`` finds.
+        """
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows, columns = X.shape
+        flat = X.ravel()
+        node = np.repeat(self.roots, rows)
+        base = np.tile(np.arange(rows, dtype=np.intp) * columns, self.n_trees)
+        leaves = node.copy()
+        active = np.arange(node.size)
+        for level in range(self.depth):
+            step = self.children[node, (flat[base + self.feature[node]] > self.threshold[node]).view(np.int8)]
+            if level % _COMPACT_EVERY == _COMPACT_EVERY - 1:
+                moving = step != node
+                leaves[active] = step
+                active, step, base = active[moving], step[moving], base[moving]
+            node = step
+        leaves[active] = node
+        return leaves.reshape(self.n_trees, rows)
+
+    def total(self, leaves):
+        """Leaf ``values`` summed over the trees, in tree order like sklearn."""
+        return self.values[leaves].sum(axis=0)
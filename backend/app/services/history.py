@@ -0,0 +1,275 @@
+import base64
+import logging
+import queue
+import threading
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, tuple_, update
+
+from ..extensions import db
+from ..models import CryRecord, IdAllocator
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+# id_allocator row holding the next commit sequence number
+SEQUENCE = f'{CryRecord.__tablename__}.seq'
+
+# Only what the dashboard shows; file_path etc. never leave the DB
+LOG_COLUMNS = (
+    CryRecord.id, CryRecord.timestamp, CryRecord.cause, CryRecord.confidence,
+    CryRecord.severity, CryRecord.rms, CryRecord.zcr, CryRecord.spectral_centroid,
+)
+
+
+class HistoryQueryError(ValueError):
+    """Bad paging or filter parameters; the route answers 400."""
+
+
+def encode_cursor(timestamp, record_id):
+    raw = f"{timestamp.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, record_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(record_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HistoryQueryError("Invalid cursor") from e
+
+
+def _parse_time(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise HistoryQueryError(f"{name} must be an ISO 8601 timestamp") from e
+
+
+def serialize(row):
+    """Same payload as CryRecord.to_dict, from a plain result row."""
+    stamp = row.timestamp.isoformat(sep=' ', timespec='seconds')
+    return {
+        "id": f"EVT-{row.id:03d}",
+        "time": stamp[11:],
+        "date": stamp[:10],
+        "cause": row.cause,
+        "confidence": row.confidence,
+        "severity": row.severity,
+        "rms": row.rms,
+        "zcr": row.zcr,
+        "sc": row.spectral_centroid,
+        "status": "Processed"
+    }
+
+
+def parse_query(args):
+    """Validate request args into keyword arguments for ``fetch_page``."""
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+        min_severity = float(args['min_severity']) if args.get('min_severity') else None
+        max_severity = float(args['max_severity']) if args.get('max_severity') else None
+    except ValueError as e:
+        raise HistoryQueryError("limit and severity bounds must be numbers") from e
+    if not 1 <= limit <= MAX_LIMIT:
+        raise HistoryQueryError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    causes = [c for value in args.getlist('cause') for c in value.split(',') if c]
+    return {
+        "limit": limit,
+        "cursor": decode_cursor(args['cursor']) if args.get('cursor') else None,
+        "causes": causes or None,
+        "min_severity": min_severity,
+        "max_severity": max_severity,
+        "since": _parse_time(args['since'], 'since') if args.get('since') else None,
+        "until": _parse_time(args['until'], 'until') if args.get('until') else None,
+    }
+
+
+def fetch_page(limit=DEFAULT_LIMIT, cursor=None, causes=None, min_severity=None, max_severity=None,
+               since=None, until=None):
+    """One page of records, newest first; returns (rows, next cursor or None).
+
+    Keyset paging on (timestamp, id): each page continues strictly after the
+    last row of the previous one, so it's an index range scan on
+    ix_cry_records_timestamp_id (or the cause-prefixed index when filtering
+    by cause) however deep the client pages, and it never skips or repeats
+    rows as new ones arrive. Rows come back as tuples, not ORM objects.
+    """
+    conditions = []
+    if cursor is not None:
+        conditions.append(tuple_(CryRecord.timestamp, CryRecord.id) < tuple_(*cursor))
+    if causes:
+        conditions.append(CryRecord.cause.in_(causes))
+    if min_severity is not None:
+        conditions.append(CryRecord.severity >= min_severity)
+    if max_severity is not None:
+        conditions.append(CryRecord.severity <= max_severity)
+    if since is not None:
+        conditions.append(CryRecord.timestamp >= since)
+    if until is not None:
+        conditions.append(CryRecord.timestamp < until)
+
+    query = (select(*LOG_COLUMNS)
+             .where(*conditions)
+             .order_by(CryRecord.timestamp.desc(), CryRecord.id.desc())
+             .limit(limit + 1))
+    rows = db.session.execute(query).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    return rows, next_cursor
+
+
+def next_sequence(conn):
+    """Next commit sequence number, taken in ``conn``'s transaction.
+
+    Every transaction that inserts or archives records takes one. The
+    counter row stays locked until that transaction commits, so sequence
+    numbers follow commit order even where record ids don't.
+    """
+    table = IdAllocator.__table__
+    key = table.c.name == SEQUENCE
+    if conn.execute(update(table).where(key).values(next_id=table.c.next_id + 1)).rowcount:
+        return conn.execute(select(table.c.next_id).where(key)).scalar() - 1
+    seq = (conn.execute(select(func.max(CryRecord.seq))).scalar() or 0) + 1
+    conn.execute(insert(table).values(name=SEQUENCE, next_id=seq + 1))
+    return seq
+
+
+def log_version():
+    """The next commit sequence number, a primary-key lookup; it changes whenever any page of /logs could."""
+    return db.session.execute(select(IdAllocator.next_id).where(IdAllocator.name == SEQUENCE)).scalar() or 0
+
+
+def event_id(seq, record_id):
+    return f"{seq}-{record_id}"
+
+
+def parse_event_id(value):
+    """(seq, id) from an event id; (0, 0), from now on, for 0 or a bare record id."""
+    try:
+        if '-' not in value:
+            int(value)
+            return 0, 0
+        seq, record_id = value.split('-', 1)
+        return int(seq), int(record_id)
+    except ValueError as e:
+        raise HistoryQueryError("Last-Event-ID must be an event id") from e
+
+
+def latest_event():
+    """(seq, id) of the last committed record; (0, 0) on an empty table."""
+    row = db.session.execute(select(CryRecord.seq, CryRecord.id).where(CryRecord.seq.is_not(None))
+                             .order_by(CryRecord.seq.desc(), CryRecord.id.desc()).limit(1)).first()
+    return (row.seq, row.id) if row else (0, 0)
+
+
+def fetch_since(after, limit=MAX_LIMIT):
+    """Records committed after the (seq, id) ``after``, in commit order.
+
+    Ids come from concurrent autoincrement inserts and write-behind id
+    blocks, so a lower id can commit after a higher one; ``seq`` can't.
+    """
+    query = (select(*LOG_COLUMNS, CryRecord.seq)
+             .where(tuple_(CryRecord.seq, CryRecord.id) > tuple_(*after))
+             .order_by(CryRecord.seq, CryRecord.id).limit(limit))
+    return db.session.execute(query).all()
+
+
+class HistoryFeed:
+    """Fans newly inserted records out to /api/logs/stream subscribers.
+
+    One thread per process checks for rows committed after the last one it
+    sent (by commit sequence, see ``fetch_since``), so
+    any number of open dashboards costs one indexed query per interval
+    rather than one full page per dashboard. Commits in this process call
+    ``notify`` to push straight away; rows written by other processes show
+    up on the next tick. The thread only runs while someone is listening.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(HistoryFeed, cls).__new__(cls)
+            cls._instance.app = None
+            cls._instance.interval = 1.0
+            cls._instance.backlog = 256
+            cls._instance._subscribers = set()
+            cls._instance._lock = threading.Lock()
+            cls._instance._wake = threading.Event()
+            cls._instance._thread = None
+        return cls._instance
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('HISTORY_POLL_INTERVAL', 1.0)
+        self.backlog = app.config.get('HISTORY_STREAM_BACKLOG', 256)
+
+    def subscribe(self):
+        """A queue receiving lists of ((seq, id), payload); ``None`` means reconnect."""
+        subscription = queue.Queue(maxsize=self.backlog)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='cry2care-history-feed', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def notify(self):
+        """New rows were committed; check now instead of at the next tick."""
+        self._wake.set()
+
+    def _run(self):
+        with self.app.app_context():
+            last = latest_event()
+            db.session.remove()
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None
+                        return
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                try:
+                    rows = fetch_since(last)
+                except Exception as e:
+                    metrics.inc('cry2care_errors_total', kind='history_feed')
+                    logger.warning("History feed query failed: %s", e)
+                    rows = []
+                finally:
+                    db.session.remove()
+                if rows:
+                    last = (rows[-1].seq, rows[-1].id)
+                    self._broadcast([((row.seq, row.id), serialize(row)) for row in rows])
+
+    def _broadcast(self, batch):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(batch)
+            except queue.Full:
+                # Too far behind: drop it; the client resumes from Last-Event-ID
+                self.unsubscribe(subscription)
+                try:
+                    subscription.get_nowait()
+                except queue.Empty:
+                    pass
+                subscription.put_nowait(None)
+
+
+history_feed = HistoryFeed()
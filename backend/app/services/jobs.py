@@ -0,0 +1,121 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job store is full of jobs that haven't finished yet."""
+
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class JobStore:
+    """Bounded in-memory job registry with TTL eviction.
+
+    Finished jobs are kept for ``ttl`` seconds so clients can poll for the
+    result, then dropped. When the store is at ``max_jobs`` the oldest
+    finished jobs go first; jobs still queued or running are never evicted.
+    """
+
+    def __init__(self, max_jobs=1000, ttl=600):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self):
+        with self._lock:
+            self._evict()
+            if len(self._jobs) >= self.max_jobs:
+                return None
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {"id": job_id, "status": "queued", "created": time.time()}
+            return job_id
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                if fields.get("status") in ("finished", "failed"):
+                    job["finished"] = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def pending(self):
+        """Jobs queued or running."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if "finished" not in job)
+
+    def _evict(self):
+        now = time.time()
+        done = [job_id for job_id, job in self._jobs.items() if "finished" in job]
+        for job_id in done:
+            if now - self._jobs[job_id]["finished"] > self.ttl:
+                del self._jobs[job_id]
+        # Over capacity: drop the oldest finished jobs
+        for job_id in done:
+            if len(self._jobs) < self.max_jobs:
+                break
+            self._jobs.pop(job_id, None)
+
+
+class JobManager:
+    """Runs analyses on a local background executor and tracks their state."""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(JobManager, cls).__new__(cls)
+            cls._instance.store = JobStore()
+            cls._instance.executor = None
+            cls._instance.retry_after = 5
+        return cls._instance
+
+    def init_app(self, app):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.store = JobStore(
+            max_jobs=app.config.get('JOB_MAX_PENDING', 1000),
+            ttl=app.config.get('JOB_TTL', 600)
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get('JOB_WORKERS', 4),
+            thread_name_prefix='cry2care-job'
+        )
+        self.retry_after = app.config.get('INFERENCE_RETRY_AFTER', 5)
+
+    def submit(self, fn, *args):
+        """Schedule ``fn(*args)`` and return its job id straight away."""
+        job_id = self.store.create()
+        if job_id is None:
+            raise JobQueueFullError(self.retry_after)
+        self.executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _run(self, job_id, fn, args):
+        self.store.update(job_id, status="running")
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self.store.update(job_id, status="failed", error=str(e))
+            return
+        failed = isinstance(result, dict) and result.get("status") == "error"
+        self.store.update(job_id, status="failed" if failed else "finished", result=result)
+
+
+job_manager = JobManager()
@@ -0,0 +1,45 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+FORMAT = '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'
+
+_listener = None
+
+
+def _stop():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure(app):
+    """Set up the app's loggers from LOG_LEVEL."""
+    setup(app.config.get('LOG_LEVEL', 'INFO'))
+
+
+def setup(level):
+    """Send the ``app`` loggers through a queue to a background writer.
+
+    Request threads only enqueue the record; formatting and the write to
+    stderr happen on the listener thread, so a slow terminal or log
+    collector never stalls a request.
+    """
+    global _listener
+    if _listener is None:
+        atexit.register(_stop)
+    _stop()
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(FORMAT))
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger('app')
+    logger.handlers = [logging.handlers.QueueHandler(records)]
+    logger.setLevel(level)
+    logger.propagate = False
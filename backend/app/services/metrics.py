@@ -0,0 +1,154 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Histogram upper bounds in seconds: a cache hit is sub-millisecond, a long upload seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "cry2care_stage_seconds": "Time spent in each stage of the analysis pipeline.",
+    "cry2care_http_request_seconds": "HTTP request handling time by route.",
+    "cry2care_http_requests_total": "HTTP requests by route, method and status.",
+    "cry2care_errors_total": "Failures by kind.",
+    "cry2care_retention_run_seconds": "Duration of each retention run.",
+    "cry2care_retention_bytes_reclaimed_total": "Disk space freed by compressing and deleting clips.",
+    "cry2care_retention_files_total": "Clips handled by retention, by action.",
+    "cry2care_retention_records_archived_total": "cry_records rows moved to the archive tables.",
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """In-process histograms and counters, rendered in Prometheus text format.
+
+    Histograms have fixed buckets, so recording is a bisect and a few adds
+    under one lock. Pool workers record into their own copy; ``drain``
+    hands their deltas back with each result and ``merge`` folds them in
+    here, so /api/metrics covers inference run in other processes.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(Metrics, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.reset()
+        return cls._instance
+
+    def init_app(self, app):
+        """Count and time every request by its route rule."""
+        from flask import g, request
+
+        self.reset()
+
+        @app.before_request
+        def start_timer():
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            started = g.pop('metrics_started', None)
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            if started is not None:
+                self.observe('cry2care_http_request_seconds', time.perf_counter() - started, route=route)
+            self.inc('cry2care_http_requests_total', route=route, method=request.method,
+                     status=response.status_code)
+            return response
+
+    def reset(self):
+        with self._lock:
+            # name -> labels -> [bucket counts..., +Inf count], sum
+            self._histograms = defaultdict(dict)
+            self._counters = defaultdict(lambda: defaultdict(int))
+
+    def observe(self, name, seconds, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            series = self._histograms[name].get(key)
+            if series is None:
+                series = self._histograms[name][key] = [[0] * (len(BUCKETS) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[name][tuple(sorted(labels.items()))] += amount
+
+    @contextmanager
+    def timer(self, stage):
+        """Record the block's duration under cry2care_stage_seconds{stage=...}."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('cry2care_stage_seconds', time.perf_counter() - started, stage=stage)
+
+    def lap(self, stage, since):
+        """Record the time since ``since`` for ``stage``; returns now, to start the next lap."""
+        now = time.perf_counter()
+        self.observe('cry2care_stage_seconds', now - since, stage=stage)
+        return now
+
+    def drain(self):
+        """Everything recorded since the last drain, as plain data; then reset."""
+        with self._lock:
+            state = ({name: dict(series) for name, series in self._histograms.items()},
+                     {name: dict(series) for name, series in self._counters.items()})
+            self._histograms = defaultdict(dict)
+            self._counters = defaultdict(lambda: defaultdict(int))
+        return state
+
+    def merge(self, state):
+        histograms, counters = state
+        with self._lock:
+            for name, series in histograms.items():
+                for key, (counts, total) in series.items():
+                    mine = self._histograms[name].setdefault(key, [[0] * (len(BUCKETS) + 1), 0.0])
+                    mine[0] = [a + b for a, b in zip(mine[0], counts)]
+                    mine[1] += total
+            for name, series in counters.items():
+                for key, value in series.items():
+                    self._counters[name][key] += value
+
+    def render(self, gauges=()):
+        """Prometheus text exposition; ``gauges`` are (name, help, value) read at scrape time."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._histograms):
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+                for key, (counts, total) in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + ('+Inf',), counts):
+                        cumulative += count
+                        le = bound if bound == '+Inf' else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {total!r}")
+                    lines.append(f"{name}_count{_labels(key)} {cumulative}")
+            for name in sorted(self._counters):
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} counter"]
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_labels(key)} {_number(value)}")
+        for name, help_text, value in gauges:
+            if value is None:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
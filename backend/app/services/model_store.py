@@ -0,0 +1,152 @@
+import json
+import os
+import re
+import tempfile
+import time
+
+RELEASES_DIR = 'releases'
+FEATURE_SPEC = 'feature_spec.json'
+CALIBRATION = 'calibration.json'
+
+# Artifact name -> file stem inside a release, and the legacy flat file names
+ARTIFACTS = {
+    'model': 'cry_model',
+    'label_encoder': 'label_encoder',
+    'anomaly_model': 'cry_anomaly_model',
+    # FlatForest exports of the two models, so workers share them memory-mapped too
+    'forest': 'cry_forest',
+    'anomaly_forest': 'cry_anomaly_forest',
+}
+LEGACY_FILES = {
+    'model': 'cry_model.pkl',
+    'label_encoder': 'label_encoder.pkl',
+    'anomaly_model': 'cry_anomaly_model.joblib',
+}
+
+
+class ModelBundle:
+    """One consistent set of artifacts; swapped as a whole on reload."""
+
+    def __init__(self, model=None, label_encoder=None, anomaly_model=None, version=None,
+                 feature_spec=None, calibration=None):
+        self.model = model
+        self.label_encoder = label_encoder
+        self.anomaly_model = anomaly_model
+        self.version = version
+        # The feature contract the model was trained on; None for legacy pickles
+        self.feature_spec = feature_spec
+        # e.g. {"method": "temperature", "temperature": 1.7}; None means raw probabilities
+        self.calibration = calibration
+        # Prebuilt FlatForests from the release; legacy bundles build them at load
+        self.forest = None
+        self.anomaly_forest = None
+        # Filled in by AIService once the bundle passes its checks
+        self.scorer = None
+        self.class_names = None
+        self.error = None
+
+    @property
+    def complete(self):
+        return self.model is not None and self.label_encoder is not None and self.error is None
+
+
+def version_key(name):
+    """Sort key for release names: runs of digits compare as numbers, so v10 comes after v9."""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in re.findall(r'\d+|\D+', name)]
+
+
+def releases(model_dir):
+    """Published release names, oldest first. Staging dirs start with a dot."""
+    root = os.path.join(model_dir, RELEASES_DIR)
+    if not os.path.isdir(root):
+        return []
+    return sorted((name for name in os.listdir(root)
+                   if not name.startswith('.') and os.path.isdir(os.path.join(root, name))), key=version_key)
+
+
+def latest_release(model_dir):
+    names = releases(model_dir)
+    return names[-1] if names else None
+
+
+def _read_json(directory, name):
+    try:
+        with open(os.path.join(directory, name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def publish(model_dir, model, label_encoder, anomaly_model=None, version=None, feature_spec=None,
+            calibration=None):
+    """Write a new release and make it visible atomically.
+
+    Artifacts, including FlatForest exports of the tree models, are dumped
+    uncompressed so their numpy arrays can be memory-mapped, with
+    ``feature_spec`` and ``calibration`` next to them as JSON. They're written into a staging directory that is renamed
+    into place only once complete, so a watcher never sees a partial release.
+    ``version`` must sort after every existing release (see ``version_key``),
+    or the new release would never be the one loaded.
+    """
+    import joblib
+
+    from .ensemble import classifier_forest, isolation_forest
+
+    version = version or time.strftime('%Y%m%d-%H%M%S')
+    root = os.path.join(model_dir, RELEASES_DIR)
+    os.makedirs(root, exist_ok=True)
+    final_path = os.path.join(root, version)
+    if os.path.exists(final_path):
+        raise FileExistsError(f"Release {version} already exists")
+    latest = latest_release(model_dir)
+    if latest is not None and version_key(version) <= version_key(latest):
+        raise ValueError(f"Release {version} would sort before the latest release, {latest}")
+
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=root)
+    artifacts = {'model': model, 'label_encoder': label_encoder, 'anomaly_model': anomaly_model,
+                 'forest': classifier_forest(model), 'anomaly_forest': isolation_forest(anomaly_model)}
+    for name, obj in artifacts.items():
+        if obj is not None:
+            joblib.dump(obj, os.path.join(staging, f"{ARTIFACTS[name]}.joblib"))
+    for name, document in ((FEATURE_SPEC, feature_spec), (CALIBRATION, calibration)):
+        if document is not None:
+            with open(os.path.join(staging, name), 'w') as f:
+                json.dump(document, f, indent=2)
+    os.rename(staging, final_path)
+    return version
+
+
+def load_legacy(model_dir):
+    """The flat pickles (cry_model.pkl etc.) directly in ``model_dir``."""
+    import joblib
+
+    bundle = ModelBundle(feature_spec=_read_json(model_dir, FEATURE_SPEC),
+                         calibration=_read_json(model_dir, CALIBRATION))
+    for name, filename in LEGACY_FILES.items():
+        path = os.path.join(model_dir, filename)
+        if os.path.exists(path):
+            setattr(bundle, name, joblib.load(path))
+    return bundle
+
+
+def load_bundle(model_dir, version=None, mmap=True):
+    """Load a release (the newest by default), else the legacy flat files.
+
+    Release arrays are opened with ``mmap_mode='r'``: the pages are backed by
+    the file, so every worker process shares one copy through the page cache.
+    Legacy pickles may be compressed and are always loaded into memory.
+    """
+    import joblib
+
+    version = version or latest_release(model_dir)
+    if not version:
+        return load_legacy(model_dir)
+
+    release_dir = os.path.join(model_dir, RELEASES_DIR, version)
+    bundle = ModelBundle(version=version, feature_spec=_read_json(release_dir, FEATURE_SPEC),
+                         calibration=_read_json(release_dir, CALIBRATION))
+    for name, stem in ARTIFACTS.items():
+        path = os.path.join(release_dir, f"{stem}.joblib")
+        if os.path.exists(path):
+            setattr(bundle, name, joblib.load(path, mmap_mode='r' if mmap else None))
+    return bundle
@@ -0,0 +1,262 @@
+import atexit
+import base64
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update
+
+from ..extensions import db
+from ..models import CryRecord, IdAllocator
+from .history import history_feed, next_sequence
+from .metrics import metrics
+from .stats import apply_rollups, record_tuples
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = [column.name for column in CryRecord.__table__.columns]
+
+
+def _encode_row(row):
+    return dict(row, timestamp=row["timestamp"].isoformat(),
+                mfcc=base64.b64encode(row["mfcc"]).decode() if row["mfcc"] is not None else None)
+
+
+def _decode_row(row):
+    return dict(row, timestamp=datetime.fromisoformat(row["timestamp"]),
+                mfcc=base64.b64decode(row["mfcc"]) if row["mfcc"] is not None else None)
+
+
+class RecordWriter:
+    """Persists CryRecords, synchronously or write-behind.
+
+    By default ``save`` adds and commits in the caller's session, as the
+    routes always did. With ``WRITE_BEHIND`` records get their id up front
+    from a block reserved in ``id_allocator`` (one round trip per
+    ``ID_BLOCK`` records), go onto a bounded queue and are written by a
+    background thread in multi-row INSERTs of up to ``WRITE_BEHIND_BATCH``
+    rows, or whatever is queued after ``WRITE_BEHIND_INTERVAL`` seconds.
+    The caller gets the final id straight away. When the queue is full,
+    ``save`` writes synchronously instead. On shutdown the queue is drained
+    for up to ``WRITE_BEHIND_DRAIN_TIMEOUT`` seconds; rows that couldn't be
+    written by then (database down) are spilled to
+    ``WRITE_BEHIND_SPILL-<pid>.jsonl`` and queued again by the next
+    process that starts with write-behind.
+
+    Every insert transaction stamps its rows with a ``next_sequence``
+    number, which /logs/stream follows; the rollup rows updated in the same
+    transaction serialize these commits already. Either way the /api/stats
+    rollups are updated in the same transaction.
+
+    Every process should use the same mode: autoincrement inserts don't
+    know about ids reserved by write-behind processes.
+    """
+    _instance = None
+    ID_BLOCK = 1000
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RecordWriter, cls).__new__(cls)
+            cls._instance.app = None
+            cls._instance.write_behind = False
+            cls._instance.batch_size = 200
+            cls._instance.interval = 0.5
+            cls._instance.drain_timeout = 10.0
+            cls._instance.spill_prefix = 'write_behind_spill'
+            cls._instance._queue = None
+            cls._instance._writer = None
+            cls._instance._ids = iter(())
+            cls._instance._id_lock = threading.Lock()
+            cls._instance._stopping = threading.Event()
+            cls._instance._abandon = threading.Event()
+        return cls._instance
+
+    def init_app(self, app):
+        self.app = app
+        self.write_behind = app.config.get('WRITE_BEHIND', False)
+        self.batch_size = app.config.get('WRITE_BEHIND_BATCH', 200)
+        self.interval = app.config.get('WRITE_BEHIND_INTERVAL', 0.5)
+        self.drain_timeout = app.config.get('WRITE_BEHIND_DRAIN_TIMEOUT', 10.0)
+        self.spill_prefix = app.config.get('WRITE_BEHIND_SPILL', 'write_behind_spill')
+
+        if self.write_behind and self._writer is None:
+            self._queue = queue.Queue(maxsize=app.config.get('WRITE_BEHIND_QUEUE', 10000))
+            self._stopping.clear()
+            self._abandon.clear()
+            self._writer = threading.Thread(target=self._write_loop, name='cry2care-record-writer', daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+            self._replay_spills()
+
+    def save(self, records):
+        """Persist ``records`` (new CryRecords); their ids are set on return."""
+        if not records:
+            return records
+        if not self.write_behind or self._writer is None:
+            with metrics.timer('db_commit'):
+                seq = next_sequence(db.session.connection())
+                for record in records:
+                    record.seq = seq
+                db.session.add_all(records)
+                db.session.flush()
+                apply_rollups(db.session.connection(), record_tuples(records))
+                db.session.commit()
+            history_feed.notify()
+            return records
+
+        now = datetime.utcnow()
+        rows = []
+        for record in records:
+            record.id = self._next_id()
+            record.timestamp = record.timestamp or now
+            rows.append({name: getattr(record, name) for name in COLUMNS})
+        for i, row in enumerate(rows):
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                # Backlogged: don't grow without bound, pay for these inline
+                self._insert(rows[i:])
+                history_feed.notify()
+                break
+        return records
+
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is in the database."""
+        if self._queue is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=None):
+        """Stop the writer after it has written the queue out.
+
+        Gives it ``timeout`` seconds (WRITE_BEHIND_DRAIN_TIMEOUT by default);
+        whatever is still unwritten after that is spilled to disk.
+        """
+        if self._writer is None:
+            return
+        timeout = self.drain_timeout if timeout is None else timeout
+        self._stopping.set()
+        self._writer.join(timeout)
+        if self._writer.is_alive():
+            # Stop retrying; the writer spills its batch and the queue
+            self._abandon.set()
+            self._writer.join(timeout)
+            if self._writer.is_alive():
+                logger.error("Write-behind writer still busy after %.0f s; %d queued records not written",
+                             2 * timeout, self.pending())
+        self._writer = None
+
+    def _next_id(self):
+        with self._id_lock:
+            record_id = next(self._ids, None)
+            if record_id is None:
+                start = self._reserve(self.ID_BLOCK)
+                self._ids = iter(range(start + 1, start + self.ID_BLOCK))
+                record_id = start
+            return record_id
+
+    def _reserve(self, count):
+        """First id of a fresh block of ``count``; safe across processes."""
+        table = IdAllocator.__table__
+        key = table.c.name == CryRecord.__tablename__
+        with self.app.app_context(), db.engine.begin() as conn:
+            # The UPDATE takes the row (or SQLite write) lock before anything is read
+            bumped = conn.execute(update(table).where(key).values(next_id=table.c.next_id + count)).rowcount
+            floor = (conn.execute(select(func.max(CryRecord.id))).scalar() or 0) + 1
+            if not bumped:
+                conn.execute(insert(table).values(name=CryRecord.__tablename__, next_id=floor + count))
+                return floor
+            start = conn.execute(select(table.c.next_id).where(key)).scalar() - count
+            if start < floor:
+                # Rows were inserted without the allocator; skip past them
+                conn.execute(update(table).where(key).values(next_id=floor + count))
+                start = floor
+            return start
+
+    def _insert(self, rows):
+        with metrics.timer('db_commit'), self.app.app_context(), db.engine.begin() as conn:
+            seq = next_sequence(conn)
+            conn.execute(insert(CryRecord.__table__), [dict(row, seq=seq) for row in rows])
+            apply_rollups(conn, record_tuples(rows))
+
+    def _spill(self, rows):
+        """Keep rows that can't be written for the next process; see ``_replay_spills``."""
+        path = f"{self.spill_prefix}-{os.getpid()}.jsonl"
+        try:
+            with open(path, 'a') as f:
+                for row in rows:
+                    f.write(json.dumps(_encode_row(row)) + '\n')
+            logger.error("Database unavailable at shutdown: %d records spilled to %s", len(rows), path)
+        except OSError as e:
+            logger.error("Could not spill %d unwritten records to %s: %s", len(rows), path, e)
+
+    def _replay_spills(self):
+        """Queue records spilled by earlier processes; each file is claimed by one process."""
+        for path in glob.glob(f"{glob.escape(self.spill_prefix)}-*.jsonl"):
+            claimed = f"{path}.{os.getpid()}.replay"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed) as f:
+                rows = [_decode_row(json.loads(line)) for line in f if line.strip()]
+            for row in rows:
+                self._queue.put(row)
+            os.remove(claimed)
+            logger.info("Queued %d records spilled to %s", len(rows), path)
+
+    def _write_loop(self):
+        backoff = 0.5
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            if not batch:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            while True:
+                try:
+                    self._insert(batch)
+                    break
+                except Exception as e:
+                    # Keep the rows; the bounded queue pushes back on callers meanwhile
+                    metrics.inc('cry2care_errors_total', kind='db_write')
+                    logger.warning("Write-behind flush of %d records failed: %s", len(batch), e)
+                    if self._abandon.wait(backoff):
+                        self._spill(batch + self._drain())
+                        return
+                    backoff = min(backoff * 2, 30)
+            backoff = 0.5
+            history_feed.notify()
+            for _ in batch:
+                self._queue.task_done()
+
+    def _drain(self):
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+
+record_writer = RecordWriter()
@@ -0,0 +1,338 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import soundfile as sf
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, inspect, select, update
+
+from ..extensions import db
+from ..models import CryRecord
+from .metrics import metrics
+from .history import next_sequence
+
+logger = logging.getLogger(__name__)
+
+# cry_records rows past RETENTION_ARCHIVE_AFTER_DAYS move to one table per month
+ARCHIVE_PREFIX = 'cry_records_archive_'
+
+# codec -> (container, subtype, extension); FLAC subtypes follow the source
+CODECS = {
+    'flac': ('FLAC', None, '.flac'),
+    'opus': ('OGG', 'OPUS', '.opus'),
+}
+# libsndfile's Opus encoder takes only these rates; other clips go to FLAC
+OPUS_RATES = {8000, 12000, 16000, 24000, 48000}
+FLAC_SUBTYPES = {'PCM_U8': 'PCM_S8', 'PCM_S8': 'PCM_S8', 'PCM_16': 'PCM_16', 'PCM_24': 'PCM_24'}
+
+_archive_metadata = MetaData()
+_archive_lock = threading.Lock()
+
+
+def archive_table(month):
+    """The archive table for ``month`` ('YYYYMM'): cry_records' columns, ids kept."""
+    name = f'{ARCHIVE_PREFIX}{month}'
+    with _archive_lock:
+        table = _archive_metadata.tables.get(name)
+        if table is None:
+            columns = [Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False)
+                       for c in CryRecord.__table__.columns]
+            table = Table(name, _archive_metadata, *columns, Index(f'ix_{name}_timestamp_id', 'timestamp', 'id'))
+        return table
+
+
+def archive_tables(conn):
+    """Archive tables that exist in the database, oldest month first."""
+    names = sorted(name for name in inspect(conn).get_table_names() if name.startswith(ARCHIVE_PREFIX))
+    return [archive_table(name[len(ARCHIVE_PREFIX):]) for name in names]
+
+
+def compressed_path(path, codec='flac'):
+    return os.path.splitext(path)[0] + CODECS[codec][2]
+
+
+def resolve_clip(path):
+    """``path``, or the compressed copy that replaced it since it was stored; None once deleted."""
+    if path is None or os.path.exists(path):
+        return path
+    for codec in CODECS:
+        candidate = compressed_path(path, codec)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def compress(path, codec='flac'):
+    """Re-encode a PCM WAV clip next to itself; returns the new path, or None for other files.
+
+    Integer PCM up to 24 bits goes to FLAC losslessly; float WAVs are stored
+    as 24-bit. 32-bit PCM doesn't fit FLAC and is left as it is (None). The
+    copy keeps the original's mtime; the original is left in place for
+    the caller to remove once the database points at the copy.
+    """
+    info = sf.info(path)
+    if info.format != 'WAV':
+        return None
+    if codec == 'opus' and info.samplerate not in OPUS_RATES:
+        codec = 'flac'
+    container, subtype, _ = CODECS[codec]
+    if container == 'FLAC':
+        if info.subtype == 'PCM_32':
+            return None
+        subtype = FLAC_SUBTYPES.get(info.subtype, 'PCM_24')
+
+    target = compressed_path(path, codec)
+    # PCM read as int32 is an exact shift, so FLAC gets the original samples back
+    data, sr = sf.read(path, dtype='int32' if info.subtype in FLAC_SUBTYPES else 'float32', always_2d=True)
+    partial = f"{target}.{os.getpid()}.part"
+    sf.write(partial, data, sr, format=container, subtype=subtype)
+    # Keep the clip's age, which the delete policy goes by
+    stat = os.stat(path)
+    os.utime(partial, (stat.st_atime, stat.st_mtime))
+    os.replace(partial, target)
+    return target
+
+
+class RetentionManager:
+    """Ages out uploaded clips and old cry_records on a schedule.
+
+    Each run, oldest policy first:
+
+    - clips of records older than RETENTION_DELETE_AFTER_DAYS are deleted
+      and their ``file_path`` cleared;
+    - WAV clips older than RETENTION_COMPRESS_AFTER_DAYS are re-encoded
+      with RETENTION_CODEC (lossless FLAC by default) and ``file_path``
+      repointed at the copy;
+    - records older than RETENTION_ARCHIVE_AFTER_DAYS move from
+      cry_records into ``cry_records_archive_YYYYMM`` tables, which keeps
+      the table behind /logs small. The /api/stats rollups still count them.
+
+    A 0 disables a policy. Cache hits store an existing clip's path on new
+    records, so a clip is handled as a whole: ``file_path`` is updated on
+    every record holding it, in every table, in the same transaction as
+    the file change and before the old file is removed, so a crash can
+    leave a stray file but never a dangling reference. A clip is only
+    deleted once every record holding it is past the delete cutoff, and
+    one whose file is newer than the cutoff (re-uploaded under the same
+    name) is left alone. Work is done in batches of
+    RETENTION_BATCH rows, so runs never hold long locks.
+
+    With RETENTION_INTERVAL set, a background thread runs it every that
+    many seconds; enable it in one process only. ``run`` can also be
+    called directly (see run_retention.py).
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RetentionManager, cls).__new__(cls)
+            cls._instance.app = None
+            cls._instance.interval = 0
+            cls._instance.compress_after = 7.0
+            cls._instance.delete_after = 0.0
+            cls._instance.archive_after = 0.0
+            cls._instance.codec = 'flac'
+            cls._instance.batch_size = 500
+            cls._instance.last_run = None
+            cls._instance._run_lock = threading.Lock()
+            cls._instance._thread = None
+        return cls._instance
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('RETENTION_INTERVAL', 0)
+        self.compress_after = app.config.get('RETENTION_COMPRESS_AFTER_DAYS', 7.0)
+        self.delete_after = app.config.get('RETENTION_DELETE_AFTER_DAYS', 0.0)
+        self.archive_after = app.config.get('RETENTION_ARCHIVE_AFTER_DAYS', 0.0)
+        self.codec = app.config.get('RETENTION_CODEC', 'flac').lower()
+        self.batch_size = app.config.get('RETENTION_BATCH', 500)
+        if self.codec not in CODECS:
+            raise ValueError(f"RETENTION_CODEC must be one of {', '.join(CODECS)}")
+
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='cry2care-retention', daemon=True)
+            self._thread.start()
+
+    def status(self):
+        return {
+            "interval": self.interval,
+            "compress_after_days": self.compress_after,
+            "delete_after_days": self.delete_after,
+            "archive_after_days": self.archive_after,
+            "codec": self.codec,
+            "last_run": self.last_run,
+        }
+
+    def run(self, now=None):
+        """One pass of every enabled policy; returns what it did."""
+        now = now or datetime.utcnow()
+        report = {"started": now.isoformat(timespec='seconds'), "compressed": 0, "deleted": 0, "missing": 0,
+                  "skipped": 0, "bytes_reclaimed": 0, "records_archived": 0}
+        started = time.perf_counter()
+        with self._run_lock, self.app.app_context():
+            try:
+                if self.delete_after > 0:
+                    self._age_clips(now - timedelta(days=self.delete_after), self._delete_clip, report,
+                                    keep_in_use=True)
+                if self.compress_after > 0:
+                    self._age_clips(now - timedelta(days=self.compress_after), self._compress_clip, report,
+                                    wav_only=True)
+                if self.archive_after > 0:
+                    report["records_archived"] = self._archive(now - timedelta(days=self.archive_after))
+            finally:
+                report["seconds"] = round(time.perf_counter() - started, 3)
+                metrics.observe('cry2care_retention_run_seconds', report["seconds"])
+                metrics.inc('cry2care_retention_bytes_reclaimed_total', report["bytes_reclaimed"])
+                metrics.inc('cry2care_retention_records_archived_total', report["records_archived"])
+                for action in ("compressed", "deleted", "missing"):
+                    if report[action]:
+                        metrics.inc('cry2care_retention_files_total', report[action], action=action)
+                self.last_run = report
+        logger.info("Retention run: %s", report)
+        return report
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run()
+            except Exception:
+                metrics.inc('cry2care_errors_total', kind='retention')
+                logger.exception("Retention run failed")
+
+    def _age_clips(self, cutoff, action, report, wav_only=False, keep_in_use=False):
+        """Apply ``action`` to the clips of records older than ``cutoff``, in every table.
+
+        With ``keep_in_use``, clips that a record newer than ``cutoff`` also
+        holds are skipped.
+        """
+        # Record timestamps are naive UTC
+        oldest_mtime = cutoff.replace(tzinfo=timezone.utc).timestamp()
+        with db.engine.connect() as conn:
+            tables = [CryRecord.__table__] + archive_tables(conn)
+        for table in tables:
+            conditions = [table.c.timestamp < cutoff, table.c.file_path.is_not(None)]
+            if wav_only:
+                conditions.append(func.lower(table.c.file_path).like('%.wav'))
+            last = 0
+            while True:
+                with db.engine.connect() as conn:
+                    rows = conn.execute(select(table.c.id, table.c.file_path)
+                                        .where(table.c.id > last, *conditions)
+                                        .order_by(table.c.id).limit(self.batch_size)).all()
+                if not rows:
+                    break
+                last = rows[-1].id
+                self._apply(tables, {row.file_path for row in rows}, action, cutoff if keep_in_use else None,
+                            oldest_mtime, report)
+
+    def _apply(self, tables, paths, action, in_use_after, oldest_mtime, report):
+        # Every record holding these clips, not just the aged ones
+        holders = defaultdict(list)
+        with db.engine.connect() as conn:
+            for table in tables:
+                for row in conn.execute(select(table.c.id, table.c.file_path, table.c.timestamp)
+                                        .where(table.c.file_path.in_(paths))):
+                    holders[row.file_path].append((table.name, row.id, row.timestamp))
+
+        relinks, removals = defaultdict(list), []
+        for path in sorted(paths):
+            try:
+                if in_use_after is not None and any(ts >= in_use_after for _, _, ts in holders[path]):
+                    report["skipped"] += 1
+                    continue
+                if os.path.exists(path) and os.path.getmtime(path) >= oldest_mtime:
+                    report["skipped"] += 1
+                    continue
+                outcome = action(path, report)
+            except (OSError, RuntimeError) as e:
+                metrics.inc('cry2care_errors_total', kind='retention')
+                logger.warning("Retention skipped %s: %s", path, e)
+                report["skipped"] += 1
+                continue
+            if outcome is False:
+                report["skipped"] += 1
+                continue
+            new_path, remove = outcome
+            for name, row_id, _ in holders[path]:
+                relinks[name, new_path].append(row_id)
+            if remove:
+                removals.append(path)
+
+        if relinks:
+            by_name = {table.name: table for table in tables}
+            with db.engine.begin() as conn:
+                for (name, new_path), ids in relinks.items():
+                    table = by_name[name]
+                    conn.execute(update(table).where(table.c.id.in_(ids)).values(file_path=new_path))
+        for path in removals:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                report["bytes_reclaimed"] += size
+            except FileNotFoundError:
+                pass
+
+    def _delete_clip(self, path, report):
+        """(new file_path, remove the old file?) for a clip past the delete cutoff."""
+        current = resolve_clip(path)
+        if current is None:
+            report["missing"] += 1
+            return None, False
+        report["deleted"] += 1
+        if current != path:
+            # Already compressed under another row; this one just drops its reference
+            return None, False
+        return None, True
+
+    def _compress_clip(self, path, report):
+        if not os.path.exists(path):
+            current = resolve_clip(path)
+            if current is None:
+                report["missing"] += 1
+                return None, False
+            # Compressed through another row holding the same path
+            return current, False
+        target = compress(path, self.codec)
+        if target is None:
+            return False
+        report["compressed"] += 1
+        # The original's size is added back when it's removed
+        report["bytes_reclaimed"] -= os.path.getsize(target)
+        return target, True
+
+    def _archive(self, cutoff):
+        """Move records older than ``cutoff`` into the monthly archive tables."""
+        live = CryRecord.__table__
+        moved = 0
+        while True:
+            with db.engine.begin() as conn:
+                # The newest row always stays so ids keep increasing (SQLite reuses max(id) + 1)
+                newest = conn.execute(select(func.max(live.c.id))).scalar()
+                if newest is None:
+                    return moved
+                rows = conn.execute(select(live).where(live.c.timestamp < cutoff, live.c.id < newest)
+                                    .order_by(live.c.id).limit(self.batch_size)).mappings().all()
+                if not rows:
+                    return moved
+                by_month = defaultdict(list)
+                for row in rows:
+                    by_month[row["timestamp"].strftime('%Y%m')].append(dict(row))
+                # DDL first: MySQL commits implicitly on CREATE TABLE
+                tables = {month: archive_table(month) for month in by_month}
+                for table in tables.values():
+                    table.create(conn, checkfirst=True)
+                for month, batch in by_month.items():
+                    ids = [row["id"] for row in batch]
+                    # Rows left over from an interrupted move are replaced, not duplicated
+                    conn.execute(delete(tables[month]).where(tables[month].c.id.in_(ids)))
+                    conn.execute(insert(tables[month]), batch)
+                conn.execute(delete(live).where(live.c.id.in_([row["id"] for row in rows])))
+                # Changes the /logs ETag
+                next_sequence(conn)
+            moved += len(rows)
+
+
+retention = RetentionManager()
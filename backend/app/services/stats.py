@@ -0,0 +1,197 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from ..extensions import db
+from ..models import CryRecord, CryRollup
+from .retention import archive_tables
+
+GRANULARITIES = ('hour', 'day')
+# Severity is clamped to [0.1, 10]; percentiles are interpolated within a bin
+SEVERITY_BIN = 0.25
+SEVERITY_BINS = 40
+DEFAULT_DAYS = 30
+
+
+class StatsQueryError(ValueError):
+    """Bad /api/stats parameters; the route answers 400."""
+
+
+def bucket_start(timestamp, granularity):
+    if granularity == 'day':
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def severity_bin(severity):
+    return min(max(int((severity or 0.0) / SEVERITY_BIN), 0), SEVERITY_BINS - 1)
+
+
+def _increments(records):
+    """Rollup deltas for ``records``: (timestamp, cause, severity, confidence) tuples."""
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    for timestamp, cause, severity, confidence in records:
+        bin_ = severity_bin(severity)
+        for granularity in GRANULARITIES:
+            entry = totals[(granularity, bucket_start(timestamp, granularity), cause, bin_)]
+            entry[0] += 1
+            entry[1] += severity or 0.0
+            entry[2] += confidence or 0.0
+    # Sorted so concurrent writers lock rollup rows in the same order
+    return [{"granularity": key[0], "bucket": key[1], "cause": key[2], "severity_bin": key[3],
+             "count": count, "severity_sum": severity_sum, "confidence_sum": confidence_sum}
+            for key, (count, severity_sum, confidence_sum) in sorted(totals.items())]
+
+
+def apply_rollups(conn, records):
+    """Add ``records`` to the rollups inside the caller's transaction.
+
+    One upsert per touched (bucket, cause, bin) row; the database adds the
+    deltas, so concurrent writers in any number of processes don't lose
+    counts.
+    """
+    rows = _increments(records)
+    if not rows:
+        return
+    table = CryRollup.__table__
+    dialect = conn.dialect.name
+    if dialect == 'mysql':
+        statement = mysql.insert(table)
+        statement = statement.on_duplicate_key_update(
+            count=table.c.count + statement.inserted.count,
+            severity_sum=table.c.severity_sum + statement.inserted.severity_sum,
+            confidence_sum=table.c.confidence_sum + statement.inserted.confidence_sum)
+        conn.execute(statement, rows)
+    elif dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite if dialect == 'sqlite' else postgresql).insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[c.name for c in table.primary_key],
+            set_={"count": table.c.count + statement.excluded.count,
+                  "severity_sum": table.c.severity_sum + statement.excluded.severity_sum,
+                  "confidence_sum": table.c.confidence_sum + statement.excluded.confidence_sum})
+        conn.execute(statement, rows)
+    else:
+        # database.configure refuses other backends at startup
+        raise ValueError(f"No rollup upsert for {dialect}")
+
+
+def record_tuples(records):
+    """(timestamp, cause, severity, confidence) from CryRecords or row dicts."""
+    if records and isinstance(records[0], dict):
+        return [(r["timestamp"], r["cause"], r["severity"], r["confidence"]) for r in records]
+    return [(r.timestamp, r.cause, r.severity, r.confidence) for r in records]
+
+
+def rebuild_rollups(conn, chunk=50000):
+    """Recompute every rollup row from cry_records and its archive tables; returns the rows scanned."""
+    conn.execute(delete(CryRollup.__table__))
+    scanned = 0
+    for table in [CryRecord.__table__] + archive_tables(conn):
+        columns = (table.c.id, table.c.timestamp, table.c.cause, table.c.severity, table.c.confidence)
+        last = 0
+        while True:
+            rows = conn.execute(select(*columns).where(table.c.id > last).order_by(table.c.id).limit(chunk)).all()
+            if not rows:
+                break
+            apply_rollups(conn, [row[1:] for row in rows])
+            last = rows[-1].id
+            scanned += len(rows)
+    return scanned
+
+
+def _parse_time(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise StatsQueryError(f"{name} must be an ISO 8601 timestamp") from e
+
+
+def parse_query(args, now=None):
+    """Validate request args into keyword arguments for ``summary``."""
+    now = now or datetime.utcnow()
+    until = _parse_time(args['until'], 'until') if args.get('until') else now
+    since = _parse_time(args['since'], 'since') if args.get('since') else until - timedelta(days=DEFAULT_DAYS)
+    if since >= until:
+        raise StatsQueryError("since must be before until")
+    granularity = args.get('granularity') or ('hour' if until - since <= timedelta(days=3) else 'day')
+    if granularity not in GRANULARITIES:
+        raise StatsQueryError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    causes = [c for value in args.getlist('cause') for c in value.split(',') if c]
+    return {"since": since, "until": until, "granularity": granularity, "causes": causes or None}
+
+
+def _percentiles(histogram, quantiles):
+    """Quantiles of severity from bin counts, linear within each bin."""
+    total = histogram.sum()
+    if not total:
+        return {f"p{int(q * 100)}": None for q in quantiles}
+    cumulative = np.cumsum(histogram)
+    result = {}
+    for q in quantiles:
+        target = q * total
+        i = int(np.searchsorted(cumulative, target))
+        below = cumulative[i - 1] if i else 0
+        fraction = (target - below) / histogram[i] if histogram[i] else 0.0
+        result[f"p{int(q * 100)}"] = round(float((i + fraction) * SEVERITY_BIN), 2)
+    return result
+
+
+def summary(since, until, granularity='day', causes=None):
+    """Cause counts, severity stats and a time series from the rollups.
+
+    Buckets are whole hours or days, so the range is widened to bucket
+    boundaries.
+    """
+    conditions = [CryRollup.granularity == granularity,
+                  CryRollup.bucket >= bucket_start(since, granularity),
+                  CryRollup.bucket < until]
+    if causes:
+        conditions.append(CryRollup.cause.in_(causes))
+    rows = db.session.execute(
+        select(CryRollup.bucket, CryRollup.cause, CryRollup.severity_bin,
+               func.sum(CryRollup.count), func.sum(CryRollup.severity_sum), func.sum(CryRollup.confidence_sum))
+        .where(*conditions)
+        .group_by(CryRollup.bucket, CryRollup.cause, CryRollup.severity_bin)).all()
+
+    histogram = np.zeros(SEVERITY_BINS, dtype=np.int64)
+    per_cause = defaultdict(lambda: [0, 0.0, 0.0])
+    series = defaultdict(lambda: {"count": 0, "severity_sum": 0.0, "causes": defaultdict(int)})
+    for bucket, cause, bin_, count, severity_sum, confidence_sum in rows:
+        count = int(count)
+        histogram[bin_] += count
+        totals = per_cause[cause]
+        totals[0] += count
+        totals[1] += severity_sum
+        totals[2] += confidence_sum
+        point = series[bucket]
+        point["count"] += count
+        point["severity_sum"] += severity_sum
+        point["causes"][cause] += count
+
+    total = int(histogram.sum())
+    severity_sum = sum(t[1] for t in per_cause.values())
+    return {
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "granularity": granularity,
+        "total": total,
+        "causes": {
+            cause: {
+                "count": count,
+                "share": round(count / total, 4),
+                "mean_severity": round(s_sum / count, 2),
+                "mean_confidence": round(c_sum / count, 4),
+            } for cause, (count, s_sum, c_sum) in sorted(per_cause.items(), key=lambda item: -item[1][0])
+        },
+        "severity": dict(mean=round(severity_sum / total, 2) if total else None,
+                         **_percentiles(histogram, (0.5, 0.9, 0.99))),
+        "series": [
+            {"bucket": bucket.isoformat(), "count": point["count"],
+             "mean_severity": round(point["severity_sum"] / point["count"], 2),
+             "causes": dict(point["causes"])}
+            for bucket, point in sorted(series.items())
+        ],
+    }
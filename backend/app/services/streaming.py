@@ -0,0 +1,164 @@
+import numpy as np
+
+from .features import (
+    AMIN, HOP_LENGTH, N_FFT, N_MELS, N_MFCC, TOP_DB, ZC_THRESHOLD,
+    _dct_matrix, _fft_frequencies, _mel_basis, _window
+)
+
+MODEL_SR = 22050
+
+
+class StreamSession:
+    """Incremental cry detector for one live PCM stream.
+
+    Each chunk is appended to a small carry-over buffer that never holds more
+    than one frame plus the newest chunk. Every complete hop is analysed once:
+    its RMS, ZCR, centroid and log-mel energies are added to running sums for
+    the current segment, so nothing is ever reprocessed. A segment opens when
+    a frame's RMS crosses ``rms_threshold`` and closes after ``hangover``
+    seconds of quiet (or once it spans ``max_duration``); the means over its
+    active frames are then classified and returned as an event running from
+    the first active frame to the last.
+
+    Unlike the whole-clip extractor, the 80 dB log-mel floor is applied
+    against the segment's running maximum, and frames are not centre-padded.
+    """
+
+    def __init__(self, sample_rate=MODEL_SR, sample_format='int16', classify=None,
+                 rms_threshold=0.01, hangover=0.3, min_duration=0.3, max_duration=10.0):
+        if sample_format not in ('int16', 'float32'):
+            raise ValueError(f"Unsupported sample format: {sample_format}")
+        self.sample_rate = sample_rate
+        self.sample_format = sample_format
+        self.classify = classify
+        self.rms_threshold = rms_threshold
+        self.hangover_frames = max(1, int(round(hangover * MODEL_SR / HOP_LENGTH)))
+        self.min_frames = max(1, int(round(min_duration * MODEL_SR / HOP_LENGTH)))
+        self.max_frames = max(self.min_frames, int(round(max_duration * MODEL_SR / HOP_LENGTH)))
+
+        self._resampler = None
+        if sample_rate != MODEL_SR:
+            import soxr
+            self._resampler = soxr.ResampleStream(sample_rate, MODEL_SR, 1, dtype='float32')
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        # Trailing bytes of a sample split across chunks
+        self._partial = b''
+        self._frame_index = 0
+        self._reset_segment()
+
+    @property
+    def position(self):
+        """Seconds of audio analysed so far (at the model's sample rate)."""
+        return self._frame_index * HOP_LENGTH / MODEL_SR
+
+    def _reset_segment(self):
+        self._in_segment = False
+        self._start_frame = 0
+        # Frame index just past the last active frame; quiet frames inside the hangover still count
+        self._end_frame = 0
+        self._frames = 0
+        self._quiet = 0
+        self._sum_rms = 0.0
+        self._sum_zcr = 0.0
+        self._sum_sc = 0.0
+        self._sum_mel = np.zeros(N_MELS, dtype=np.float64)
+        self._max_mel = -np.inf
+
+    def _decode(self, chunk):
+        width = 2 if self.sample_format == 'int16' else 4
+        chunk = self._partial + bytes(chunk)
+        whole = len(chunk) - len(chunk) % width
+        chunk, self._partial = chunk[:whole], chunk[whole:]
+        if self.sample_format == 'int16':
+            samples = np.frombuffer(chunk, dtype='<i2').astype(np.float32) / 32768.0
+        else:
+            samples = np.frombuffer(chunk, dtype='<f4').astype(np.float32)
+        if self._resampler is not None:
+            samples = self._resampler.resample_chunk(samples)
+        return samples
+
+    def feed(self, chunk):
+        """Consume raw little-endian PCM bytes; return any finished segments."""
+        data = np.concatenate((self._pending, self._decode(chunk)))
+        if len(data) < N_FFT:
+            self._pending = data
+            return []
+
+        n_frames = 1 + (len(data) - N_FFT) // HOP_LENGTH
+        frames = np.lib.stride_tricks.sliding_window_view(data, N_FFT)[::HOP_LENGTH][:n_frames]
+        self._pending = data[n_frames * HOP_LENGTH:].copy()
+
+        # Vectorised per-hop features for every new frame in this chunk
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        signs = np.signbit(np.where(np.abs(frames) <= ZC_THRESHOLD, 0.0, frames))
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / N_FFT
+
+        magnitude = np.abs(np.fft.rfft(frames * _window(N_FFT), axis=-1))
+        total = magnitude.sum(axis=1)
+        weighted = magnitude @ _fft_frequencies(MODEL_SR, N_FFT)
+        sc = np.divide(weighted, total, out=np.zeros_like(weighted), where=total > 0)
+        log_mel = 10.0 * np.log10(np.maximum(np.square(magnitude) @ _mel_basis(MODEL_SR, N_FFT, N_MELS).T, AMIN))
+
+        events = []
+        for i in range(n_frames):
+            event = self._step(rms[i], zcr[i], sc[i], log_mel[i])
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self):
+        """End of stream: close any open segment."""
+        if self._in_segment:
+            event = self._finish()
+            return [event] if event is not None else []
+        return []
+
+    def _step(self, rms, zcr, sc, log_mel):
+        self._frame_index += 1
+        active = rms >= self.rms_threshold
+
+        if not self._in_segment:
+            if not active:
+                return None
+            self._in_segment = True
+            self._start_frame = self._frame_index - 1
+
+        if active:
+            self._quiet = 0
+            self._max_mel = max(self._max_mel, float(log_mel.max()))
+            self._sum_rms += rms
+            self._sum_zcr += zcr
+            self._sum_sc += sc
+            self._sum_mel += np.maximum(log_mel, self._max_mel - TOP_DB)
+            self._frames += 1
+            self._end_frame = self._frame_index
+        else:
+            self._quiet += 1
+
+        if self._quiet >= self.hangover_frames or self._frame_index - self._start_frame >= self.max_frames:
+            return self._finish()
+        return None
+
+    def _finish(self):
+        frames = self._frames
+        start = self._start_frame * HOP_LENGTH / MODEL_SR
+        end = self._end_frame * HOP_LENGTH / MODEL_SR
+        features = None
+        if frames >= self.min_frames:
+            features = {
+                "rms": self._sum_rms / frames,
+                "zcr": self._sum_zcr / frames,
+                "sc": self._sum_sc / frames,
+                "mfcc": _dct_matrix(N_MFCC, N_MELS) @ (self._sum_mel / frames).astype(np.float32),
+            }
+        self._reset_segment()
+        if features is None:
+            return None
+
+        event = {"event": "cry", "start": round(start, 3), "end": round(end, 3), "detected_at": round(self.position, 3)}
+        if self.classify is not None:
+            event.update(self.classify(features))
+        else:
+            event["vitals"] = {"rms": features["rms"], "zcr": features["zcr"], "sc": features["sc"]}
+        return event
@@ -0,0 +1,133 @@
+import atexit
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import uuid
+
+from werkzeug.utils import secure_filename
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StagedUpload:
+    """An upload ready for analysis.
+
+    ``source`` is what the decoder reads: in-memory bytes or a path.
+    ``file_path`` is what gets stored on the CryRecord (None if the clip
+    isn't retained) and ``temp_path`` is a spool file to remove afterwards.
+    """
+
+    def __init__(self, source, file_path=None, temp_path=None):
+        self.source = source
+        self.file_path = file_path
+        self.temp_path = temp_path
+
+    def cleanup(self):
+        if self.temp_path and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+            self.temp_path = None
+
+
+class UploadStager:
+    """Turns request uploads into decoder input.
+
+    ``disk`` mode saves every upload to ``UPLOAD_FOLDER`` and decodes from
+    there. ``memory`` mode decodes straight from the request buffer: clips up
+    to ``UPLOAD_SPOOL_THRESHOLD`` bytes stay in memory and larger ones spool
+    to a temp file. With ``ARCHIVE_UPLOADS`` the in-memory bytes are written
+    to ``UPLOAD_FOLDER`` by a background thread instead of on the request path.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(UploadStager, cls).__new__(cls)
+            cls._instance.mode = 'disk'
+            cls._instance.folder = 'uploads'
+            cls._instance.spool_threshold = 8 * 1024 * 1024
+            cls._instance.archive = True
+            cls._instance._queue = None
+            cls._instance._writer = None
+        return cls._instance
+
+    def init_app(self, app):
+        self.mode = app.config.get('UPLOAD_STORAGE', 'disk')
+        self.folder = app.config.get('UPLOAD_FOLDER', 'uploads')
+        self.spool_threshold = app.config.get('UPLOAD_SPOOL_THRESHOLD', self.spool_threshold)
+        self.archive = app.config.get('ARCHIVE_UPLOADS', True)
+        os.makedirs(self.folder, exist_ok=True)
+
+        if self.mode == 'memory' and self.archive and self._writer is None:
+            self._queue = queue.Queue(maxsize=app.config.get('ARCHIVE_QUEUE_SIZE', 256))
+            self._writer = threading.Thread(target=self._write_loop, name='cry2care-archiver', daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
+    def stage(self, file):
+        """Prepare a werkzeug FileStorage for analysis."""
+        with metrics.timer('upload_save'):
+            return self._stage(file)
+
+    def _stage(self, file):
+        filename = secure_filename(file.filename)
+        if self.mode != 'memory':
+            # Unique per upload: concurrent jobs for the same name (e.g. mic.wav) must not share a file
+            file_path = self._archive_path(filename)
+            file.save(file_path)
+            return StagedUpload(file_path, file_path)
+
+        # Read up to the threshold; anything bigger goes to a file instead
+        head = file.stream.read(self.spool_threshold + 1)
+        if len(head) <= self.spool_threshold:
+            file_path = None
+            if self.archive:
+                file_path = self._archive_path(filename)
+                self._queue.put((file_path, head))
+            return StagedUpload(head, file_path)
+
+        if self.archive:
+            # It has to hit the disk anyway, so spool straight into the archive
+            file_path = self._archive_path(filename)
+            self._spool(head, file.stream, file_path)
+            return StagedUpload(file_path, file_path)
+
+        fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1], prefix='cry2care-')
+        os.close(fd)
+        self._spool(head, file.stream, temp_path)
+        return StagedUpload(temp_path, temp_path=temp_path)
+
+    def _archive_path(self, filename):
+        # Unique names: retained clips must never overwrite each other
+        return os.path.join(self.folder, f"{uuid.uuid4().hex[:12]}-{filename}")
+
+    def _spool(self, head, stream, path):
+        with open(path, 'wb') as f:
+            f.write(head)
+            shutil.copyfileobj(stream, f)
+
+    def _write_loop(self):
+        while True:
+            file_path, data = self._queue.get()
+            try:
+                tmp_path = f"{file_path}.part"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, file_path)
+            except OSError as e:
+                metrics.inc('cry2care_errors_total', kind='upload_archive')
+                logger.error("Failed to archive %s: %s", file_path, e)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued clip has been written."""
+        if self._queue is not None:
+            self._queue.join()
+
+
+upload_stager = UploadStager()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from .features import HOP_LENGTH, feature_engine
+
+# Defaults for split(); AIService takes them from the VAD_* settings, training.pipeline --vad uses them as is
+TOP_DB = 40.0
+RMS_FLOOR = 1e-3
+MAX_ZCR = 0.35
+HANGOVER = 0.3
+MIN_DURATION = 0.3
+
+
+def active_frames(rms, zcr, top_db=TOP_DB, rms_floor=RMS_FLOOR, max_zcr=MAX_ZCR):
+    """Frames that look like a cry: loud relative to the clip and not noise-like.
+
+    Loudness is judged against the clip's loudest frame (like
+    librosa.effects.split) so recording gain doesn't matter; ``rms_floor``
+    keeps near-silent clips from counting their own hiss as a peak. Broadband
+    noise crosses zero far more often than a voiced cry, so frames above
+    ``max_zcr`` are dropped.
+    """
+    if not len(rms):
+        return np.zeros(0, dtype=bool)
+    threshold = max(float(rms.max()) * 10 ** (-top_db / 20), rms_floor)
+    return (rms >= threshold) & (zcr <= max_zcr)
+
+
+def segments_from_frames(active, sr, n_samples, hangover=HANGOVER, min_duration=MIN_DURATION,
+                         hop_length=HOP_LENGTH):
+    """(start, end) sample ranges of the active runs.
+
+    Runs separated by less than ``hangover`` seconds are merged (breaths
+    between sobs) and runs shorter than ``min_duration`` are dropped.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    runs = edges.reshape(-1, 2)
+    if not len(runs):
+        return []
+
+    max_gap = hangover * sr / hop_length
+    merged = [list(runs[0])]
+    for start, end in runs[1:]:
+        if start - merged[-1][1] < max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    min_frames = min_duration * sr / hop_length
+    return [(int(start * hop_length), int(min(end * hop_length, n_samples)))
+            for start, end in merged if end - start >= min_frames]
+
+
+def split(audio, sr, top_db=TOP_DB, rms_floor=RMS_FLOOR, max_zcr=MAX_ZCR,
+          hangover=HANGOVER, min_duration=MIN_DURATION):
+    """Cry segments of a decoded clip as (start, end) sample ranges.
+
+    Only the time-domain RMS and ZCR are computed here, so finding the
+    segments costs a small fraction of a full feature extraction.
+    """
+    rms, zcr = feature_engine.frame_vitals(audio)
+    active = active_frames(rms, zcr, top_db, rms_floor, max_zcr)
+    return segments_from_frames(active, sr, len(audio), hangover, min_duration)
+
+
+def pool(audio, sr, ranges):
+    """(segments, clip features) for the ``ranges`` found by ``split``.
+
+    ``segments`` lists (start, end, features) in seconds; the clip features
+    are the segments' duration-weighted means. With no ranges the whole clip
+    is extracted and ``segments`` is empty.
+    """
+    if not ranges:
+        return [], feature_engine.extract(audio, sr)
+    segments = [(start / sr, end / sr, feature_engine.extract(audio[start:end], sr)) for start, end in ranges]
+    weights = np.array([end - start for start, end in ranges], dtype=np.float64)
+    weights /= weights.sum()
+    pooled = {key: float(sum(w * f[key] for w, (_, _, f) in zip(weights, segments)))
+              for key in ("rms", "zcr", "sc")}
+    pooled["mfcc"] = (weights @ np.stack([f["mfcc"] for _, _, f in segments])).astype(np.float32)
+    return segments, pooled
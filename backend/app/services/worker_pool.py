@@ -0,0 +1,107 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .metrics import metrics
+
+
+class PoolFullError(Exception):
+    """Raised when every worker is busy and the wait queue is at capacity."""
+
+    def __init__(self, retry_after):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+def _init_worker(model_dir, settings, log_level):
+    """Runs once in each worker process: load and warm the models before any job."""
+    from . import logs
+    from .ai_service import ai_service
+    logs.setup(log_level)
+    for name, value in settings.items():
+        setattr(ai_service, name, value)
+    ai_service.warm_up(model_dir)
+
+
+def _call(method, args, kwargs):
+    """Run a job; the worker's stage timings travel back with the result."""
+    from .ai_service import ai_service
+    result = getattr(ai_service, method)(*args, **kwargs)
+    return result, metrics.drain()
+
+
+class InferencePool:
+    """Process pool with a bounded number of in-flight jobs.
+
+    ``workers`` jobs run at once and up to ``queue_depth`` more may wait.
+    Anything beyond that is rejected immediately with PoolFullError so the
+    request thread can answer 503 instead of piling up behind slow clips.
+    """
+
+    def __init__(self, workers, queue_depth, model_dir, settings=None, retry_after=5, log_level='INFO'):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._model_dir = model_dir
+        self._settings = settings or {}
+        self._log_level = log_level
+        self._executor = self._start()
+
+    def _start(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self._model_dir, self._settings, self._log_level)
+        )
+
+    def worker_pids(self):
+        """PIDs of the live worker processes (they're spawned on demand)."""
+        return sorted(self._executor._processes or {})
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def submit(self, method, *args, **kwargs):
+        """Queue ``ai_service.<method>(*args)`` on a worker and return a Future for its result."""
+        if not self._slots.acquire(blocking=False):
+            raise PoolFullError(self.retry_after)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            try:
+                future = self._executor.submit(_call, method, args, kwargs)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM on a huge clip); start a fresh pool
+                self._executor = self._start()
+                future = self._executor.submit(_call, method, args, kwargs)
+        except Exception:
+            self._release()
+            raise
+        outer = Future()
+
+        def finish(inner):
+            self._release()
+            try:
+                result, observed = inner.result()
+            except BaseException as e:
+                outer.set_exception(e)
+                return
+            metrics.merge(observed)
+            outer.set_result(result)
+
+        future.add_done_callback(finish)
+        return outer
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,73 @@
+"""Batched feature extraction throughput: clips/sec at batch sizes 1, 8 and 64.
+
+Decodes dataset clips with the service decoder, trims them to a common
+length, and runs FeatureEngine.extract_batch over them in batches. Each
+batch's output is checked against extracting its clips one at a time.
+
+Usage (from backend/):
+    python benchmarks/bench_batch_features.py [--clips 128] [--seconds 5] [--batch-sizes 1 8 64]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import clip_paths
+
+from app.services.audio import load_audio
+from app.services.features import feature_engine
+
+RTOL = 1e-4
+ATOL = 1e-3
+
+
+def load_batch(clips, seconds):
+    length = int(seconds * 22050)
+    audio = []
+    for path in clip_paths(limit=clips * 2):
+        clip, _ = load_audio(path)
+        if len(clip) >= length:
+            audio.append(clip[:length])
+        if len(audio) == clips:
+            break
+    return np.stack(audio)
+
+
+def check_parity(batch):
+    out = feature_engine.extract_batch(batch, 22050)
+    for i, clip in enumerate(batch):
+        ref = feature_engine.extract(clip, 22050)
+        for key in ('rms', 'zcr', 'sc', 'mfcc'):
+            if not np.allclose(out[key][i], ref[key], rtol=RTOL, atol=ATOL):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clips', type=int, default=128)
+    parser.add_argument('--seconds', type=float, default=5.0, help="Common clip length")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 64])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    audio = load_batch(args.clips, args.seconds)
+    print(f"{len(audio)} clips of {args.seconds:.1f} s")
+    print(f"Parity: {'OK' if check_parity(audio[:8]) else 'MISMATCH'} (batch vs one-at-a-time)")
+
+    print(f"{'batch':>6}{'clips/s':>10}{'ms/clip':>10}")
+    for size in args.batch_sizes:
+        batches = [audio[i:i + size] for i in range(0, len(audio) - size + 1, size)]
+        feature_engine.extract_batch(batches[0], 22050)
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for batch in batches:
+                feature_engine.extract_batch(batch, 22050)
+            best = min(best, time.perf_counter() - start)
+        n = sum(len(batch) for batch in batches)
+        print(f"{size:>6}{n / best:>10.1f}{best / n * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
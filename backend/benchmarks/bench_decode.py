@@ -0,0 +1,84 @@
+"""Decode + resample time per input format over the dataset clips.
+
+Compares the old librosa.load(res_type='kaiser_fast') path with the
+format-aware decoder (services/audio.load_audio) for each resampler.
+
+Usage (from backend/):
+    python benchmarks/bench_decode.py [--per-group 20] [--resamplers kaiser_fast soxr_hq]
+"""
+import argparse
+import glob
+import os
+import time
+import warnings
+from collections import defaultdict
+
+import soundfile as sf
+
+from common import DATASET_DIR
+
+from app.services.audio import load_audio, sniff_format
+
+
+def group_clips(per_group):
+    """Bucket dataset clips by container and native sample rate."""
+    groups = defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(DATASET_DIR, '*', '*'))):
+        with open(path, 'rb') as f:
+            fmt = sniff_format(f.read(16))
+        try:
+            rate = sf.info(path).samplerate
+        except sf.SoundFileError:
+            rate = '?'
+        key = f"{fmt}@{rate}"
+        if len(groups[key]) < per_group:
+            groups[key].append(path)
+    return groups
+
+
+def time_clips(fn, paths):
+    ok, failed = 0, 0
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            fn(path)
+            ok += 1
+        except Exception:
+            failed += 1
+    return (time.perf_counter() - start) / len(paths), ok, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-group', type=int, default=20)
+    parser.add_argument('--resamplers', nargs='+', default=['kaiser_fast', 'soxr_hq'])
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    import librosa
+    paths = {
+        'librosa.load': lambda p: librosa.load(p, res_type='kaiser_fast'),
+    }
+    for res_type in args.resamplers:
+        paths[f'load_audio[{res_type}]'] = lambda p, r=res_type: load_audio(p, res_type=r)
+
+    groups = group_clips(args.per_group)
+    # Warm every path once (imports, numba JIT, filter tables)
+    sample = next(iter(groups.values()))[0]
+    for fn in paths.values():
+        time_clips(fn, [sample])
+
+    header = f"{'format':<14}{'clips':>6}" + "".join(f"{name:>26}" for name in paths)
+    print(header)
+    print('-' * len(header))
+    for key, clips in sorted(groups.items()):
+        row = f"{key:<14}{len(clips):>6}"
+        for fn in paths.values():
+            per_clip, ok, failed = time_clips(fn, clips)
+            note = f" ({failed} failed)" if failed else ""
+            row += f"{per_clip * 1000:>17.2f} ms{note:>7}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Per-request scoring latency: one model vs the full ensemble, sklearn vs EnsembleScorer.
+
+Times classifying one request's feature vector (and a batch) four ways:
+sklearn predict() alone (the old path), sklearn predict_proba() plus the
+IsolationForest's decision_function(), and EnsembleScorer with and without
+the anomaly model. Also checks the scorer matches sklearn exactly.
+
+Usage (from backend/):
+    python benchmarks/bench_ensemble.py [--repeat 200] [--batch 32]
+"""
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+
+from common import BACKEND_DIR, model_dir
+
+from app.services.ensemble import EnsembleScorer, anomaly_features
+from app.services.model_store import load_legacy
+
+
+def anomaly_model(path):
+    """The shipped IsolationForest when present, else one fit on synthetic vitals."""
+    bundle = load_legacy(path)
+    if bundle.anomaly_model is not None:
+        return bundle.anomaly_model
+    shipped = load_legacy(os.path.join(os.path.dirname(BACKEND_DIR), 'Model')).anomaly_model
+    if shipped is not None:
+        return shipped
+    from sklearn.ensemble import IsolationForest
+    return IsolationForest(random_state=0).fit(synthetic_rows(1000)[1])
+
+
+def synthetic_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    features = {
+        "rms": rng.uniform(0.001, 0.1, n),
+        "zcr": rng.uniform(0.05, 0.2, n),
+        "sc": rng.uniform(800, 3000, n),
+        "mfcc": rng.normal(0, 20, (n, 40)),
+    }
+    return features["mfcc"], anomaly_features(features)
+
+
+def per_call_ms(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=32)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    path = model_dir()
+    model = load_legacy(path).model
+    iforest = anomaly_model(path)
+    X, A = synthetic_rows(max(args.batch, 256), seed=1)
+
+    full = EnsembleScorer(model, iforest)
+    single = EnsembleScorer(model)
+    proba_ok = np.allclose(full.predict_proba(X), model.predict_proba(X), atol=1e-9)
+    anomaly_ok = np.allclose(full.anomaly_scores(A), iforest.decision_function(A), atol=1e-9)
+    print(f"Parity: {'OK' if proba_ok and anomaly_ok else 'MISMATCH'} "
+          f"(predict_proba {'ok' if proba_ok else 'differs'}, decision_function {'ok' if anomaly_ok else 'differs'})")
+
+    paths = {
+        'sklearn predict (classifier only)': lambda x, a: model.predict(x),
+        'sklearn predict_proba + iforest': lambda x, a: (model.predict_proba(x), iforest.decision_function(a)),
+        'EnsembleScorer classifier only': lambda x, a: single.score(x),
+        'EnsembleScorer full ensemble': lambda x, a: full.score(x, a),
+    }
+    print(f"{'path':<36}{'1 request':>12}{f'batch {args.batch}':>12}")
+    for name, fn in paths.items():
+        one = per_call_ms(lambda: fn(X[:1], A[:1]), args.repeat)
+        batch = per_call_ms(lambda: fn(X[:args.batch], A[:args.batch]), max(args.repeat // 10, 5))
+        print(f"{name:<36}{one:>9.2f} ms{batch:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Per-clip feature extraction latency: legacy librosa calls vs FeatureEngine.
+
+Also checks that both paths produce the same vectors within tolerance.
+
+Usage (from backend/):
+    python benchmarks/bench_features.py [--limit 50] [--repeat 3]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import librosa
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.features import feature_engine
+
+DATASET_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'dataset', 'Baby Cry Dataset')
+RTOL = 1e-3
+ATOL = 1e-3
+
+
+def legacy_features(audio, sr):
+    """The four independent librosa calls AIService.predict used to make."""
+    return {
+        "rms": float(np.mean(librosa.feature.rms(y=audio))),
+        "zcr": float(np.mean(librosa.feature.zero_crossing_rate(y=audio))),
+        "sc": float(np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr))),
+        "mfcc": np.mean(librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=40).T, axis=0),
+    }
+
+
+def load_clips(limit):
+    paths = sorted(glob.glob(os.path.join(DATASET_DIR, '*', '*.wav')))
+    if not paths:
+        # No dataset checked out: fall back to synthetic 7 s clips
+        rng = np.random.default_rng(0)
+        t = np.arange(7 * 22050) / 22050
+        return [(np.sin(2 * np.pi * (400 + 40 * i) * t) * 0.1 + rng.normal(0, 0.01, t.size)).astype(np.float32)
+                for i in range(limit)], 22050
+    step = max(1, len(paths) // limit)
+    clips = [librosa.load(p, res_type='kaiser_fast')[0] for p in paths[::step][:limit]]
+    return clips, 22050
+
+
+def time_per_clip(fn, clips, sr, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for clip in clips:
+            fn(clip, sr)
+        best = min(best, (time.perf_counter() - start) / len(clips))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    clips, sr = load_clips(args.limit)
+    print(f"Clips: {len(clips)}, mean duration {np.mean([len(c) for c in clips]) / sr:.2f}s")
+
+    # Parity check before timing anything
+    for clip in clips:
+        ref, out = legacy_features(clip, sr), feature_engine.extract(clip, sr)
+        for key in ref:
+            if not np.allclose(out[key], ref[key], rtol=RTOL, atol=ATOL):
+                raise SystemExit(f"Mismatch on '{key}': {out[key]} vs {ref[key]}")
+    print("Parity: OK (engine matches librosa within tolerance)")
+
+    # Warm both paths (numba JIT, filterbank caches)
+    legacy_features(clips[0], sr)
+    feature_engine.extract(clips[0], sr)
+
+    before = time_per_clip(legacy_features, clips, sr, args.repeat)
+    after = time_per_clip(feature_engine.extract, clips, sr, args.repeat)
+    print(f"Legacy librosa : {before * 1000:8.2f} ms/clip")
+    print(f"FeatureEngine  : {after * 1000:8.2f} ms/clip")
+    print(f"Speedup        : {before / after:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
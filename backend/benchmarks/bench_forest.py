@@ -0,0 +1,72 @@
+"""Classifier latency: sklearn vs per-tree apply vs the FlatForest walk, by batch size.
+
+Times the 200-tree forest four ways on synthetic MFCC rows: sklearn
+predict() (what the service used to call), predict_proba(), one Cython
+Tree.apply per tree (the scorer's large-batch path) and FlatForest.apply
+walking every tree at once, the last two summed through the same leaf
+table. Checks that the walk finds sklearn's leaves, probabilities and
+predictions exactly, then times the scorer as the service runs it.
+
+Usage (from backend/):
+    python benchmarks/bench_forest.py [--batch 1 256] [--repeat 200]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import model_dir
+
+from app.services.ensemble import EnsembleScorer, classifier_forest
+from app.services.model_store import load_legacy
+
+
+def per_call_ms(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 256])
+    parser.add_argument('--repeat', type=int, default=200, help="Calls per timing at batch 1 (fewer for big batches)")
+    args = parser.parse_args()
+
+    model = load_legacy(model_dir()).model
+    forest = classifier_forest(model)
+    trees = [e.tree_ for e in model.estimators_]
+    scorer = EnsembleScorer(model, forest=forest)
+    X = np.random.default_rng(1).normal(0, 20, (max(max(args.batch), 1000), 40))
+    print(f"{forest.n_trees} trees, {len(forest.feature)} nodes, depth {forest.depth}")
+
+    X32 = X.astype(np.float32)
+    expected = np.stack([tree.apply(X32) for tree in trees]) + forest.roots[:, None]
+    leaves_ok = np.array_equal(forest.apply(X), expected)
+    proba_ok = np.array_equal(scorer.predict_proba(X), model.predict_proba(X))
+    labels_ok = np.array_equal(model.classes_[scorer.predict_proba(X).argmax(axis=1)], model.predict(X))
+    print(f"Parity on {len(X)} rows: {'OK' if leaves_ok and proba_ok and labels_ok else 'MISMATCH'} "
+          f"(leaves {'same' if leaves_ok else 'differ'}, predict_proba {'identical' if proba_ok else 'differs'}, "
+          f"predict {'identical' if labels_ok else 'differs'})\n")
+
+    paths = {
+        'sklearn predict': lambda x: model.predict(x),
+        'sklearn predict_proba': lambda x: model.predict_proba(x),
+        'per-tree apply + table': lambda x: forest.total(
+            np.stack([tree.apply(np.asarray(x, dtype=np.float32)) for tree in trees]) + forest.roots[:, None]),
+        'FlatForest walk + table': lambda x: forest.total(forest.apply(x)),
+        'EnsembleScorer.predict_proba': lambda x: scorer.predict_proba(x),
+    }
+    print(f"{'path':<30}" + "".join(f"{f'batch {n}':>14}" for n in args.batch))
+    for name, fn in paths.items():
+        cells = []
+        for n in args.batch:
+            repeat = max(args.repeat // max(n // 8, 1), 5)
+            cells.append(f"{per_call_ms(lambda: fn(X[:n]), repeat):>11.3f} ms")
+        print(f"{name:<30}" + "".join(cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""CryRecord insert throughput: a commit per record vs write-behind batches.
+
+Several threads stand in for request handlers, each saving one record at
+a time through record_writer, first with a commit per record (the default)
+and then with WRITE_BEHIND. Write-behind throughput counts until the last
+batch is flushed, not just until the records are queued. Also checks that
+every id handed back is the id the row was stored under.
+
+Usage (from backend/):
+    python benchmarks/bench_inserts.py [--records 5000] [--threads 8] [--db-uri mysql+mysqlconnector://...]
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from common import make_app
+
+RESULT = {"cause": "hungry", "confidence": 0.8, "severity": 1.2,
+          "vitals": {"rms": 0.02, "zcr": 0.1, "sc": 1800.0}}
+
+
+def run(app, records, threads):
+    """Save ``records`` from ``threads`` threads; returns (ids, save latencies, seconds)."""
+    from app.extensions import db
+    from app.models import CryRecord
+    from app.services.records import record_writer
+
+    ids, latencies = [], []
+    lock = threading.Lock()
+
+    def handler(count):
+        with app.app_context():
+            for _ in range(count):
+                started = time.perf_counter()
+                record = record_writer.save([CryRecord.from_result(RESULT, 'uploads/bench.wav')])[0]
+                elapsed = time.perf_counter() - started
+                with lock:
+                    ids.append(record.id)
+                    latencies.append(elapsed)
+            db.session.remove()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=handler, args=(records // threads,)) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    record_writer.flush()
+    return ids, latencies, time.perf_counter() - started
+
+
+def stored_ids(app):
+    from app.extensions import db
+    from app.models import CryRecord
+    with app.app_context():
+        return {row[0] for row in db.session.execute(db.select(CryRecord.id).where(CryRecord.file_path == 'uploads/bench.wav'))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--db-uri', help="Database to write to (default: a scratch SQLite file)")
+    args = parser.parse_args()
+
+    overrides = {'WARM_UP_ON_START': False}
+    if args.db_uri:
+        overrides['SQLALCHEMY_DATABASE_URI'] = args.db_uri
+
+    print(f"{'mode':<22}{'records/s':>12}{'save p50':>12}{'save p99':>12}")
+    for mode, write_behind in (('commit per record', False), ('write-behind', True)):
+        app = make_app(WRITE_BEHIND=write_behind, **overrides)
+        from app.extensions import db
+        from app.models import CryRecord
+        with app.app_context():
+            db.session.execute(db.delete(CryRecord).where(CryRecord.file_path == 'uploads/bench.wav'))
+            db.session.commit()
+
+        ids, latencies, seconds = run(app, args.records, args.threads)
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"{mode:<22}{len(ids) / seconds:>12.0f}{statistics.median(latencies) * 1000:>9.2f} ms{p99 * 1000:>9.2f} ms")
+
+        stored = stored_ids(app)
+        ok = len(set(ids)) == len(ids) and stored == set(ids)
+        print(f"  ids: {'OK' if ok else 'MISMATCH'} ({len(ids)} returned, {len(stored)} stored)")
+
+        from app.services.records import record_writer
+        record_writer.close()
+
+
+if __name__ == '__main__':
+    main()
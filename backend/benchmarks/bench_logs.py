@@ -0,0 +1,124 @@
+"""History API latency on a large cry_records table: old /logs query vs keyset pages.
+
+Seeds a SQLite table with synthetic rows (1M by default), times the old
+query (ORM objects, ORDER BY timestamp with no index, to_dict) and then,
+after creating the model's indexes, the /api/logs endpoint for the first
+page, a page deep in the history, a cause filter and a severity/time
+window. Also checks the first page matches the old payload and that
+walking pages by cursor neither skips nor repeats rows.
+
+Usage (from backend/):
+    python benchmarks/bench_logs.py [--rows 1000000] [--repeat 20]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from common import make_app
+
+CAUSES = ('belly pain', 'burping', 'discomfort', 'hungry', 'tired')
+
+
+def seed(db, table, rows, chunk=50_000):
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 1)
+    # About one record per 30 s, with duplicate timestamps to exercise the id tiebreak
+    offsets = np.sort(rng.integers(0, rows * 30, rows))
+    with db.engine.begin() as conn:
+        for lo in range(0, rows, chunk):
+            hi = min(lo + chunk, rows)
+            conn.execute(table.insert(), [{
+                "timestamp": start + timedelta(seconds=int(offsets[i])),
+                "cause": CAUSES[i % len(CAUSES)],
+                "confidence": 0.5 + (i % 50) / 100,
+                "severity": float(i % 10),
+                "rms": 0.02, "zcr": 0.1, "spectral_centroid": 1800.0,
+                "file_path": f"uploads/clip-{i}.wav",
+            } for i in range(lo, hi)])
+    return start + timedelta(seconds=int(offsets[rows // 2]))
+
+
+def per_call_ms(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app(WARM_UP_ON_START=False)
+    from app.extensions import db
+    from app.models import CryRecord
+
+    table = CryRecord.__table__
+    with app.app_context():
+        for index in table.indexes:
+            index.drop(db.engine, checkfirst=True)
+        with db.engine.begin() as conn:
+            conn.execute(table.delete())
+        started = time.perf_counter()
+        middle = seed(db, table, args.rows)
+        print(f"Seeded {args.rows} rows in {time.perf_counter() - started:.1f} s")
+
+        def legacy():
+            records = CryRecord.query.order_by(CryRecord.timestamp.desc()).limit(50).all()
+            payload = [r.to_dict() for r in records]
+            db.session.remove()
+            return payload
+
+        legacy_ms = per_call_ms(legacy, max(args.repeat // 4, 2))
+        expected = legacy()
+        for index in table.indexes:
+            index.create(db.engine)
+
+    client = app.test_client()
+    first = client.get('/api/logs')
+    # The old query had no id tiebreak, so compare as sets of ids plus field equality
+    same = sorted(first.get_json(), key=lambda r: r["id"]) == sorted(expected, key=lambda r: r["id"])
+    print(f"Parity with old /logs payload: {'OK' if same else 'MISMATCH'}")
+
+    seen, url, pages = set(), '/api/logs?limit=500', 0
+    while url and pages < 20:
+        response = client.get(url)
+        ids = [r["id"] for r in response.get_json()]
+        if seen.intersection(ids):
+            break
+        seen.update(ids)
+        pages += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/api/logs?limit=500&cursor={cursor}' if cursor else None
+    print(f"Cursor walk: {len(seen)} unique rows over {pages} pages "
+          f"({'OK' if len(seen) == pages * 500 else 'DUPLICATES/GAPS'})")
+
+    # A cursor halfway through the table
+    with app.app_context():
+        from app.services.history import encode_cursor
+        mid_id = db.session.execute(
+            db.select(CryRecord.id).where(CryRecord.timestamp <= middle)
+            .order_by(CryRecord.timestamp.desc(), CryRecord.id.desc()).limit(1)).scalar()
+        deep_cursor = encode_cursor(middle, mid_id)
+
+    window = f"since={(middle - timedelta(days=2)).isoformat()}&until={middle.isoformat()}"
+    cases = {
+        'old /logs (no index, ORM)': None,
+        'first page': '/api/logs',
+        'deep page (cursor at 50%)': f'/api/logs?cursor={deep_cursor}',
+        'cause=hungry': '/api/logs?cause=hungry',
+        'severity>=8 in 2-day window': f'/api/logs?min_severity=8&{window}',
+    }
+    print(f"{'query':<32}{'per page':>12}")
+    for name, url in cases.items():
+        ms = legacy_ms if url is None else per_call_ms(lambda: client.get(url), args.repeat)
+        print(f"{name:<32}{ms:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Resident memory per inference worker: legacy pickles vs memory-mapped release.
+
+Starts an InferencePool on each layout, waits for every worker to load and
+warm its models, then reads RSS, PSS (RSS with shared pages split between
+the processes mapping them) and private anonymous memory from /proc. Finally
+it publishes a new release under live classify traffic to check that hot
+reload swaps models without failing a request.
+
+The default model is a 200-tree forest fit on --samples synthetic rows so
+the trees are production-sized; pass --model-dir to measure a real one.
+
+Usage (from backend/):
+    python benchmarks/bench_model_memory.py [--workers 4] [--samples 5000] [--model-dir ../Model]
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from common import make_app, model_dir, workdir
+
+from app.services.model_store import load_legacy, publish
+from app.services.worker_pool import InferencePool
+
+
+def synthetic_model(samples):
+    path = os.path.join(workdir(), f'model-{samples}')
+    if not os.path.exists(os.path.join(path, 'cry_model.pkl')):
+        import joblib
+        from sklearn.ensemble import RandomForestClassifier
+
+        legacy = load_legacy(model_dir())
+        rng = np.random.default_rng(7)
+        X = rng.normal(0, 20, size=(samples, 40))
+        y = rng.integers(0, len(legacy.label_encoder.classes_), samples)
+        os.makedirs(path, exist_ok=True)
+        model = RandomForestClassifier(n_estimators=200, random_state=42).fit(X, y)
+        joblib.dump(model, os.path.join(path, 'cry_model.pkl'))
+        joblib.dump(legacy.label_encoder, os.path.join(path, 'label_encoder.pkl'))
+    return path
+
+
+def memory_kb(pid):
+    """Rss, Pss and Anonymous from smaps_rollup (Linux)."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss', 'Anonymous'):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def measure_pool(path, workers):
+    pool = InferencePool(workers=workers, queue_depth=workers, model_dir=path,
+                         settings={"reload_interval": 0})
+    try:
+        # Each submission spawns a worker, which loads and warms in its initializer
+        futures = [pool.submit('model_version') for _ in range(workers)]
+        for future in futures:
+            future.result()
+        return [memory_kb(pid) for pid in pool.worker_pids()]
+    finally:
+        pool.shutdown()
+
+
+def check_hot_reload(path, legacy_dir, seconds):
+    from app.services.ai_service import ai_service
+
+    app = make_app(MODEL_PATH=path, INFERENCE_WORKERS=0, WARM_UP_ON_START=False, MODEL_RELOAD_INTERVAL=0.1)
+    with app.app_context():
+        ai_service.load_models()
+    before = ai_service.model_version()
+
+    features = {"rms": 0.05, "zcr": 0.1, "sc": 1500.0, "mfcc": np.zeros(40)}
+    counts = {"ok": 0, "failed": 0}
+    stop = threading.Event()
+
+    def hammer():
+        while not stop.is_set():
+            status = ai_service.classify(features).get("status")
+            counts["ok" if status == "success" else "failed"] += 1
+
+    threads = [threading.Thread(target=hammer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds / 2)
+
+    legacy = load_legacy(legacy_dir)
+    published_at = time.perf_counter()
+    version = publish(path, legacy.model, legacy.label_encoder, legacy.anomaly_model, version='99999999-reload')
+    while ai_service.model_version() != version and time.perf_counter() - published_at < 10:
+        time.sleep(0.01)
+    swapped_after = time.perf_counter() - published_at
+
+    time.sleep(seconds / 2)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return before, ai_service.model_version(), swapped_after, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--samples', type=int, default=5000, help="Training rows for the synthetic forest")
+    parser.add_argument('--model-dir', help="Directory with cry_model.pkl and label_encoder.pkl")
+    parser.add_argument('--seconds', type=float, default=3.0, help="Classify traffic during the reload check")
+    args = parser.parse_args()
+
+    legacy_dir = args.model_dir or synthetic_model(args.samples)
+    print(f"model: {os.path.getsize(os.path.join(legacy_dir, 'cry_model.pkl')) / 2**20:.1f} MB pickle\n")
+    mmap_dir = os.path.join(workdir(), 'model-releases')
+    if not os.path.isdir(os.path.join(mmap_dir, 'releases')):
+        legacy = load_legacy(legacy_dir)
+        publish(mmap_dir, legacy.model, legacy.label_encoder, legacy.anomaly_model, version='00000000-initial')
+
+    print(f"{'layout':<16}{'worker':>7}{'RSS MB':>9}{'PSS MB':>9}{'anon MB':>9}")
+    for label, path in (('legacy pickle', legacy_dir), ('mmap release', mmap_dir)):
+        rows = measure_pool(path, args.workers)
+        for index, row in enumerate(rows):
+            print(f"{label:<16}{index:>7}{row['Rss'] / 1024:>9.1f}{row['Pss'] / 1024:>9.1f}{row['Anonymous'] / 1024:>9.1f}")
+        print(f"{label + ' total':<23}{sum(r['Rss'] for r in rows) / 1024:>9.1f}"
+              f"{sum(r['Pss'] for r in rows) / 1024:>9.1f}{sum(r['Anonymous'] for r in rows) / 1024:>9.1f}")
+
+    before, after, swapped_after, counts = check_hot_reload(mmap_dir, legacy_dir, args.seconds)
+    print(f"\nhot reload: {before} -> {after} in {swapped_after * 1000:.0f} ms; "
+          f"{counts['ok']} classify calls succeeded, {counts['failed']} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Training-data extraction throughput: archive/preprocess.py vs training.pipeline.
+
+Copies a slice of the dataset into a scratch directory, times the old
+serial librosa loop (MFCC + chroma + contrast per file), then the pipeline
+cold at each worker count, a no-op re-run, and a re-run after touching and
+adding a few clips.
+
+Usage (from backend/):
+    python benchmarks/bench_pipeline.py [--clips 300] [--workers 1 4]
+"""
+import argparse
+import os
+import shutil
+import time
+import warnings
+
+from common import clip_paths, workdir
+
+from training.pipeline import run
+
+
+def stage_dataset(clips):
+    """Copy clips into <scratch>/dataset/<label>/ keeping their mtimes."""
+    root = os.path.join(workdir(), 'dataset')
+    shutil.rmtree(root, ignore_errors=True)
+    for path in clip_paths(limit=clips):
+        label = os.path.basename(os.path.dirname(path))
+        os.makedirs(os.path.join(root, label), exist_ok=True)
+        shutil.copy2(path, os.path.join(root, label))
+    return root
+
+
+def legacy_files_per_sec(dataset):
+    import librosa
+    import numpy as np
+
+    paths = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(dataset) for name in names]
+    # Cold like the pipeline runs below: the first file pays for numba JIT
+    start = time.perf_counter()
+    for path in paths:
+        audio, sr = librosa.load(path, res_type='kaiser_fast')
+        np.hstack([
+            np.mean(librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=40).T, axis=0),
+            np.mean(librosa.feature.chroma_stft(y=audio, sr=sr).T, axis=0),
+            np.mean(librosa.feature.spectral_contrast(y=audio, sr=sr).T, axis=0),
+        ])
+    return len(paths) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clips', type=int, default=300)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    dataset = stage_dataset(args.clips)
+    print(f"archive/preprocess.py (serial librosa): {legacy_files_per_sec(dataset):.1f} files/s")
+
+    for workers in dict.fromkeys(args.workers):
+        store = os.path.join(workdir(), f'store-{workers}')
+        shutil.rmtree(store, ignore_errors=True)
+        stats = run(dataset, store, workers=workers)
+        print(f"pipeline cold, {workers} worker(s): {stats['files_per_sec']} files/s "
+              f"({stats['extracted']} extracted in {stats['seconds']} s incl. pool start)")
+
+    stats = run(dataset, store)
+    print(f"pipeline re-run, nothing changed: {stats['seconds'] * 1000:.1f} ms, {stats['unchanged']} unchanged")
+
+    label = sorted(os.listdir(dataset))[0]
+    names = sorted(os.listdir(os.path.join(dataset, label)))
+    for name in names[:5]:
+        os.utime(os.path.join(dataset, label, name))
+    source = clip_paths()[-1]
+    shutil.copy2(source, os.path.join(dataset, label, 'new-clip.wav'))
+    stats = run(dataset, store)
+    print(f"pipeline re-run, 5 touched + 1 new: {stats['seconds'] * 1000:.1f} ms "
+          f"(touched={stats['touched']}, reused={stats['reused']}, extracted={stats['extracted']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Retention: disk reclaimed, run time and the live table before/after one run.
+
+Seeds cry_records with --rows records spread over the last --days days,
+--clips of them with a 16 kHz PCM WAV clip in uploads/ whose mtime
+matches the record (and a newer record holding the same clip, as a
+cache hit stores it), then runs every policy once (compress after
+--compress-after days, delete after --delete-after, archive records
+after --archive-after). Reports bytes on disk, what the run did and how
+long it took, and /api/logs latency for the first page and for a page
+halfway down the live table. Checks that every stored file_path still
+exists, that compressed clips decode to the original samples, and that
+rollups rebuilt from cry_records plus the archive tables match the ones
+kept up incrementally.
+
+Usage (from backend/):
+    python benchmarks/bench_retention.py [--rows 200000] [--clips 300] [--days 400] [--codec flac]
+        [--compress-after 7] [--delete-after 365] [--archive-after 90]
+"""
+import argparse
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import soundfile as sf
+
+from common import make_app, synthetic_clip_paths
+
+CAUSES = ('belly pain', 'burping', 'discomfort', 'hungry', 'tired')
+
+
+def seed(db, rows, clips, days, now):
+    from app.models import CryRecord
+    from app.services.stats import apply_rollups, record_tuples
+
+    sources = synthetic_clip_paths(20, sr=16000)
+    shutil.rmtree('uploads', ignore_errors=True)
+    os.makedirs('uploads')
+    rng = np.random.default_rng(0)
+    ages = np.sort(rng.uniform(0, days * 86400, rows))[::-1]
+    with_clip = np.linspace(0, rows - 1, clips).astype(int)
+    # A later record (a cache hit) holds each clip too, halfway to the next clip
+    hits = dict(zip((with_clip[:-1] + np.diff(with_clip) // 2).tolist(), with_clip[:-1].tolist()))
+    with_clip = set(with_clip.tolist())
+    batch = []
+    for i, age in enumerate(ages):
+        timestamp = now - timedelta(seconds=float(age))
+        file_path = None
+        if i in hits:
+            file_path = batch[hits[i]]["file_path"]
+        elif i in with_clip:
+            file_path = f"uploads/{i:07d}-clip.wav"
+            shutil.copyfile(sources[i % len(sources)], file_path)
+            mtime = timestamp.replace(tzinfo=timezone.utc).timestamp()
+            os.utime(file_path, (mtime, mtime))
+        batch.append({"timestamp": timestamp, "cause": CAUSES[i % len(CAUSES)], "confidence": 0.5,
+                      "severity": float(i % 10), "rms": 0.02, "zcr": 0.1, "spectral_centroid": 1800.0,
+                      "file_path": file_path})
+    with db.engine.begin() as conn:
+        conn.execute(CryRecord.__table__.delete())
+        for lo in range(0, rows, 50_000):
+            conn.execute(CryRecord.__table__.insert(), batch[lo:lo + 50_000])
+            apply_rollups(conn, record_tuples(batch[lo:lo + 50_000]))
+
+
+def disk_bytes(folder):
+    return sum(entry.stat().st_size for entry in os.scandir(folder))
+
+
+def per_call_ms(fn, repeat=20):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def log_latency(app, client):
+    from app.extensions import db
+    from app.models import CryRecord
+    from app.services.history import encode_cursor
+
+    with app.app_context():
+        live = db.session.execute(db.select(db.func.count()).select_from(CryRecord)).scalar()
+        middle = db.session.execute(db.select(CryRecord.timestamp, CryRecord.id)
+                                    .order_by(CryRecord.timestamp.desc(), CryRecord.id.desc())
+                                    .offset(live // 2).limit(1)).first()
+        db.session.remove()
+    first = per_call_ms(lambda: client.get('/api/logs'))
+    deep = per_call_ms(lambda: client.get(f'/api/logs?cursor={encode_cursor(*middle)}'))
+    return live, first, deep
+
+
+def rollup_rows(conn):
+    from sqlalchemy import select
+    from app.models import CryRollup
+    return sorted(conn.execute(select(CryRollup.granularity, CryRollup.bucket, CryRollup.cause,
+                                      CryRollup.severity_bin, CryRollup.count)).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--clips', type=int, default=300)
+    parser.add_argument('--days', type=float, default=400)
+    parser.add_argument('--codec', default='flac')
+    parser.add_argument('--compress-after', type=float, default=7)
+    parser.add_argument('--delete-after', type=float, default=365)
+    parser.add_argument('--archive-after', type=float, default=90)
+    args = parser.parse_args()
+
+    app = make_app(WARM_UP_ON_START=False, INFERENCE_WORKERS=0, RETENTION_INTERVAL=0, RETENTION_CODEC=args.codec,
+                   RETENTION_COMPRESS_AFTER_DAYS=args.compress_after, RETENTION_DELETE_AFTER_DAYS=args.delete_after,
+                   RETENTION_ARCHIVE_AFTER_DAYS=args.archive_after)
+    from app.extensions import db
+    from app.models import CryRecord
+    from app.services.retention import archive_tables, retention
+    from app.services.stats import rebuild_rollups
+
+    now = datetime.utcnow()
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for table in archive_tables(conn):
+                table.drop(conn)
+            conn.commit()
+        seed(db, args.rows, args.clips, args.days, now)
+        originals = {}
+        for (path,) in db.session.execute(db.select(CryRecord.file_path).where(CryRecord.file_path.is_not(None))
+                                          .limit(args.clips // 2)):
+            originals[path] = sf.read(path, dtype='int32')[0]
+        db.session.remove()
+
+    client = app.test_client()
+    before_bytes = disk_bytes('uploads')
+    before = log_latency(app, client)
+
+    report = retention.run(now=now)
+    after_bytes = disk_bytes('uploads')
+    after = log_latency(app, client)
+
+    print(f"{args.rows} records over {args.days:.0f} days, {args.clips} clips; compress ({args.codec}) after "
+          f"{args.compress_after:g} d, delete after {args.delete_after:g} d, archive after {args.archive_after:g} d\n")
+    print(f"run: {report['seconds'] * 1000:.0f} ms; {report['compressed']} compressed, {report['deleted']} deleted, "
+          f"{report['missing']} missing, {report['skipped']} skipped, {report['records_archived']} records archived")
+    print(f"uploads/: {before_bytes / 2**20:.1f} MB -> {after_bytes / 2**20:.1f} MB "
+          f"(reported reclaimed {report['bytes_reclaimed'] / 2**20:.1f} MB)\n")
+    print(f"{'':<14}{'live rows':>10}{'/logs first':>14}{'/logs deep':>13}")
+    for name, (live, first, deep) in (('before', before), ('after', after)):
+        print(f"{name:<14}{live:>10}{first:>11.2f} ms{deep:>10.2f} ms")
+
+    with app.app_context(), db.engine.begin() as conn:
+        tables = [CryRecord.__table__] + archive_tables(conn)
+        paths = [path for table in tables
+                 for (path,) in conn.execute(db.select(table.c.file_path).where(table.c.file_path.is_not(None)))]
+        dangling = [path for path in paths if not os.path.exists(path)]
+        stored = {os.path.splitext(path)[0]: path for path in paths}
+        lossless = all(np.array_equal(sf.read(stored[os.path.splitext(path)[0]], dtype='int32')[0], samples)
+                       for path, samples in originals.items() if os.path.splitext(path)[0] in stored)
+        rollups = rollup_rows(conn)
+        rebuild_rollups(conn)
+        rebuilt = rollup_rows(conn)
+        total = sum(conn.execute(db.select(db.func.count()).select_from(table)).scalar() for table in tables)
+    print(f"\nfile_path references: {len(paths)} stored, {len(dangling)} dangling "
+          f"({'OK' if not dangling else 'MISMATCH'})")
+    if args.codec == 'flac':
+        print(f"Compressed clips decode to the original samples: {'OK' if lossless else 'MISMATCH'}")
+    print(f"Records kept (live + {len(tables) - 1} archive tables): {total} of {args.rows} "
+          f"({'OK' if total == args.rows else 'MISMATCH'})")
+    print(f"Rollups rebuilt from live + archive match: {'OK' if rollups == rebuilt else 'MISMATCH'}")
+    metrics_text = client.get('/api/metrics').get_data(as_text=True)
+    print(f"/api/metrics has retention series: "
+          f"{'OK' if 'cry2care_retention_bytes_reclaimed_total' in metrics_text else 'MISSING'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""dataset_features seeding throughput on a synthetic corpus (1M rows by default).
+
+Writes a CSV with the real corpus's columns (rows resampled from it with
+jitter so every row is distinct), then times init_db.seed_dataset loading
+it into a scratch database, a second run that must insert nothing, and
+the old per-row INSERT loop over the first --legacy-rows rows for
+comparison.
+
+Usage (from backend/):
+    python benchmarks/bench_seed.py [--rows 1000000] [--chunk 50000] [--db-uri mysql+mysqlconnector://...]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, select
+
+from common import BACKEND_DIR, workdir
+
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+import init_db  # noqa: E402
+
+CORPUS_CSV = os.path.join(os.path.dirname(BACKEND_DIR), 'dataset', 'donateacry-corpus_features_final.csv')
+
+
+def synthetic_csv(rows, path):
+    if os.path.exists(CORPUS_CSV):
+        corpus = pd.read_csv(CORPUS_CSV)
+    else:
+        rng = np.random.default_rng(1)
+        corpus = pd.DataFrame({name: rng.normal(0, 1, 500) for name in init_db.FEATURE_COLUMNS})
+        corpus.insert(0, 'Cry_Reason', rng.integers(0, 5, 500))
+        corpus.insert(0, 'Cry_Audio_File', [f'clip-{i}.wav' for i in range(500)])
+
+    rng = np.random.default_rng(0)
+    with open(path, 'w', newline='') as f:
+        for start in range(0, rows, 100_000):
+            n = min(100_000, rows - start)
+            chunk = corpus.iloc[rng.integers(0, len(corpus), n)].reset_index(drop=True)
+            chunk[init_db.FEATURE_COLUMNS] *= rng.normal(1.0, 0.01, (n, len(init_db.FEATURE_COLUMNS)))
+            chunk['Cry_Audio_File'] = [f'synthetic/{start + i:07d}.wav' for i in range(n)]
+            chunk[init_db.CSV_COLUMNS].to_csv(f, header=start == 0, index=False)
+    return path
+
+
+def legacy_seed(engine, csv_file, rows):
+    """The old seeding: iterrows and one INSERT per row (all columns here)."""
+    df = pd.read_csv(csv_file, nrows=rows)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for index, row in df.iterrows():
+            conn.execute(insert(init_db.dataset_features).values(
+                **{name: row[name] for name in init_db.CSV_COLUMNS}))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk', type=int, default=init_db.SEED_CHUNK_ROWS)
+    parser.add_argument('--legacy-rows', type=int, default=20_000)
+    parser.add_argument('--db-uri', help="Database to seed (default: a scratch SQLite file)")
+    args = parser.parse_args()
+
+    csv_file = os.path.join(workdir(), f'corpus-{args.rows}.csv')
+    started = time.perf_counter()
+    synthetic_csv(args.rows, csv_file)
+    print(f"Wrote {args.rows} rows ({os.path.getsize(csv_file) / 1e6:.0f} MB) in {time.perf_counter() - started:.1f} s")
+
+    uri = args.db_uri or 'sqlite:///' + os.path.join(workdir(), 'seed.db')
+    engine = init_db.create_engine_for(uri)
+    init_db.dataset_features.drop(engine, checkfirst=True)
+    init_db.dataset_features.create(engine)
+
+    results = []
+    for label in ('first load', 're-run (idempotent)'):
+        started = time.perf_counter()
+        read, inserted = init_db.seed_dataset(engine, csv_file, args.chunk)
+        results.append((label, read, inserted, time.perf_counter() - started))
+
+    with engine.connect() as conn:
+        stored = conn.execute(select(func.count()).select_from(init_db.dataset_features)).scalar()
+    ok = stored == args.rows and results[1][2] == 0
+
+    init_db.dataset_features.drop(engine, checkfirst=True)
+    init_db.dataset_features.create(engine)
+    legacy_rows = min(args.legacy_rows, args.rows)
+    legacy_seconds = legacy_seed(engine, csv_file, legacy_rows)
+    engine.dispose()
+
+    print(f"\n{'run':<24}{'rows':>10}{'inserted':>10}{'seconds':>10}{'rows/s':>10}")
+    for label, read, inserted, seconds in results:
+        print(f"{label:<24}{read:>10}{inserted:>10}{seconds:>10.1f}{read / seconds:>10.0f}")
+    print(f"{'old iterrows loop':<24}{legacy_rows:>10}{legacy_rows:>10}{legacy_seconds:>10.1f}"
+          f"{legacy_rows / legacy_seconds:>10.0f}")
+    print(f"\nStored rows: {stored} ({'OK' if ok else 'MISMATCH'})")
+
+
+if __name__ == '__main__':
+    main()
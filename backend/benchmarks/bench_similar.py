@@ -0,0 +1,118 @@
+"""Similar-cry search at scale: VectorIndex alone and /api/records/<id>/similar.
+
+Fills a VectorIndex with synthetic 40-coefficient MFCC vectors (1M by
+default) in incremental chunks and times top-k queries, checking the
+results against an exact full sort. Then seeds cry_records with the same
+number of rows in a scratch SQLite DB and times the endpoint: the first
+call (which builds the index from the table) and warm calls.
+
+Usage (from backend/):
+    python benchmarks/bench_similar.py [--vectors 1000000] [--k 10] [--queries 200]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from common import make_app
+
+from app.services.vectors import VectorIndex, embed
+
+
+def synthetic_mfcc(n, seed=0):
+    """MFCC-like rows: a large negative c0 and shrinking higher coefficients."""
+    rng = np.random.default_rng(seed)
+    scale = 40.0 / (1 + np.arange(40))
+    mfcc = rng.normal(0, 1, (n, 40)) * scale
+    mfcc[:, 0] -= 300
+    return mfcc.astype(np.float32)
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return np.percentile(samples, 50), np.percentile(samples, 95)
+
+
+def bench_index(vectors, k, queries, chunk=10_000):
+    index = VectorIndex()
+    started = time.perf_counter()
+    for lo in range(0, len(vectors), chunk):
+        index.add(np.arange(lo, min(lo + chunk, len(vectors))), vectors[lo:lo + chunk])
+    add_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, len(vectors), queries)
+    normalized = embed(vectors)
+    exact = True
+    timings = []
+    for i in picks:
+        started = time.perf_counter()
+        ids, _ = index.search(vectors[i], k, exclude=i)
+        timings.append(time.perf_counter() - started)
+        scores = normalized @ normalized[i]
+        scores[i] = -np.inf
+        expected = np.sort(scores)[::-1][:k]
+        exact &= np.allclose(np.sort(scores[ids])[::-1], expected, atol=1e-6)
+    return add_seconds, timings, exact
+
+
+def bench_endpoint(app, vectors, k, queries):
+    from app.extensions import db
+    from app.models import CryRecord, pack_vector
+    from app.services.vectors import similar_cries
+
+    table = CryRecord.__table__
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(table.delete())
+            for lo in range(0, len(vectors), 50_000):
+                conn.execute(table.insert(), [{
+                    "id": i + 1, "timestamp": start + timedelta(seconds=30 * i), "cause": "hungry",
+                    "confidence": 0.8, "severity": 1.0, "rms": 0.02, "zcr": 0.1, "spectral_centroid": 1800.0,
+                    "mfcc": pack_vector(vectors[i]),
+                } for i in range(lo, min(lo + 50_000, len(vectors)))])
+        similar_cries.init_app(app)
+
+    client = app.test_client()
+    started = time.perf_counter()
+    first = client.get(f'/api/records/1/similar?k={k}')
+    build_seconds = time.perf_counter() - started
+    assert first.status_code == 200, first.get_json()
+
+    rng = np.random.default_rng(2)
+    timings = []
+    for record_id in rng.integers(1, len(vectors) + 1, queries):
+        started = time.perf_counter()
+        response = client.get(f'/api/records/{record_id}/similar?k={k}')
+        timings.append(time.perf_counter() - started)
+        assert len(response.get_json()["matches"]) == k
+    return build_seconds, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vectors', type=int, default=1_000_000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    vectors = synthetic_mfcc(args.vectors)
+    add_seconds, timings, exact = bench_index(vectors, args.k, args.queries)
+    p50, p95 = percentiles(timings)
+    print(f"VectorIndex, {args.vectors} vectors: built incrementally in {add_seconds:.2f} s "
+          f"({args.vectors / add_seconds:.0f} vectors/s)")
+    print(f"  top-{args.k} search: p50 {p50:.2f} ms, p95 {p95:.2f} ms, "
+          f"exact: {'OK' if exact else 'MISMATCH'}")
+
+    app = make_app(WARM_UP_ON_START=False)
+    build_seconds, timings = bench_endpoint(app, vectors, args.k, args.queries)
+    p50, p95 = percentiles(timings)
+    print(f"/api/records/<id>/similar, {args.vectors} stored records:")
+    print(f"  first call (loads the index from the table): {build_seconds:.2f} s")
+    print(f"  warm calls: p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Cold-start cost: import + create_app time and time to first prediction.
+
+Each run is a fresh interpreter, so nothing is cached between them. With
+warm-up on, the child waits for /api/health/ready before sending the first
+request; with it off, the first request pays for model loading and JIT.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py [--runs 3] [--workers 0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from common import clip_paths, model_dir
+
+
+def child(warm_up, workers):
+    start = time.perf_counter()
+    from common import make_app
+    app = make_app(WARM_UP_ON_START=warm_up, INFERENCE_WORKERS=workers)
+    created = time.perf_counter()
+
+    client = app.test_client()
+    if warm_up:
+        while client.get('/api/health/ready').status_code != 200:
+            if client.get('/api/health/ready').get_json()['error']:
+                raise SystemExit("warm-up failed")
+            time.sleep(0.01)
+    ready = time.perf_counter()
+
+    with open(os.environ['BENCH_CLIP'], 'rb') as f:
+        response = client.post('/api/predict', data={'file': (f, 'clip.wav')})
+    done = time.perf_counter()
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    print(json.dumps({
+        'create_app': created - start,
+        'ready': ready - start,
+        'first_request': done - ready,
+        'first_prediction': done - start,
+        'librosa_imported': 'librosa' in sys.modules,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=0, help="INFERENCE_WORKERS for the child app")
+    args = parser.parse_args()
+
+    # Build the model and pick a clip up front so the children only time startup
+    env = dict(os.environ, MODEL_PATH=model_dir(), BENCH_CLIP=clip_paths(limit=1)[0])
+
+    print(f"{'mode':<10}{'create_app':>12}{'ready':>10}{'1st req':>10}{'1st pred':>10}  librosa")
+    for warm_up in (False, True):
+        samples = []
+        for _ in range(args.runs):
+            proc = subprocess.run(
+                [sys.executable, __file__, '--child', str(int(warm_up)), str(args.workers)],
+                env=env, capture_output=True, text=True, check=True
+            )
+            samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        median = {key: statistics.median(s[key] for s in samples)
+                  for key in ('create_app', 'ready', 'first_request', 'first_prediction')}
+        print(f"{'warm-up' if warm_up else 'lazy':<10}"
+              f"{median['create_app'] * 1000:>10.0f}ms{median['ready'] * 1000:>8.0f}ms"
+              f"{median['first_request'] * 1000:>8.0f}ms{median['first_prediction'] * 1000:>8.0f}ms"
+              f"  {'yes' if any(s['librosa_imported'] for s in samples) else 'no'}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        child(bool(int(sys.argv[2])), int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,104 @@
+"""/api/stats from rollups vs aggregating cry_records on every request.
+
+Seeds a scratch SQLite cry_records table with synthetic rows spread over
+90 days (1M by default), builds the rollups from it, then times
+/api/stats for a 30-day daily view and a 3-day hourly view against the
+equivalent GROUP BY over cry_records. Checks that counts and mean
+severities agree exactly and percentiles to within one severity bin.
+
+Usage (from backend/):
+    python benchmarks/bench_stats.py [--rows 1000000] [--repeat 20]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+
+from common import make_app
+
+CAUSES = ('belly pain', 'burping', 'discomfort', 'hungry', 'tired')
+END = datetime(2024, 4, 1)
+
+
+def seed(db, table, rows):
+    rng = np.random.default_rng(0)
+    offsets = np.sort(rng.integers(0, 90 * 86400, rows))
+    severity = np.clip(rng.gamma(2.0, 1.2, rows), 0.1, 10.0).round(2)
+    confidence = rng.uniform(0.2, 0.9, rows).round(3)
+    start = END - timedelta(days=90)
+    with db.engine.begin() as conn:
+        for lo in range(0, rows, 50_000):
+            conn.execute(table.insert(), [{
+                "timestamp": start + timedelta(seconds=int(offsets[i])), "cause": CAUSES[i % 5],
+                "confidence": float(confidence[i]), "severity": float(severity[i]),
+                "rms": 0.02, "zcr": 0.1, "spectral_centroid": 1800.0,
+            } for i in range(lo, min(lo + 50_000, rows))])
+
+
+def scan(db, CryRecord, since, until):
+    """What an endpoint without rollups would run: aggregate the raw rows."""
+    window = (CryRecord.timestamp >= since, CryRecord.timestamp < until)
+    causes = db.session.execute(
+        select(CryRecord.cause, func.count(), func.avg(CryRecord.severity))
+        .where(*window).group_by(CryRecord.cause)).all()
+    severities = np.array(db.session.execute(select(CryRecord.severity).where(*window)).scalars().all())
+    return causes, severities
+
+
+def per_call_ms(fn, repeat):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app(WARM_UP_ON_START=False)
+    from app.extensions import db
+    from app.models import CryRecord
+    from app.services.stats import SEVERITY_BIN, rebuild_rollups
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(CryRecord.__table__.delete())
+        seed(db, CryRecord.__table__, args.rows)
+        started = time.perf_counter()
+        with db.engine.begin() as conn:
+            rebuild_rollups(conn)
+        print(f"Rollups built from {args.rows} rows in {time.perf_counter() - started:.1f} s")
+
+    client = app.test_client()
+    views = {
+        '30 days, daily': (END - timedelta(days=30), 'day'),
+        '3 days, hourly': (END - timedelta(days=3), 'hour'),
+    }
+    print(f"\n{'view':<18}{'/api/stats':>14}{'scan':>14}  parity")
+    for name, (since, granularity) in views.items():
+        url = f'/api/stats?since={since.isoformat()}&until={END.isoformat()}&granularity={granularity}'
+        body = client.get(url).get_json()
+        with app.app_context():
+            causes, severities = scan(db, CryRecord, since, END)
+            scan_ms = per_call_ms(lambda: scan(db, CryRecord, since, END), max(args.repeat // 4, 2))
+        stats_ms = per_call_ms(lambda: client.get(url), args.repeat)
+
+        counts_ok = all(body["causes"][cause]["count"] == count
+                        and abs(body["causes"][cause]["mean_severity"] - round(mean, 2)) <= 0.01
+                        for cause, count, mean in causes)
+        p50, p90 = np.percentile(severities, [50, 90])
+        pct_ok = (abs(body["severity"]["p50"] - p50) <= SEVERITY_BIN
+                  and abs(body["severity"]["p90"] - p90) <= SEVERITY_BIN)
+        print(f"{name:<18}{stats_ms:>11.2f} ms{scan_ms:>11.2f} ms  "
+              f"{'OK' if counts_ok and pct_ok else 'MISMATCH'} "
+              f"(p50 {body['severity']['p50']} vs {p50:.2f}, {len(body['series'])} buckets)")
+
+
+if __name__ == '__main__':
+    main()
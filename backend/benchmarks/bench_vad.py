@@ -0,0 +1,99 @@
+"""Upload inference cost with and without voice-activity segmentation.
+
+Decodes dataset clips and makes padded versions of each: the clip placed
+in the middle of --pad-to seconds of low-level background noise, written
+at the model's sample rate so decoding stays cheap and the comparison is
+about feature extraction and scoring. Times ai_service.predict on the
+originals and the padded clips with VAD off (whole clip) and on, and
+reports how often a padded clip gets the same cause as its original
+in the same mode.
+
+Usage (from backend/):
+    python benchmarks/bench_vad.py [--clips 40] [--pad-to 30 60] [--noise-db -50] [--top-db 40]
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import soundfile as sf
+
+from common import clip_paths, model_dir
+
+from app.services import vad
+from app.services.ai_service import ai_service
+from app.services.audio import TARGET_SR, load_audio
+
+
+def to_wav(audio):
+    buffer = io.BytesIO()
+    sf.write(buffer, audio.astype(np.float32), TARGET_SR, format='WAV')
+    return buffer.getvalue()
+
+
+def padded(clip, seconds, noise_db, rng):
+    """``clip`` centred in ``seconds`` of noise ``noise_db`` below the clip's RMS."""
+    total = max(int(seconds * TARGET_SR), len(clip))
+    level = np.sqrt(np.mean(np.square(clip))) * 10 ** (noise_db / 20)
+    audio = rng.normal(0, level, total).astype(np.float32)
+    start = (total - len(clip)) // 2
+    audio[start:start + len(clip)] += clip
+    return audio
+
+
+def run(clips, settings):
+    """(seconds per clip, results) for predict over WAV bytes with VAD ``settings``."""
+    ai_service.vad = settings
+    ai_service.predict(clips[0])
+    results = []
+    started = time.perf_counter()
+    for clip in clips:
+        results.append(ai_service.predict(clip))
+    return (time.perf_counter() - started) / len(clips), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clips', type=int, default=40)
+    parser.add_argument('--pad-to', type=float, nargs='+', default=[30.0, 60.0])
+    parser.add_argument('--noise-db', type=float, default=-50.0, help="Background level relative to the clip")
+    parser.add_argument('--top-db', type=float, default=vad.TOP_DB)
+    args = parser.parse_args()
+    settings = dict(top_db=args.top_db, rms_floor=vad.RMS_FLOOR, max_zcr=vad.MAX_ZCR,
+                    hangover=vad.HANGOVER, min_duration=vad.MIN_DURATION)
+
+    ai_service.load_models(model_dir())
+    rng = np.random.default_rng(0)
+    originals = [load_audio(path)[0] for path in clip_paths(limit=args.clips)]
+    seconds = sum(len(clip) for clip in originals) / len(originals) / TARGET_SR
+    variants = [(f"original (~{seconds:.0f} s)", [to_wav(clip) for clip in originals])]
+    for pad in args.pad_to:
+        variants.append((f"padded to {pad:.0f} s", [to_wav(padded(clip, pad, args.noise_db, rng))
+                                                    for clip in originals]))
+
+    print(f"{len(originals)} clips, noise {args.noise_db:.0f} dB, VAD top_db {args.top_db:.0f}\n")
+    print(f"{'input':<22}{'VAD off':>12}{'VAD on':>12}{'speedup':>9}{'segments':>10}"
+          f"{'same cause off/on':>20}")
+    reference = {}
+    for name, clips in variants:
+        off_seconds, off = run(clips, None)
+        on_seconds, on = run(clips, settings)
+        reference.setdefault('off', [r["cause"] for r in off])
+        reference.setdefault('on', [r["cause"] for r in on])
+        segments = np.mean([len(result["segments"]) for result in on])
+        same_off = np.mean([r["cause"] == c for r, c in zip(off, reference['off'])])
+        same_on = np.mean([r["cause"] == c for r, c in zip(on, reference['on'])])
+        print(f"{name:<22}{off_seconds * 1000:>9.1f} ms{on_seconds * 1000:>9.1f} ms"
+              f"{off_seconds / on_seconds:>8.1f}x{segments:>10.1f}{same_off:>13.0%} /{same_on:>5.0%}")
+    agreement = np.mean([a == b for a, b in zip(reference['off'], reference['on'])])
+    print(f"\nOriginals, VAD on vs off: same cause for {agreement:.0%}")
+
+    clip = padded(originals[0], max(args.pad_to), args.noise_db, rng)
+    started = time.perf_counter()
+    for _ in range(20):
+        vad.split(clip, TARGET_SR, **settings)
+    print(f"vad.split alone on {len(clip) / TARGET_SR:.0f} s: {(time.perf_counter() - started) / 20 * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Shared fixtures for the benchmark scripts: models, clips and a local app."""
+import glob
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_DIR = os.path.join(os.path.dirname(BACKEND_DIR), 'dataset', 'Baby Cry Dataset')
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+_workdir = None
+
+
+def workdir():
+    """Scratch directory for the benchmark run (SQLite DB, uploads, models)."""
+    global _workdir
+    if _workdir is None:
+        _workdir = tempfile.mkdtemp(prefix='cry2care-bench-')
+    return _workdir
+
+
+def model_dir(synthetic=False):
+    """MODEL_PATH if it holds a trained model (unless ``synthetic``), else a synthetic stand-in."""
+    configured = os.environ.get('MODEL_PATH')
+    if not synthetic and configured and os.path.exists(os.path.join(configured, 'cry_model.pkl')):
+        return configured
+
+    path = os.path.join(workdir(), 'model')
+    if not os.path.exists(os.path.join(path, 'cry_model.pkl')):
+        import joblib
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import LabelEncoder
+
+        os.makedirs(path, exist_ok=True)
+        rng = np.random.default_rng(42)
+        causes = np.array(['belly pain', 'burping', 'discomfort', 'hungry', 'tired'])
+        X = rng.normal(0, 20, size=(500, 40))
+        label_encoder = LabelEncoder()
+        y = label_encoder.fit_transform(causes[rng.integers(0, len(causes), 500)])
+        model = RandomForestClassifier(n_estimators=200, random_state=42).fit(X, y)
+        joblib.dump(model, os.path.join(path, 'cry_model.pkl'))
+        joblib.dump(label_encoder, os.path.join(path, 'label_encoder.pkl'))
+    return path
+
+
+def clip_paths(limit=None):
+    """WAV clips from the dataset, or synthetic ones when it isn't checked out."""
+    paths = sorted(glob.glob(os.path.join(DATASET_DIR, '*', '*.wav')))
+    if paths:
+        if limit:
+            paths = paths[::max(1, len(paths) // limit)][:limit]
+        return paths
+    return synthetic_clip_paths(limit or 20)
+
+
+def synthetic_clip_paths(count, sr=22050):
+    """``count`` deterministic 7-second cry-like WAV clips at ``sr``."""
+    import numpy as np
+    import soundfile as sf
+
+    out_dir = os.path.join(workdir(), f'clips-{sr}')
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(0)
+    t = np.arange(7 * sr) / sr
+    paths = []
+    for i in range(count):
+        path = os.path.join(out_dir, f'synthetic-{i:03d}.wav')
+        # Harmonic cry-like tone with a wobbling pitch, plus noise
+        pitch = 400 + 40 * (i % 8) + 30 * np.sin(2 * np.pi * 3 * t)
+        audio = 0.2 * np.sin(2 * np.pi * np.cumsum(pitch) / sr) + rng.normal(0, 0.01, t.size)
+        sf.write(path, audio.astype(np.float32), sr)
+        paths.append(path)
+    return paths
+
+
+def make_app(**overrides):
+    """Build the Flask app against a throwaway SQLite DB.
+
+    ``overrides`` are applied as config attributes, e.g. INFERENCE_WORKERS=4.
+    """
+    os.chdir(workdir())
+
+    from config import config, DevConfig
+    settings = {
+        'DEBUG': False,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(workdir(), 'bench.db'),
+        'MODEL_PATH': model_dir(),
+    }
+    settings.update(overrides)
+    config['benchmark'] = type('BenchConfig', (DevConfig,), settings)
+
+    from app import create_app
+    from app.extensions import db
+    app = create_app('benchmark')
+    with app.app_context():
+        db.create_all()
+    return app
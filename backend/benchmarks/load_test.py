@@ -0,0 +1,86 @@
+"""Load test for /api/predict across inference pool sizes.
+
+Fires concurrent uploads at the app through the Flask test client for each
+INFERENCE_WORKERS setting and reports throughput, plus /api/health latency
+measured while the pool is saturated.
+
+Usage (from backend/):
+    python benchmarks/load_test.py [--workers 1 2 4] [--requests 64] [--concurrency 16]
+"""
+import argparse
+import io
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import clip_paths, make_app
+
+
+def run_load(app, payloads, total, concurrency):
+    statuses = []
+    lock = threading.Lock()
+
+    def upload(i):
+        client = app.test_client()
+        name, data = payloads[i % len(payloads)]
+        response = client.post('/api/predict', data={'file': (io.BytesIO(data), name)})
+        with lock:
+            statuses.append(response.status_code)
+
+    health = []
+    done = threading.Event()
+
+    def probe():
+        client = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/api/health')
+            health.append(time.perf_counter() - start)
+            time.sleep(0.05)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(upload, range(total)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+    return elapsed, statuses, health
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers)
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    payloads = [(os.path.basename(p), open(p, 'rb').read()) for p in clip_paths(limit=16)]
+    print(f"{cores} cores, {args.requests} requests, concurrency {args.concurrency}\n")
+    print(f"{'workers':>7} {'req/s':>8} {'ok':>5} {'503':>5} {'health p50 ms':>14} {'health max ms':>14}")
+
+    baseline = None
+    for workers in args.workers:
+        app = make_app(INFERENCE_WORKERS=workers, INFERENCE_QUEUE_DEPTH=args.concurrency)
+        # Warm-up: spawn workers and load the models in each one
+        run_load(app, payloads, workers * 2, workers)
+
+        elapsed, statuses, health = run_load(app, payloads, args.requests, args.concurrency)
+        throughput = len(statuses) / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:>7} {throughput:>8.2f} {statuses.count(200):>5} {statuses.count(503):>5} "
+              f"{statistics.median(health) * 1000:>14.1f} {max(health) * 1000:>14.1f}"
+              f"   ({throughput / baseline:.2f}x)")
+
+        from app.services.ai_service import ai_service
+        ai_service.pool.shutdown()
+        ai_service.pool = None
+
+
+if __name__ == '__main__':
+    main()
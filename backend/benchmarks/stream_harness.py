@@ -0,0 +1,154 @@
+"""Synthetic-stream harness for live cry monitoring.
+
+Generates a PCM stream of background noise with cry bursts at known
+positions, feeds it in small chunks and reports, per detected burst, the
+detection latency measured from the burst's true end. Also reports the
+memory held by each open stream.
+
+Usage (from backend/):
+    python benchmarks/stream_harness.py                      # in-process StreamSession
+    python benchmarks/stream_harness.py --url ws://localhost:5000/api/stream
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from common import model_dir
+
+
+def synthetic_stream(sample_rate, seconds, bursts):
+    """int16 PCM with cry-like harmonic bursts; returns (pcm, [(start, end)])."""
+    rng = np.random.default_rng(7)
+    audio = rng.normal(0, 0.002, int(seconds * sample_rate))
+    spans = []
+    for i in range(bursts):
+        start = 1.0 + i * seconds / bursts
+        length = 0.8 + 0.4 * (i % 3)
+        idx = np.arange(int(start * sample_rate), int((start + length) * sample_rate))
+        t = idx / sample_rate
+        pitch = 450 + 60 * np.sin(2 * np.pi * 4 * t)
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        tone = sum(np.sin(k * phase) / k for k in range(1, 5))
+        audio[idx] += 0.3 * tone * np.hanning(len(idx))
+        spans.append((start, start + length))
+    pcm = (np.clip(audio, -1, 1) * 32767).astype('<i2')
+    return pcm, spans
+
+
+def chunks(pcm, sample_rate, chunk_ms):
+    step = int(sample_rate * chunk_ms / 1000)
+    for offset in range(0, len(pcm), step):
+        yield offset / sample_rate, pcm[offset:offset + step].tobytes()
+
+
+def run_in_process(pcm, spans, args):
+    from app.services.ai_service import ai_service
+    from app.services.streaming import StreamSession
+
+    ai_service.load_models(model_dir())
+    session = StreamSession(sample_rate=args.sample_rate, classify=ai_service.classify)
+    detections = []
+    busy = 0.0
+    for _, chunk in chunks(pcm, args.sample_rate, args.chunk_ms):
+        start = time.perf_counter()
+        events = session.feed(chunk)
+        busy += time.perf_counter() - start
+        detections += [(event, time.perf_counter() - start) for event in events]
+    detections += [(event, 0.0) for event in session.flush()]
+
+    print(f"Real-time factor: {busy / (len(pcm) / args.sample_rate):.4f} (compute s per audio s)")
+    report(spans, [(e["end"], e["detected_at"] - _true_end(e, spans) + compute, e) for e, compute in detections])
+
+
+def run_websocket(pcm, spans, args):
+    import simple_websocket
+
+    ws = simple_websocket.Client(args.url)
+    ws.send(json.dumps({"sample_rate": args.sample_rate, "format": "int16"}))
+    json.loads(ws.receive())
+
+    sent_at = {}
+    received = []
+
+    def receive():
+        while True:
+            try:
+                message = ws.receive()
+            except simple_websocket.ConnectionClosed:
+                return
+            received.append((json.loads(message), time.perf_counter()))
+
+    reader = threading.Thread(target=receive, daemon=True)
+    reader.start()
+    for position, chunk in chunks(pcm, args.sample_rate, args.chunk_ms):
+        ws.send(chunk)
+        sent_at[position] = time.perf_counter()
+        time.sleep(args.chunk_ms / 1000)  # real-time pacing
+    ws.send(json.dumps({"event": "end"}))
+    reader.join(timeout=5)
+    try:
+        ws.close()
+    except simple_websocket.ConnectionClosed:
+        pass
+
+    def wall_latency(event, at):
+        end = _true_end(event, spans)
+        sent = min((t for pos, t in sent_at.items() if pos >= end), default=at)
+        return at - sent
+
+    report(spans, [(e["end"], wall_latency(e, at), e) for e, at in received if e.get("event") == "cry"])
+
+
+def _true_end(event, spans):
+    return min(spans, key=lambda span: abs(span[1] - event["end"]))[1]
+
+
+def report(spans, detections):
+    print(f"Bursts: {len(spans)}, detections: {len(detections)}")
+    for end, latency, event in detections:
+        print(f"  segment ends {end:6.2f}s  latency {latency * 1000:7.1f} ms  cause={event.get('cause')}")
+    if detections:
+        latencies = [latency for _, latency, _ in detections]
+        print(f"Latency p50 {statistics.median(latencies) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+
+
+def memory_per_stream(args, streams=200):
+    from app.services.streaming import StreamSession
+
+    second = synthetic_stream(args.sample_rate, 1.0, 0)[0].tobytes()
+    StreamSession(sample_rate=args.sample_rate).feed(second)  # imports and filterbank caches
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    sessions = [StreamSession(sample_rate=args.sample_rate) for _ in range(streams)]
+    for session in sessions:
+        session.feed(second)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    print(f"Memory per open stream: {used / streams / 1024:.1f} KiB ({streams} streams)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='ws:// URL of a running server; default runs in-process')
+    parser.add_argument('--sample-rate', type=int, default=16000)
+    parser.add_argument('--chunk-ms', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--bursts', type=int, default=8)
+    args = parser.parse_args()
+
+    pcm, spans = synthetic_stream(args.sample_rate, args.seconds, args.bursts)
+    if args.url:
+        run_websocket(pcm, spans, args)
+    else:
+        run_in_process(pcm, spans, args)
+    memory_per_stream(args)
+
+
+if __name__ == '__main__':
+    main()
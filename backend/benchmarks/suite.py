@@ -0,0 +1,247 @@
+"""Benchmark suite: per-stage microbenchmarks plus concurrent API load, as JSON.
+
+Runs offline against a scratch SQLite database. Clips are synthetic
+cry-like tones written at 16 kHz (so decoding includes resampling) unless
+--dataset is given. The model is MODEL_PATH's if it holds a trained
+pickle, else a forest fit on synthetic data (--synthetic-model forces that).
+Everything is seeded, so two runs on one machine measure the same work.
+
+Microbenchmarks time each clip through decode, VAD, feature extraction,
+inference and the whole AIService.predict in-process. The load phase
+sends /api/predict uploads (prediction cache off) and then /api/logs page
+reads from --concurrency threads through the Flask test client. Every
+entry reports p50/p95/p99/mean/max latency in ms and throughput per second.
+
+The JSON report goes to --output (or stdout) with the git commit and
+environment. Pass a previous report to --compare for a table of changes;
+with --max-regression the exit status is 1 when any p50 got slower by more
+than that many percent.
+
+Usage (from backend/):
+    python benchmarks/suite.py [--clips 16] [--repeat 5] [--requests 64] [--concurrency 8]
+        [--workers 0] [--dataset] [--synthetic-model] [--output report.json]
+        [--compare baseline.json [--max-regression 10]]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from common import BACKEND_DIR, clip_paths, make_app, model_dir, synthetic_clip_paths
+
+LOG_ROWS = 10000
+
+
+def summarize(seconds, elapsed=None, errors=0):
+    """Latency percentiles in ms; throughput is per second of wall time when
+    ``elapsed`` is given (concurrent runs), else 1 / mean latency."""
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": int(ms.size),
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_per_s": round(ms.size / elapsed if elapsed else 1000 / float(ms.mean()), 2),
+    }
+
+
+def timed(fn, items, repeat):
+    """Per-call latencies of ``fn(item)`` over ``repeat`` passes, after one warm-up pass."""
+    for item in items:
+        fn(item)
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            started = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def microbenchmarks(payloads, repeat):
+    from app.services import vad
+    from app.services.ai_service import ai_service
+
+    ai_service.load_models()
+    models = ai_service.models
+    decoded = [ai_service.decode(data) for _, data in payloads]
+    clips = [ai_service.segment_features(audio, sr) for audio, sr in decoded]
+    vad_settings = ai_service.vad or {}
+
+    return {
+        "decode": summarize(timed(lambda p: ai_service.decode(p[1]), payloads, repeat)),
+        "vad": summarize(timed(lambda d: vad.split(d[0], d[1], **vad_settings), decoded, repeat)),
+        "features": summarize(timed(lambda d: ai_service.segment_features(*d), decoded, repeat)),
+        "inference": summarize(timed(lambda c: ai_service._score_clips(models, [c]), clips, repeat)),
+        "predict": summarize(timed(lambda p: ai_service.predict(p[1]), payloads, repeat)),
+    }
+
+
+def drive(app, request, total, concurrency):
+    """Run ``request(client, i)`` ``total`` times from ``concurrency`` threads."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(i):
+        client = getattr(local, 'client', None) or app.test_client()
+        local.client = client
+        started = time.perf_counter()
+        status = request(client, i)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if status != 200:
+                errors.append(status)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return summarize(latencies, time.perf_counter() - started, len(errors))
+
+
+def seed_logs(app, rows):
+    from app.extensions import db
+    from app.models import CryRecord
+
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 1)
+    causes = ('belly pain', 'burping', 'discomfort', 'hungry', 'tired')
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(CryRecord.__table__.insert(), [{
+            "timestamp": start + timedelta(seconds=30 * i), "cause": causes[i % len(causes)],
+            "confidence": float(rng.uniform(0.2, 0.9)), "severity": float(rng.uniform(0.1, 10)),
+            "rms": 0.02, "zcr": 0.1, "spectral_centroid": 1800.0,
+        } for i in range(rows)])
+
+
+def load_tests(app, payloads, total, concurrency):
+    def predict(client, i):
+        name, data = payloads[i % len(payloads)]
+        return client.post('/api/predict', data={'file': (io.BytesIO(data), name)}).status_code
+
+    def logs(client, i):
+        return client.get('/api/logs?limit=50').status_code
+
+    # Warm-up: pool workers spawn and load here, not inside the timed run
+    drive(app, predict, max(concurrency, 2), concurrency)
+    results = {"api_predict": drive(app, predict, total, concurrency)}
+    seed_logs(app, LOG_ROWS)
+    drive(app, logs, concurrency, concurrency)
+    results["api_logs"] = drive(app, logs, total * 4, concurrency)
+    return results
+
+
+def environment(args, clip_source, model_source):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BACKEND_DIR,
+                                    capture_output=True, text=True, timeout=30).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        commit, dirty = None, None
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "clips": clip_source,
+        "model": model_source,
+        "settings": {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+    }
+
+
+def compare(report, baseline_path, max_regression):
+    """Print the change against ``baseline_path``; returns the entries whose p50 regressed too far."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline['environment'].get('commit') or baseline_path}", file=sys.stderr)
+    print(f"{'benchmark':<14}{'p50 ms':>18}{'p99 ms':>18}{'per s':>18}", file=sys.stderr)
+    regressed = []
+    for name, now in report["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        cells = []
+        for key in ("p50_ms", "p99_ms", "throughput_per_s"):
+            change = (now[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            cells.append(f"{before[key]:>7.2f}->{now[key]:<7.2f}{change:+4.0f}%")
+        print(f"{name:<14}" + "".join(f"{cell:>18}" for cell in cells), file=sys.stderr)
+        if max_regression is not None and before["p50_ms"] and \
+                (now["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 > max_regression:
+            regressed.append(name)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clips', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=5, help="Passes over the clips per microbenchmark")
+    parser.add_argument('--requests', type=int, default=64, help="/api/predict requests (4x as many /api/logs)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=0, help="INFERENCE_WORKERS; 0 runs inference in-process")
+    parser.add_argument('--dataset', action='store_true', help="Use the dataset's clips instead of synthetic ones")
+    parser.add_argument('--synthetic-model', action='store_true', help="Ignore MODEL_PATH and fit a synthetic model")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--compare', help="A previous JSON report to compare against")
+    parser.add_argument('--max-regression', type=float, help="With --compare: fail if a p50 grew by more (%%)")
+    args = parser.parse_args()
+
+    paths = clip_paths(limit=args.clips) if args.dataset else synthetic_clip_paths(args.clips, sr=16000)
+    payloads = [(os.path.basename(path), open(path, 'rb').read()) for path in paths]
+    model_path = model_dir(synthetic=args.synthetic_model)
+    model_source = model_path if model_path == os.environ.get('MODEL_PATH') else 'synthetic'
+    app = make_app(MODEL_PATH=model_path, WARM_UP_ON_START=False, INFERENCE_WORKERS=args.workers,
+                   INFERENCE_QUEUE_DEPTH=args.concurrency, CACHE_MAX_ENTRIES=0, CACHE_DIR=None,
+                   LOG_LEVEL='WARNING')
+
+    print(f"{len(payloads)} clips, {args.repeat} passes; {args.requests} uploads from "
+          f"{args.concurrency} clients, {args.workers} inference workers", file=sys.stderr)
+    with app.app_context():
+        results = microbenchmarks(payloads, args.repeat)
+    results.update(load_tests(app, payloads, args.requests, args.concurrency))
+
+    report = {
+        "environment": environment(args, 'dataset' if args.dataset else 'synthetic-16k', model_source),
+        "results": results,
+    }
+    print(f"\n{'benchmark':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}{'errors':>8}", file=sys.stderr)
+    for name, stats in results.items():
+        print(f"{name:<14}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+              f"{stats['throughput_per_s']:>10.1f}{stats['errors']:>8}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        regressed = compare(report, args.compare, args.max_regression)
+        if regressed:
+            print(f"p50 regressed by more than {args.max_regression}%: {', '.join(regressed)}", file=sys.stderr)
+            sys.exit(1)
+
+    if args.workers:
+        from app.services.ai_service import ai_service
+        ai_service.pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
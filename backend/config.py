@@ -5,18 +5,105 @@ from dotenv import load_dotenv
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(os.path.dirname(basedir), '.env'))
 
+def database_uri():
+    """DATABASE_URL if set; else MySQL through DB_DRIVER, or a SQLite file with DB_BACKEND=sqlite."""
+    if os.environ.get('DATABASE_URL'):
+        return os.environ['DATABASE_URL']
+    if (os.environ.get('DB_BACKEND') or 'mysql').lower() == 'sqlite':
+        path = os.environ.get('SQLITE_PATH') or os.path.join(os.path.dirname(basedir), 'cry2care.db')
+        return f"sqlite:///{os.path.abspath(path)}"
+    # mysqlconnector (default), mysqldb (mysqlclient, C) or pymysql
+    driver = os.environ.get('DB_DRIVER') or 'mysqlconnector'
+    return f"mysql+{driver}://{os.environ.get('MYSQL_USER')}:{os.environ.get('MYSQL_PASSWORD')}@{os.environ.get('MYSQL_HOST')}/{os.environ.get('MYSQL_DB')}"
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_DATABASE_URI = database_uri()
+    # Connection pool; recycle below MySQL's wait_timeout, pre-ping to drop stale connections
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE') or 10),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 20),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT') or 30),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE') or 1800),
+        'pool_pre_ping': (os.environ.get('DB_POOL_PRE_PING') or 'true').lower() == 'true',
+    }
+    SQLITE_WAL = (os.environ.get('SQLITE_WAL') or 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5)
     MODEL_PATH = os.environ.get('MODEL_PATH') or os.path.join(os.path.dirname(basedir), 'model')
+    BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES') or 32)
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS') or os.cpu_count() or 4)
+    # Seconds between checks for a new release under MODEL_PATH/releases; 0 disables hot reload
+    MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL') or 10)
+    # Causes returned with their probabilities in each prediction's "top_k"
+    TOP_K_CAUSES = int(os.environ.get('TOP_K_CAUSES') or 3)
+    # Load and warm the models in the background at startup (see /api/health/ready)
+    WARM_UP_ON_START = (os.environ.get('WARM_UP_ON_START') or 'true').lower() == 'true'
+    # Inference process pool, off by default: 0 runs predictions inline in the
+    # request thread. Set INFERENCE_WORKERS to a process count (e.g. the number
+    # of CPU cores) to run them in a pool that keeps the server responsive
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS') or 0)
+    INFERENCE_QUEUE_DEPTH = int(os.environ.get('INFERENCE_QUEUE_DEPTH') or 16)
+    INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT') or 60)
+    INFERENCE_RETRY_AFTER = int(os.environ.get('INFERENCE_RETRY_AFTER') or 5)
+    # Background jobs for POST /api/predict?async=1
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 4)
+    JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING') or 1000)
+    JOB_TTL = int(os.environ.get('JOB_TTL') or 600)
+    # Uploads: 'disk' saves then decodes; 'memory' decodes from the request buffer
+    UPLOAD_STORAGE = os.environ.get('UPLOAD_STORAGE') or 'disk'
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
+    UPLOAD_SPOOL_THRESHOLD = int(os.environ.get('UPLOAD_SPOOL_THRESHOLD') or 8 * 1024 * 1024)
+    ARCHIVE_UPLOADS = (os.environ.get('ARCHIVE_UPLOADS') or 'true').lower() == 'true'
+    # kaiser_fast matches the shipped model; soxr_hq is ~20x faster to resample
+    RESAMPLE_TYPE = os.environ.get('RESAMPLE_TYPE') or 'kaiser_fast'
+    MAX_CLIP_SECONDS = float(os.environ.get('MAX_CLIP_SECONDS') or 60)
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_UPLOAD_BYTES') or 50 * 1024 * 1024)
+    # Content-hash prediction cache; CACHE_DIR enables the on-disk tier
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 1024)
+    CACHE_DIR = os.environ.get('CACHE_DIR')
+    # Write-behind CryRecord inserts: ids assigned up front, rows flushed in batches
+    WRITE_BEHIND = (os.environ.get('WRITE_BEHIND') or 'false').lower() == 'true'
+    WRITE_BEHIND_BATCH = int(os.environ.get('WRITE_BEHIND_BATCH') or 200)
+    WRITE_BEHIND_INTERVAL = float(os.environ.get('WRITE_BEHIND_INTERVAL') or 0.5)
+    WRITE_BEHIND_QUEUE = int(os.environ.get('WRITE_BEHIND_QUEUE') or 10000)
+    # On shutdown: how long to keep retrying, and where rows still unwritten then go
+    WRITE_BEHIND_DRAIN_TIMEOUT = float(os.environ.get('WRITE_BEHIND_DRAIN_TIMEOUT') or 10)
+    WRITE_BEHIND_SPILL = os.environ.get('WRITE_BEHIND_SPILL') or 'write_behind_spill'
+    # /api/records/<id>/similar
+    SIMILAR_MAX_K = int(os.environ.get('SIMILAR_MAX_K') or 50)
+    # Dashboard history push over SSE /api/logs/stream
+    HISTORY_POLL_INTERVAL = float(os.environ.get('HISTORY_POLL_INTERVAL') or 1.0)
+    HISTORY_STREAM_HEARTBEAT = float(os.environ.get('HISTORY_STREAM_HEARTBEAT') or 15)
+    HISTORY_STREAM_BACKLOG = int(os.environ.get('HISTORY_STREAM_BACKLOG') or 256)
+    # Threshold for the app's loggers (DEBUG shows per-request detail)
+    LOG_LEVEL = (os.environ.get('LOG_LEVEL') or 'INFO').upper()
+    # Voice-activity segmentation of uploads: only cry frames are classified. The model
+    # must have been trained on the same settings (python -m training.pipeline --vad)
+    VAD_ENABLED = (os.environ.get('VAD_ENABLED') or 'false').lower() == 'true'
+    VAD_TOP_DB = float(os.environ.get('VAD_TOP_DB') or 40.0)
+    VAD_RMS_FLOOR = float(os.environ.get('VAD_RMS_FLOOR') or 0.001)
+    VAD_MAX_ZCR = float(os.environ.get('VAD_MAX_ZCR') or 0.35)
+    VAD_HANGOVER = float(os.environ.get('VAD_HANGOVER') or 0.3)
+    VAD_MIN_DURATION = float(os.environ.get('VAD_MIN_DURATION') or 0.3)
+    # Retention for uploaded clips and cry_records; a 0 disables a policy, RETENTION_INTERVAL the job
+    RETENTION_INTERVAL = float(os.environ.get('RETENTION_INTERVAL') or 0)
+    RETENTION_COMPRESS_AFTER_DAYS = float(os.environ.get('RETENTION_COMPRESS_AFTER_DAYS') or 7)
+    RETENTION_CODEC = os.environ.get('RETENTION_CODEC') or 'flac'
+    RETENTION_DELETE_AFTER_DAYS = float(os.environ.get('RETENTION_DELETE_AFTER_DAYS') or 0)
+    RETENTION_ARCHIVE_AFTER_DAYS = float(os.environ.get('RETENTION_ARCHIVE_AFTER_DAYS') or 0)
+    RETENTION_BATCH = int(os.environ.get('RETENTION_BATCH') or 500)
+    # Live monitoring over ws /api/stream
+    STREAM_RMS_THRESHOLD = float(os.environ.get('STREAM_RMS_THRESHOLD') or 0.01)
+    STREAM_HANGOVER = float(os.environ.get('STREAM_HANGOVER') or 0.3)
+    STREAM_MIN_DURATION = float(os.environ.get('STREAM_MIN_DURATION') or 0.3)
+    STREAM_MAX_DURATION = float(os.environ.get('STREAM_MAX_DURATION') or 10.0)
     
 class DevConfig(Config):
     DEBUG = True
-    SQLALCHEMY_DATABASE_URI = f"mysql+mysqlconnector://{os.environ.get('MYSQL_USER')}:{os.environ.get('MYSQL_PASSWORD')}@{os.environ.get('MYSQL_HOST')}/{os.environ.get('MYSQL_DB')}"
 
 class ProdConfig(Config):
     DEBUG = False
-    SQLALCHEMY_DATABASE_URI = f"mysql+mysqlconnector://{os.environ.get('MYSQL_USER')}:{os.environ.get('MYSQL_PASSWORD')}@{os.environ.get('MYSQL_HOST')}/{os.environ.get('MYSQL_DB')}"
 
 config = {
     'development': DevConfig,
@@ -0,0 +1,42 @@
+"""Publish model artifacts as a new memory-mappable release.
+
+Reads the flat pickles (cry_model.pkl, label_encoder.pkl and optionally
+cry_anomaly_model.joblib) from --source and writes them uncompressed to
+MODEL_PATH/releases/<version>, with the feature spec: --source's
+feature_spec.json if it has one, else the current contract decoded with
+--resample (what the pickles were trained with). Running servers pick the release up within
+MODEL_RELOAD_INTERVAL seconds, without a restart.
+
+Usage (from backend/):
+    python publish_model.py [--source ../Model] [--model-dir ../Model] [--version 20260101-120000]
+"""
+import argparse
+import os
+
+from config import Config
+from app.services.audio import DEFAULT_RESAMPLE
+from app.services.features import check_spec, feature_spec
+from app.services.model_store import load_legacy, publish
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model-dir', default=Config.MODEL_PATH, help="MODEL_PATH the server reads")
+    parser.add_argument('--source', help="Directory with the flat pickles (default: --model-dir)")
+    parser.add_argument('--version', help="Release name; newest sorts last (default: a timestamp)")
+    parser.add_argument('--resample', default=DEFAULT_RESAMPLE, help="Resampler the model was trained with")
+    args = parser.parse_args()
+
+    source = args.source or args.model_dir
+    bundle = load_legacy(source)
+    if not bundle.complete:
+        raise SystemExit(f"cry_model.pkl and label_encoder.pkl are required in {source}")
+
+    spec = check_spec(bundle.feature_spec or feature_spec(args.resample))
+    version = publish(args.model_dir, bundle.model, bundle.label_encoder, bundle.anomaly_model, args.version,
+                      feature_spec=spec)
+    print(f"Published release {version} to {os.path.join(args.model_dir, 'releases', version)}")
+
+
+if __name__ == '__main__':
+    main()
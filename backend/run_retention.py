@@ -0,0 +1,40 @@
+"""Run the retention policies once and print what was done.
+
+Uses the RETENTION_* settings; the flags override them for this run. Clip
+paths in cry_records are relative, so run it from the directory the server
+runs in. Safe to run while the server is up, but not alongside a server
+that has RETENTION_INTERVAL set.
+
+Usage (from backend/):
+    python run_retention.py [--compress-after 7] [--codec flac] [--delete-after 365] [--archive-after 90]
+"""
+import argparse
+import json
+import os
+
+# A one-off run: no model warm-up, inference pool or background retention thread
+os.environ.update(WARM_UP_ON_START='false', INFERENCE_WORKERS='0', RETENTION_INTERVAL='0')
+
+from app import create_app
+from app.services.retention import CODECS, retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--compress-after', type=float, help="Days before WAV clips are compressed (0: never)")
+    parser.add_argument('--codec', choices=sorted(CODECS))
+    parser.add_argument('--delete-after', type=float, help="Days before clips are deleted (0: never)")
+    parser.add_argument('--archive-after', type=float, help="Days before records are archived (0: never)")
+    args = parser.parse_args()
+
+    create_app(os.getenv('FLASK_CONFIG') or 'default')
+    overrides = {'compress_after': args.compress_after, 'codec': args.codec,
+                 'delete_after': args.delete_after, 'archive_after': args.archive_after}
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(retention, name, value)
+    print(json.dumps(retention.run(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
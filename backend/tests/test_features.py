@@ -0,0 +1,56 @@
+"""FeatureEngine against the librosa calls AIService.predict used to make."""
+import librosa
+import numpy as np
+import pytest
+
+from app.services.features import feature_engine
+
+SR = 22050
+RTOL = 1e-3
+ATOL = 1e-3
+
+
+def legacy_features(audio, sr):
+    return {
+        "rms": float(np.mean(librosa.feature.rms(y=audio))),
+        "zcr": float(np.mean(librosa.feature.zero_crossing_rate(y=audio))),
+        "sc": float(np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr))),
+        "mfcc": np.mean(librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=40).T, axis=0),
+    }
+
+
+def cry(seconds, base=450.0, seed=0):
+    """Harmonic tone with a wobbling pitch plus noise, like the benchmark clips."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SR)) / SR
+    pitch = base + 30 * np.sin(2 * np.pi * 3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SR
+    audio = 0.2 * np.sin(phase) + 0.05 * np.sin(2 * phase) + rng.normal(0, 0.01, t.size)
+    return audio.astype(np.float32)
+
+
+CLIPS = {
+    "cry": cry(7.0),
+    "high cry": cry(3.0, base=900.0, seed=1),
+    "short": cry(0.5, seed=2),
+    "noise": np.random.default_rng(3).normal(0, 0.05, 2 * SR).astype(np.float32),
+    "cry in silence": np.concatenate([np.zeros(SR, np.float32), cry(1.5, seed=4), np.zeros(SR, np.float32)]),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CLIPS))
+def test_extract_matches_librosa(name):
+    audio = CLIPS[name]
+    expected, actual = legacy_features(audio, SR), feature_engine.extract(audio, SR)
+    for key in expected:
+        np.testing.assert_allclose(actual[key], expected[key], rtol=RTOL, atol=ATOL, err_msg=key)
+
+
+def test_extract_batch_matches_extract():
+    batch = np.stack([cry(2.0, base=400.0 + 50 * i, seed=i) for i in range(4)])
+    features = feature_engine.extract_batch(batch, SR)
+    for i, audio in enumerate(batch):
+        single = feature_engine.extract(audio, SR)
+        for key in ("rms", "zcr", "sc"):
+            assert features[key][i] == pytest.approx(single[key], rel=1e-6)
+        np.testing.assert_allclose(features["mfcc"][i], single["mfcc"], rtol=1e-5, atol=1e-5)
@@ -0,0 +1,64 @@
+"""FlatForest and EnsembleScorer against sklearn on small fitted forests."""
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest, RandomForestClassifier
+
+from app.services.ensemble import EnsembleScorer, classifier_forest, isolation_forest
+from app.services.forest import MAX_FLAT_ROWS
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(0, 20, (600, 40))
+    y = (X[:, 0] > 0).astype(int) + 2 * (X[:, 1] > 5).astype(int) + (X[:, 2] > 15).astype(int)
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def model(data):
+    X, y = data
+    return RandomForestClassifier(n_estimators=30, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def anomaly_model(data):
+    X, _ = data
+    return IsolationForest(n_estimators=50, random_state=0).fit(X[:, :4])
+
+
+def test_flat_walk_finds_sklearn_leaves(model, data):
+    X, _ = data
+    forest = classifier_forest(model)
+    expected = np.stack([e.tree_.apply(X.astype(np.float32)) for e in model.estimators_]) + forest.roots[:, None]
+    np.testing.assert_array_equal(forest.apply(X), expected)
+
+
+@pytest.mark.parametrize("rows", [1, 7, MAX_FLAT_ROWS, MAX_FLAT_ROWS + 1, 300])
+def test_predict_proba_matches_sklearn(model, data, rows):
+    X, _ = data
+    scorer = EnsembleScorer(model)
+    np.testing.assert_array_equal(scorer.predict_proba(X[:rows]), model.predict_proba(X[:rows]))
+
+
+def test_missing_values_take_the_per_tree_path(model, data):
+    X, _ = data
+    X = X[:5].copy()
+    X[2, 0] = np.nan
+    np.testing.assert_array_equal(EnsembleScorer(model).predict_proba(X), model.predict_proba(X))
+
+
+def test_prebuilt_forest_is_used_when_it_matches(model, data):
+    X, _ = data
+    forest = classifier_forest(model)
+    scorer = EnsembleScorer(model, forest=forest)
+    assert scorer._forest is forest
+    np.testing.assert_array_equal(scorer.predict_proba(X[:3]), model.predict_proba(X[:3]))
+
+
+@pytest.mark.parametrize("rows", [1, MAX_FLAT_ROWS + 1])
+def test_anomaly_scores_match_decision_function(model, anomaly_model, data, rows):
+    X, _ = data
+    A = X[:rows, :4]
+    scorer = EnsembleScorer(model, anomaly_model, anomaly_forest=isolation_forest(anomaly_model))
+    np.testing.assert_allclose(scorer.anomaly_scores(A), anomaly_model.decision_function(A), rtol=1e-12, atol=1e-12)
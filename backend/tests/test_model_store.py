@@ -0,0 +1,18 @@
+"""Release ordering in model_store."""
+import pytest
+
+from app.services.model_store import latest_release, publish, releases
+
+
+def test_releases_sort_numerically(tmp_path):
+    for version in ('v2', 'v9', 'v10'):
+        publish(tmp_path, {'model': version}, {'encoder': version}, version=version)
+    assert releases(tmp_path) == ['v2', 'v9', 'v10']
+    assert latest_release(tmp_path) == 'v10'
+
+
+def test_publish_rejects_a_version_that_sorts_first(tmp_path):
+    publish(tmp_path, {}, {}, version='20260101-120000')
+    with pytest.raises(ValueError):
+        publish(tmp_path, {}, {}, version='20251231-235959')
+    assert releases(tmp_path) == ['20260101-120000']
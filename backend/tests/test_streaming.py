@@ -0,0 +1,39 @@
+"""Segment bounds reported by StreamSession."""
+import numpy as np
+
+from app.services.streaming import MODEL_SR, StreamSession
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * MODEL_SR)) / MODEL_SR
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def detect(signal, **kwargs):
+    session = StreamSession(sample_format='float32', **kwargs)
+    return session.feed(signal.tobytes()) + session.flush()
+
+
+def test_quiet_frames_inside_the_hangover_count_towards_the_end():
+    signal = np.zeros(5 * MODEL_SR, dtype=np.float32)
+    burst = tone(2.2)
+    signal[MODEL_SR:MODEL_SR + len(burst)] = burst
+    unbroken = detect(signal)
+
+    # A pause shorter than the hangover doesn't split the segment or shorten it
+    signal[int(2.0 * MODEL_SR):int(2.15 * MODEL_SR)] = 0
+    paused = detect(signal)
+
+    assert len(unbroken) == len(paused) == 1
+    assert paused[0]["end"] == unbroken[0]["end"]
+    assert abs(paused[0]["end"] - 3.2) < 0.05
+
+
+def test_max_duration_bounds_the_span_not_the_active_frames():
+    pulse = np.concatenate((tone(0.2), np.zeros(int(0.2 * MODEL_SR), dtype=np.float32)))
+    events = detect(np.tile(pulse, 40), max_duration=2.0)
+    assert len(events) > 1
+    assert all(event["end"] - event["start"] <= 2.0 for event in events)
+    # Reported ends are where the audio was cut: the next segment picks up from there
+    for previous, event in zip(events, events[1:]):
+        assert event["start"] - previous["end"] < 0.25
@@ -0,0 +1 @@
+"""Offline training-data tooling: dataset feature extraction and storage."""
@@ -0,0 +1,104 @@
+import json
+import os
+import uuid
+
+import numpy as np
+
+MANIFEST = 'manifest.json'
+SCALAR_COLUMNS = ('rms', 'zcr', 'sc')
+
+
+class FeatureStore:
+    """Columnar on-disk store of per-clip training features.
+
+    Rows live in immutable ``.npz`` shards, one array per column (path,
+    label, sha256, mtime_ns, size, rms, zcr, sc and the MFCC matrix).
+    ``manifest.json`` is the index: for every live clip it records the
+    mtime, size and content hash it was extracted from and which shard holds
+    its row, plus the clips that failed to decode. A run appends one shard
+    and then replaces the manifest atomically, so an interrupted run leaves
+    the previous state intact.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    @property
+    def files(self):
+        return self.manifest['files']
+
+    @property
+    def failures(self):
+        return self.manifest['failures']
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.root, MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"files": {}, "failures": {}, "shards": [], "feature_spec": None}
+
+    def _write_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, path)
+
+    def by_hash(self):
+        """Content hash -> live path, so renamed or touched clips reuse their row."""
+        return {entry['sha256']: path for path, entry in self.files.items()}
+
+    def read_shard(self, name):
+        with np.load(os.path.join(self.root, name)) as shard:
+            return {key: shard[key] for key in shard.files}
+
+    def commit(self, rows, files, failures, feature_spec=None):
+        """Write ``rows`` as a new shard and make ``files``/``failures`` current.
+
+        ``rows`` maps column name to array; ``files`` is the complete new
+        index, whose entries for these rows must name the shard as ``None``.
+        """
+        shards = [s for s in self.manifest['shards'] if any(e['shard'] == s for e in files.values())]
+        if rows is not None and len(rows['path']):
+            name = f"shard-{uuid.uuid4().hex[:12]}.npz"
+            np.savez(os.path.join(self.root, name), **rows)
+            for path in rows['path']:
+                files[str(path)]['shard'] = name
+            shards.append(name)
+
+        stale = set(self.manifest['shards']) - set(shards)
+        self.manifest = {"files": files, "failures": failures, "shards": shards,
+                         "feature_spec": feature_spec or self.manifest.get('feature_spec')}
+        self._write_manifest()
+        # Only now is nothing referencing the dropped shards
+        for name in stale:
+            os.remove(os.path.join(self.root, name))
+
+    def load(self):
+        """Live rows of every shard as one set of columns, sorted by path."""
+        wanted = {}
+        for path, entry in self.files.items():
+            wanted.setdefault(entry['shard'], set()).add(path)
+
+        parts = []
+        for name in self.manifest['shards']:
+            if name not in wanted:
+                continue
+            shard = self.read_shard(name)
+            keep = np.isin(shard['path'], list(wanted[name]))
+            parts.append({key: values[keep] for key, values in shard.items()})
+
+        if not parts:
+            return None
+        columns = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+        order = np.argsort(columns['path'], kind='stable')
+        return {key: values[order] for key, values in columns.items()}
+
+    def compact(self):
+        """Rewrite all live rows into a single shard, dropping superseded ones."""
+        columns = self.load()
+        files = {path: dict(entry, shard=None) for path, entry in self.files.items()}
+        self.commit(columns, files, self.failures)
@@ -0,0 +1,182 @@
+"""Incremental, parallel feature extraction for the training dataset.
+
+Walks ``<dataset>/<label>/<clip>``, extracts the service's features for
+every clip across a process pool and writes them to a FeatureStore. Clips
+whose path, mtime and size are unchanged since the last run are skipped
+without being read; changed ones are hashed, and content that was already
+extracted (a touched or renamed clip) reuses its stored row. Clips that
+failed to decode are remembered and only retried once they change.
+
+Usage (from backend/):
+    python -m training.pipeline [--dataset "../dataset/Baby Cry Dataset"] [--store ../dataset/feature_store] [--workers 4]
+        [--vad]
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.services import vad
+from app.services.audio import DEFAULT_RESAMPLE, load_audio
+from app.services.features import feature_engine, feature_spec
+
+from .feature_store import SCALAR_COLUMNS, FeatureStore
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATASET_DIR = os.path.join(ROOT_DIR, 'dataset', 'Baby Cry Dataset')
+STORE_DIR = os.path.join(ROOT_DIR, 'dataset', 'feature_store')
+# Rewrite the store into one shard once incremental runs have left this many
+MAX_SHARDS = 8
+
+
+def scan(dataset_dir):
+    """(relative path, label, absolute path, stat) for every clip, in a stable order."""
+    for label in sorted(os.listdir(dataset_dir)):
+        folder = os.path.join(dataset_dir, label)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if os.path.isfile(path):
+                yield f"{label}/{name}", label, path, os.stat(path)
+
+
+def _sha256(path, chunk_size=1 << 16):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _extract(job):
+    """Worker: decode and extract one clip; errors come back as strings."""
+    path, spec = job
+    try:
+        audio, sr = load_audio(path, sr=spec['sample_rate'], res_type=spec['res_type'])
+        if spec['vad'] is not None:
+            return vad.pool(audio, sr, vad.split(audio, sr, **spec['vad']))[1], None
+        return feature_engine.extract(audio, sr), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+
+def run(dataset_dir=DATASET_DIR, store_dir=STORE_DIR, workers=None, res_type=DEFAULT_RESAMPLE, vad_settings=None):
+    """Bring the store up to date with ``dataset_dir``; returns run statistics.
+
+    With ``vad_settings`` (keyword arguments for vad.split) the features are
+    pooled over cry segments, as the service does with VAD_ENABLED.
+    """
+    start = time.perf_counter()
+    store = FeatureStore(store_dir)
+    spec = feature_spec(res_type, vad_settings)
+    stored = store.manifest.get('feature_spec')
+    # Specs from before segmentation was recorded are whole-clip ones
+    if stored is not None and dict({"vad": None}, **stored) != spec:
+        # Rows from another feature contract (or resampler) aren't reusable
+        store.manifest.update(files={}, failures={})
+    known, known_failures, known_hashes = store.files, store.failures, store.by_hash()
+
+    files, failures = {}, {}
+    reused, todo = [], []
+    stats = {"scanned": 0, "unchanged": 0, "touched": 0, "reused": 0, "extracted": 0, "failed": 0}
+    for rel_path, label, path, stat in scan(dataset_dir):
+        stats["scanned"] += 1
+        meta = {"label": label, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        entry = known.get(rel_path)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            files[rel_path] = entry
+            stats["unchanged"] += 1
+            continue
+        failure = known_failures.get(rel_path)
+        if failure and failure['mtime_ns'] == stat.st_mtime_ns and failure['size'] == stat.st_size:
+            failures[rel_path] = failure
+            stats["failed"] += 1
+            continue
+
+        meta["sha256"] = _sha256(path)
+        if entry and entry['sha256'] == meta["sha256"] and entry['label'] == label:
+            files[rel_path] = dict(entry, mtime_ns=stat.st_mtime_ns)
+            stats["touched"] += 1
+        elif meta["sha256"] in known_hashes:
+            reused.append((rel_path, meta, known[known_hashes[meta["sha256"]]]))
+        else:
+            todo.append((rel_path, path, meta))
+
+    rows = {"path": [], "label": [], "sha256": [], "mtime_ns": [], "size": [], "mfcc": []}
+    rows.update({name: [] for name in SCALAR_COLUMNS})
+
+    def add_row(rel_path, meta, features):
+        files[rel_path] = dict(meta, shard=None)
+        rows["path"].append(rel_path)
+        for key in ("label", "sha256", "mtime_ns", "size"):
+            rows[key].append(meta[key])
+        for name in SCALAR_COLUMNS:
+            rows[name].append(features[name])
+        rows["mfcc"].append(np.asarray(features["mfcc"], dtype=np.float32))
+
+    # Same content under a new path or label: copy the stored features
+    for shard_name in {source['shard'] for _, _, source in reused}:
+        shard = store.read_shard(shard_name)
+        index = {sha: i for i, sha in enumerate(shard['sha256'])}
+        for rel_path, meta, source in reused:
+            if source['shard'] == shard_name:
+                i = index[meta["sha256"]]
+                add_row(rel_path, meta, {name: shard[name][i] for name in SCALAR_COLUMNS + ('mfcc',)})
+                stats["reused"] += 1
+
+    extract_start = time.perf_counter()
+    if todo:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            jobs = [(path, spec) for _, path, _ in todo]
+            for (rel_path, _, meta), (features, error) in zip(todo, pool.map(_extract, jobs, chunksize=4)):
+                if error is None:
+                    add_row(rel_path, meta, features)
+                    stats["extracted"] += 1
+                else:
+                    failures[rel_path] = dict(meta, error=error)
+                    stats["failed"] += 1
+    extract_seconds = time.perf_counter() - extract_start
+
+    columns = None
+    if rows["path"]:
+        columns = {key: np.asarray(values) for key, values in rows.items()}
+        columns["mfcc"] = np.vstack(rows["mfcc"]).astype(np.float32)
+    stats["removed"] = len(set(known) - set(files))
+    store.commit(columns, files, failures, feature_spec=spec)
+    if len(store.manifest['shards']) > MAX_SHARDS:
+        store.compact()
+
+    stats["live"] = len(files)
+    stats["shards"] = len(store.manifest['shards'])
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    attempted = len(todo)
+    stats["files_per_sec"] = round(attempted / extract_seconds, 2) if attempted and extract_seconds else None
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dataset', default=DATASET_DIR)
+    parser.add_argument('--store', default=STORE_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument('--resample', default=DEFAULT_RESAMPLE, help="Resampler, see services/audio.py")
+    parser.add_argument('--vad', action='store_true', help="Pool features over cry segments (VAD_ENABLED with the "
+                                                             "default VAD_* settings)")
+    args = parser.parse_args()
+
+    vad_settings = None
+    if args.vad:
+        vad_settings = {"top_db": vad.TOP_DB, "rms_floor": vad.RMS_FLOOR, "max_zcr": vad.MAX_ZCR,
+                        "hangover": vad.HANGOVER, "min_duration": vad.MIN_DURATION}
+    stats = run(args.dataset, args.store, args.workers, args.resample, vad_settings)
+    print(", ".join(f"{key}={value}" for key, value in stats.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Train the cause classifier from the feature store and publish it.
+
+Same model as archive/preprocess.py (a balanced 200-tree RandomForest on an
+80/20 stratified split), but fit on the rows training.pipeline stored, i.e.
+on exactly the features the service computes. The release gets the store's
+feature spec next to it, so AIService can refuse a model whose features it
+doesn't produce. A temperature for the class probabilities is fitted on
+the held-out split and published as calibration.json. The active anomaly
+model is carried over unchanged.
+
+Usage (from backend/):
+    python -m training.train [--store ../dataset/feature_store] [--model-dir ../model] [--dry-run]
+"""
+import argparse
+
+import numpy as np
+
+from config import Config
+from app.services.ensemble import EnsembleScorer
+from app.services.features import check_spec, model_input
+from app.services.model_store import load_bundle, publish
+
+from .feature_store import FeatureStore
+from .pipeline import STORE_DIR
+
+
+def _nll(proba, y):
+    return float(-np.mean(np.log(np.maximum(proba[np.arange(len(y)), y], 1e-12))))
+
+
+def fit_temperature(model, X, y):
+    """Temperature minimising held-out NLL of the scaled forest probabilities."""
+    from scipy.optimize import minimize_scalar
+
+    proba = model.predict_proba(X)
+    scorer = EnsembleScorer(model)
+
+    def loss(temperature):
+        scorer.temperature = temperature
+        return _nll(scorer.calibrate(proba), y)
+
+    best = minimize_scalar(loss, bounds=(0.05, 20.0), method='bounded')
+    return float(best.x), loss(1.0), float(best.fun)
+
+
+def train(columns, seed=42):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+
+    X = model_input(columns)
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(columns['label'])
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed, stratify=y)
+
+    model = RandomForestClassifier(n_estimators=200, class_weight='balanced', random_state=seed)
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    report = classification_report(y_test, y_pred, labels=np.arange(len(label_encoder.classes_)),
+                                   target_names=label_encoder.classes_, zero_division=0)
+    temperature, nll_before, nll_after = fit_temperature(model, X_test, y_test)
+    calibration = {"method": "temperature", "temperature": round(temperature, 4),
+                   "nll_before": round(nll_before, 4), "nll_after": round(nll_after, 4)}
+    return model, label_encoder, accuracy_score(y_test, y_pred), report, calibration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store', default=STORE_DIR)
+    parser.add_argument('--model-dir', default=Config.MODEL_PATH)
+    parser.add_argument('--version', help="Release name (default: a timestamp)")
+    parser.add_argument('--dry-run', action='store_true', help="Train and report without publishing")
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store)
+    columns = store.load()
+    if columns is None:
+        raise SystemExit(f"No features in {args.store}; run python -m training.pipeline first")
+    spec = check_spec(store.manifest['feature_spec'])
+
+    model, label_encoder, accuracy, report, calibration = train(columns)
+    print(f"Trained on {len(columns['path'])} clips, feature spec v{spec['version']} ({spec['res_type']})")
+    print(f"Accuracy: {accuracy * 100:.2f}%\n{report}")
+    print(f"Calibration: T={calibration['temperature']}, held-out NLL "
+          f"{calibration['nll_before']} -> {calibration['nll_after']}")
+    if args.dry_run:
+        return
+
+    anomaly_model = load_bundle(args.model_dir).anomaly_model
+    version = publish(args.model_dir, model, label_encoder, anomaly_model, args.version,
+                      feature_spec=spec, calibration=calibration)
+    print(f"Published release {version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,96 +1,189 @@
 import os
-import mysql.connector
+import sys
 from dotenv import load_dotenv
 import pandas as pd
+import time
+from sqlalchemy import bindparam, create_engine, delete, insert, inspect, select, update
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
 
 # Load environment variables
 load_dotenv()
 
+# Share the backend's connection settings (URI, driver, pool, SQLite pragmas)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from config import Config
+from app.extensions import db
+from app.models import CryRecord, CryRollup, DATASET_FEATURE_COLUMNS as FEATURE_COLUMNS, dataset_features, pack_vector
+from app.services.database import engine_options, instrument
+from app.services.retention import archive_tables
+from app.services.stats import rebuild_rollups
+
+CSV_COLUMNS = ['Cry_Audio_File', 'Cry_Reason'] + FEATURE_COLUMNS
+SEED_CHUNK_ROWS = int(os.getenv('SEED_CHUNK_ROWS') or 50000)
+
+def create_engine_for(uri):
+    engine = create_engine(uri, **engine_options(uri, Config.SQLALCHEMY_ENGINE_OPTIONS))
+    instrument(engine, Config.SQLITE_WAL, Config.SQLITE_BUSY_TIMEOUT)
+    return engine
+
 def init_database():
-    # 1. Connect to MySQL (without DB first to create it)
+    uri = Config.SQLALCHEMY_DATABASE_URI
+    url = make_url(uri)
     try:
-        conn = mysql.connector.connect(
-            user=os.getenv('MYSQL_USER'),
-            password=os.getenv('MYSQL_PASSWORD'),
-            host=os.getenv('MYSQL_HOST')
-        )
-        cursor = conn.cursor()
-        
-        db_name = os.getenv('MYSQL_DB')
-        
-        # 2. Create Database
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
-        cursor.execute(f"USE {db_name}")
-        print(f"Database '{db_name}' initialized.")
-        
-        # 3. Execute SQL files from database folder
-        db_folder = 'database'
-        if os.path.exists(db_folder):
-            for filename in os.listdir(db_folder):
-                if filename.endswith('.sql'):
-                    with open(os.path.join(db_folder, filename), 'r') as f:
-                        sql_script = f.read()
-                        for command in sql_script.split(';'):
-                            if command.strip():
-                                cursor.execute(command)
-                    print(f"Executed SQL script: {filename}")
-
-        # 4. Create default tables if they don't exist
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cry_records (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                file_path VARCHAR(255),
-                cause VARCHAR(100),
-                severity FLOAT,
-                confidence FLOAT,
-                rms FLOAT,
-                zcr FLOAT,
-                spectral_centroid FLOAT
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS dataset_features (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                Cry_Audio_File TEXT,
-                Cry_Reason INT,
-                RMS_Mean FLOAT,
-                ZCR_Mean FLOAT,
-                SC_Mean FLOAT
-            )
-        """)
-        
-        conn.commit()
-        
-        # 5. Seed Data from dataset folder
-        seed_dataset(cursor, conn)
-        
-        cursor.close()
-        conn.close()
+        # 1. Create the database (MySQL: connect without it first)
+        if url.get_backend_name() == 'mysql':
+            server = create_engine_for(url.set(database=None).render_as_string(hide_password=False))
+            with server.begin() as conn:
+                conn.exec_driver_sql(f"CREATE DATABASE IF NOT EXISTS {url.database}")
+            server.dispose()
+        engine = create_engine_for(uri)
+        print(f"Database '{url.database}' initialized ({url.get_backend_name()}+{engine.dialect.driver}).")
+
+        with engine.begin() as conn:
+            # 2. Execute SQL files from database folder
+            db_folder = 'database'
+            if os.path.exists(db_folder):
+                for filename in os.listdir(db_folder):
+                    if filename.endswith('.sql'):
+                        with open(os.path.join(db_folder, filename), 'r') as f:
+                            sql_script = f.read()
+                            for command in sql_script.split(';'):
+                                if command.strip():
+                                    conn.exec_driver_sql(command)
+                        print(f"Executed SQL script: {filename}")
+
+            # 3. Create default tables if they don't exist (cry_records with its
+            # history indexes, id_allocator, dataset_features), from the models
+            db.metadata.create_all(conn)
+
+            # Tables created by older versions get the newer columns and indexes
+            add_missing_columns(conn, CryRecord.__table__)
+            ensure_indexes(conn, CryRecord.__table__)
+            for table in archive_tables(conn):
+                add_missing_columns(conn, table)
+            upgrade_dataset_features(conn)
+
+            # Records saved before the rollups existed
+            if conn.execute(select(CryRollup.count).limit(1)).first() is None:
+                scanned = rebuild_rollups(conn)
+                if scanned:
+                    print(f"Built cry_rollups from {scanned} existing records.")
+
+        # 4. Seed Data from dataset folder
+        seed_dataset(engine)
+        attach_dataset_vectors(engine)
+
+        engine.dispose()
         print("Database initialization complete.")
-        
-    except mysql.connector.Error as err:
+
+    except SQLAlchemyError as err:
         print(f"Error: {err}")
 
-def seed_dataset(cursor, conn):
-    dataset_path = os.getenv('DATASET_PATH')
-    csv_file = os.path.join(dataset_path, 'donateacry-corpus_features_final.csv')
-    
-    if os.path.exists(csv_file):
-        print(f"Seeding dataset from {csv_file}...")
-        df = pd.read_csv(csv_file)
-        
-        # We only take a subset of columns for the simple DB table
-        # or we could dynamically create columns. Let's stick to core ones for now.
-        for index, row in df.iterrows():
-            cursor.execute("""
-                INSERT INTO dataset_features (Cry_Audio_File, Cry_Reason, RMS_Mean, ZCR_Mean, SC_Mean)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (row['Cry_Audio_File'], row['Cry_Reason'], row['RMS_Mean'], row['ZCR_Mean'], row['SC_Mean']))
-        
-        conn.commit()
-        print(f"Inserted {len(df)} records into dataset_features.")
+def ensure_indexes(conn, table):
+    existing = {index['name'] for index in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(conn)
+            print(f"Created index {index.name} on {table.name}.")
+
+def add_missing_columns(conn, table):
+    existing = {column['name'] for column in inspect(conn).get_columns(table.name)}
+    missing = [column for column in table.columns if column.name not in existing]
+    for column in missing:
+        conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                             f"{column.type.compile(dialect=conn.dialect)}")
+        print(f"Added column {column.name} to {table.name}.")
+    return existing, missing
+
+def upgrade_dataset_features(conn):
+    """Bring a dataset_features table from the old 5-column seeding up to date."""
+    existing, missing = add_missing_columns(conn, dataset_features)
+    if 'row_hash' not in existing:
+        # The old seeding wasn't idempotent; its rows are dropped and re-seeded with hashes
+        removed = conn.execute(delete(dataset_features).where(dataset_features.c.row_hash.is_(None))).rowcount
+        index = next(index for index in dataset_features.indexes
+                     if [column.name for column in index.columns] == ['row_hash'])
+        conn.execute(CreateIndex(index))
+        print(f"Upgraded dataset_features: {removed} unhashed rows removed.")
+
+def row_hashes(chunk):
+    """Stable 64-bit hash of each row's values, as signed ints for BIGINT."""
+    return pd.util.hash_pandas_object(chunk[CSV_COLUMNS], index=False).to_numpy().view('int64')
+
+def seed_dataset(engine, csv_file=None, chunk_rows=SEED_CHUNK_ROWS):
+    """Bulk-load the feature CSV; returns (rows read, rows inserted).
+
+    The CSV is streamed ``chunk_rows`` at a time, each chunk one driver
+    executemany (a multi-row INSERT on MySQL) in its own transaction.
+    Rows whose hash is already in the table are skipped by the database
+    (INSERT IGNORE / INSERT OR IGNORE), so re-running, or resuming after
+    a failure, never duplicates rows.
+    """
+    if csv_file is None:
+        dataset_path = os.getenv('DATASET_PATH') or 'dataset'
+        csv_file = os.path.join(dataset_path, 'donateacry-corpus_features_final.csv')
+    if not os.path.exists(csv_file):
+        return 0, 0
+
+    print(f"Seeding dataset from {csv_file}...")
+    statement = (insert(dataset_features)
+                 .prefix_with('IGNORE', dialect='mysql')
+                 .prefix_with('OR IGNORE', dialect='sqlite'))
+    dtypes = {name: 'float64' for name in FEATURE_COLUMNS}
+    dtypes.update({'Cry_Audio_File': 'object', 'Cry_Reason': 'int64'})
+
+    read = inserted = 0
+    started = time.perf_counter()
+    compiled = statement.compile(dialect=engine.dialect, column_keys=CSV_COLUMNS + ['row_hash'])
+    # Named paramstyles (pymysql's pyformat) take a mapping per row, keyed by column
+    positional = compiled.positional
+    columns = list(compiled.positiontup) if positional else CSV_COLUMNS + ['row_hash']
+    for chunk in pd.read_csv(csv_file, usecols=CSV_COLUMNS, dtype=dtypes, chunksize=chunk_rows):
+        chunk['row_hash'] = row_hashes(chunk)
+        # Rows straight to the driver's executemany, as tuples where the paramstyle
+        # allows: no SQLAlchemy parameter processing. NaN -> NULL, numpy scalars -> Python.
+        values = chunk[columns].astype(object).where(chunk[columns].notna(), None)
+        if positional:
+            rows = list(values.itertuples(index=False, name=None))
+        else:
+            rows = values.to_dict('records')
+        with engine.begin() as conn:
+            inserted += conn.exec_driver_sql(str(compiled), rows).rowcount
+        read += len(rows)
+
+    seconds = time.perf_counter() - started
+    print(f"Inserted {inserted} of {read} records into dataset_features "
+          f"({read - inserted} already present, {read / max(seconds, 1e-9):.0f} rows/s).")
+    return read, inserted
+
+def attach_dataset_vectors(engine, store_dir=None):
+    """Copy MFCC vectors from the training feature store onto dataset rows.
+
+    Rows are matched by clip file name (the CSV's paths come from another
+    machine). Only rows without a vector are touched.
+    """
+    from training.feature_store import FeatureStore
+    from training.pipeline import STORE_DIR
+    store_dir = store_dir or STORE_DIR
+    if not os.path.exists(os.path.join(store_dir, 'manifest.json')):
+        return 0
+    columns = FeatureStore(store_dir).load()
+    if columns is None:
+        return 0
+    by_name = {os.path.basename(path): mfcc for path, mfcc in zip(columns['path'], columns['mfcc'])}
+
+    with engine.begin() as conn:
+        rows = conn.execute(select(dataset_features.c.id, dataset_features.c.Cry_Audio_File)
+                            .where(dataset_features.c.mfcc.is_(None))).all()
+        vectors = [{"row_id": row.id, "vector": pack_vector(by_name[name])} for row in rows
+                   if (name := os.path.basename(row.Cry_Audio_File or '')) in by_name]
+        if vectors:
+            conn.execute(update(dataset_features).where(dataset_features.c.id == bindparam('row_id'))
+                         .values(mfcc=bindparam('vector')), vectors)
+    print(f"Attached MFCC vectors to {len(vectors)} dataset_features rows.")
+    return len(vectors)
 
 if __name__ == "__main__":
     init_database()